@@ -7,7 +7,7 @@ from django.urls import reverse
 from django.utils import timezone
 
 from agents.models import AuditLog
-from agents.security import is_chef_service, is_presidence
+from agents.security import has_role, is_chef_service, is_presidence
 
 
 class AgentLoginView(LoginView):
@@ -28,18 +28,19 @@ class AgentLoginView(LoginView):
         nxt = self.get_redirect_url()
         if nxt:
             return nxt
-        if self.request.user.groups.filter(name="PRESIDENCE").exists():
+        user = self.request.user
+        if has_role(user, "PRESIDENCE"):
             return reverse("presidence_briefing")
-        if self.request.user.groups.filter(name="CNS").exists():
+        if has_role(user, "CNS"):
             return reverse("cns_dashboard")
-        if self.request.user.groups.filter(name="CHEF_SERVICE").exists():
+        if has_role(user, "CHEF_SERVICE"):
             return reverse("team_view")      # /agents/team/
         return reverse("dashboard")          # /dashboard/
 
 
 @login_required
 def agent_dashboard(request):
-    if request.user.groups.filter(name="CNS").exists():
+    if has_role(request.user, "CNS"):
         return redirect("cns_dashboard")
     agent = getattr(request.user, "agent_profile", None)
 
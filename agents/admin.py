@@ -1,5 +1,21 @@
 from django.contrib import admin
 from .models import Service, Agent, Contribution, Mission, MicroMission
+from .search import matching_ids
+
+
+class FullTextSearchMixin:
+    """
+    Recherche de l'admin : titre et texte via l'index plein texte
+    (agents.search), les autres search_fields en recherche classique.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        ids = matching_ids(self.search_kind, search_term)
+        if ids is not None:
+            results |= queryset.filter(pk__in=ids)
+        return results, may_have_duplicates
 
 
 @admin.register(Service)
@@ -37,7 +53,8 @@ class AgentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Contribution)
-class ContributionAdmin(admin.ModelAdmin):
+class ContributionAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = "contribution"
     list_display = (
         "id",
         "titre",
@@ -49,11 +66,9 @@ class ContributionAdmin(admin.ModelAdmin):
     list_filter = (
         "statut",
         "priorite",
-        "agent__service",
+        "service",
     )
     search_fields = (
-        "titre",
-        "contenu",
         "agent__matricule",
         "agent__nom",
         "agent__prenom",
@@ -61,7 +76,12 @@ class ContributionAdmin(admin.ModelAdmin):
     ordering = ("-date_creation",)
 
 
-admin.site.register(Mission)
+@admin.register(Mission)
+class MissionAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = "mission"
+    list_display = ("id", "titre", "agent_assigned", "status", "priority", "created_at")
+    list_filter = ("status", "priority", "service")
+    search_fields = ("agent_assigned__matricule", "agent_assigned__nom")
 
 
 @admin.register(MicroMission)
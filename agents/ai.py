@@ -1,37 +1,290 @@
-import os
-from google import genai
+import json
+import logging
+import re
+import secrets
+import time
+import zlib
 
-DEFAULT_MODEL = "gemini-2.0-flash"
+from . import llm
+from .metrics import GEMINI_ERRORS, GEMINI_FIRST_CHUNK, GEMINI_LATENCY
 
+logger = logging.getLogger("agents.llm")
 
-def _client():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY manquante (variable d’environnement).")
-    return genai.Client(api_key=api_key)
+DEFAULT_MODEL = "gemini-2.0-flash"
+# À incrémenter à chaque modification du prompt de résumé : les résumés
+# persistés (agents.summaries) produits par l'ancien prompt ne sont plus servis.
+PROMPT_VERSION = "resume-v1"
+MISSION_PROMPT_VERSION = "rapport-v1"
+# Résumés produits en lot (batch_prompt), stockés à part des résumés unitaires
+BATCH_PROMPT_VERSION = "resume-lot-v1"
+# Résumés partiels des textes longs (étape "map" de summaries.summarize_text)
+CHUNK_PROMPT_VERSION = "extrait-v1"
 
+DOCUMENTS = {
+    "contribution": "la contribution",
+    "mission": "le rapport de mission",
+}
 
-def resume_contribution(titre: str, contenu: str) -> str:
-    """
-    Résumé institutionnel (qualité admin / traçabilité), sans inventer.
-    """
-    prompt = f"""
-Nous sommes dans un portail interne d’agents de l’État.
-Tâche: résumer la contribution ci-dessous pour un supérieur hiérarchique.
 
-Contraintes:
+RESUME_CONSTRAINTS = """Contraintes:
 - Français, style institutionnel
 - Pas d’invention (si info manquante: "Non précisé")
 - Format:
   1) Résumé (3-5 lignes)
   2) Points clés (3-6 puces)
-  3) Urgence suggérée: Faible / Normal / Élevé (1 phrase justification)
+  3) Urgence suggérée: Faible / Normal / Élevé (1 phrase justification)"""
+
+# Lots (resume_contributions_batch) : estimation grossière de 4 caractères par
+# jeton et réserve de jetons de sortie par contribution.
+CHARS_PER_TOKEN = 4
+OUTPUT_TOKENS_PER_ITEM = 400
+
+BATCH_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "id": {"type": "string"},
+            "resume": {"type": "string"},
+        },
+        "required": ["id", "resume"],
+    },
+}
+
+
+def resume_prompt(titre: str, contenu: str, document: str = "contribution") -> str:
+    return f"""
+Nous sommes dans un portail interne d’agents de l’État.
+Tâche: résumer {DOCUMENTS[document]} ci-dessous pour un supérieur hiérarchique.
+
+{RESUME_CONSTRAINTS}
 
 Titre: {titre}
 Texte:
 {contenu}
 """.strip()
 
-    client = _client()
-    resp = client.models.generate_content(model=DEFAULT_MODEL, contents=prompt)
-    return (resp.text or "").strip()
+
+def chunk_prompt(chunk: str) -> str:
+    return f"""
+Nous sommes dans un portail interne d’agents de l’État.
+Tâche: résumer fidèlement l'extrait ci-dessous d'un document plus long (8-12 lignes).
+Conserver faits, lieux, dates, personnes et chiffres ; pas d’invention, pas de conclusion.
+
+Titre: (extrait)
+Texte:
+{chunk}
+""".strip()
+
+
+def merge_prompt(titre: str, partials, document: str = "contribution") -> str:
+    """ Résumé final à partir des résumés partiels, dans l'ordre du document. """
+    parts = "\n\n".join(f"[Partie {index}]\n{partial}" for index, partial in enumerate(partials, start=1))
+    return f"""
+Nous sommes dans un portail interne d’agents de l’État.
+Tâche: résumer {DOCUMENTS[document]} ci-dessous pour un supérieur hiérarchique.
+Le document étant long, il est fourni sous forme de résumés de ses parties successives.
+
+{RESUME_CONSTRAINTS}
+
+Titre: {titre}
+Texte:
+{parts}
+""".strip()
+
+
+def split_text(text: str, max_chars: int):
+    """
+    Découpe un texte long en morceaux d'au plus max_chars caractères, aux
+    limites de paragraphes (un paragraphe trop long est coupé en fin de
+    phrase). Les frontières dépendent du contenu : un morceau se termine
+    après un paragraphe « marqueur » (empreinte CRC32), si bien qu'une
+    modification locale ne décale pas les morceaux suivants et que leurs
+    résumés en cache restent valables.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(". ", 0, max_chars) + 1 or paragraph.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(piece) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+        if size >= max_chars // 2 and zlib.crc32(piece.encode("utf-8")) % 4 == 0:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class BatchMismatch(ValueError):
+    """ Réponse d'un lot dont les références ne correspondent pas aux contributions envoyées. """
+
+
+_HEADER_LINE = re.compile(r"^[ \t]*(#+|Titre\s*:|Texte\s*:)", re.M | re.I)
+
+
+def quote_headers(text: str) -> str:
+    """ Neutralise les lignes du texte qui imitent l'en-tête d'un bloc du lot ("### ...", "Titre:", "Texte:"). """
+    return _HEADER_LINE.sub(lambda match: "> " + match.group(0).lstrip(), text)
+
+
+def batch_prompt(items, refs) -> str:
+    """ Prompt d'un lot ; refs : {id: référence du bloc}, tirée au hasard pour chaque lot. """
+    blocks = "\n\n".join(
+        f"### Contribution {refs[item['id']]}\nTitre: {quote_headers(item['titre'])}\nTexte:\n{quote_headers(item['contenu'])}"
+        for item in items
+    )
+    return f"""
+Nous sommes dans un portail interne d’agents de l’État.
+Tâche: résumer séparément chacune des contributions ci-dessous pour un supérieur hiérarchique.
+Répondre en JSON : une entrée {{"id", "resume"}} par contribution, "id" reprenant sa référence.
+Chaque "resume" respecte les contraintes suivantes, sans reprendre d'information d'une autre contribution.
+
+{RESUME_CONSTRAINTS}
+
+{blocks}
+""".strip()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_batches(items, token_budget, max_items):
+    """
+    Regroupe les contributions ({"id", "titre", "contenu"}) en lots dont
+    l'entrée et la sortie attendue tiennent dans token_budget jetons.
+    Une contribution dépassant seule le budget forme son propre lot.
+    """
+    batch, used = [], 0
+    for item in items:
+        cost = estimate_tokens(item["titre"]) + estimate_tokens(item["contenu"]) + OUTPUT_TOKENS_PER_ITEM
+        if batch and (used + cost > token_budget or len(batch) >= max_items):
+            yield batch
+            batch, used = [], 0
+        batch.append(item)
+        used += cost
+    if batch:
+        yield batch
+
+
+def _generate(operation: str, prompt: str, **options):
+    """ Appel au modèle instrumenté (latence, erreurs, log structuré) ; voir agents.llm. """
+    start = time.perf_counter()
+    log_fields = {"operation": operation, "model": DEFAULT_MODEL, "prompt_chars": len(prompt)}
+    try:
+        with GEMINI_LATENCY.time(operation=operation):
+            text = llm.generate(prompt, **options)
+    except Exception as exc:
+        GEMINI_ERRORS.inc(operation=operation, error=type(exc).__name__)
+        logger.warning(
+            "llm call failed: %s", type(exc).__name__,
+            extra={**log_fields, "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                   "outcome": "error", "error": type(exc).__name__},
+        )
+        raise
+    logger.info(
+        "llm call ok",
+        extra={**log_fields, "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+               "outcome": "ok", "response_chars": len(text)},
+    )
+    return text
+
+
+def resume_contribution(titre: str, contenu: str, document: str = "contribution") -> str:
+    """
+    Résumé institutionnel (qualité admin / traçabilité), sans inventer.
+    """
+    return _generate("resume_contribution", resume_prompt(titre, contenu, document))
+
+
+def resume_chunk(chunk: str) -> str:
+    return _generate("resume_chunk", chunk_prompt(chunk))
+
+
+def merge_summaries(titre: str, partials, document: str = "contribution") -> str:
+    return _generate("merge_summaries", merge_prompt(titre, partials, document))
+
+
+def stream_resume_contribution(titre: str, contenu: str, document: str = "contribution"):
+    """
+    resume_contribution() en flux : produit le résumé par morceaux au fil de
+    la réponse du modèle (délai du premier morceau mesuré à part).
+    """
+    return stream_prompt("resume_contribution_stream", resume_prompt(titre, contenu, document))
+
+
+def stream_prompt(operation: str, prompt: str):
+    """ Réponse du modèle à `prompt` en flux, instrumentée comme _generate(). """
+    start = time.perf_counter()
+    log_fields = {"operation": operation, "model": DEFAULT_MODEL, "prompt_chars": len(prompt)}
+    response_chars, first_chunk = 0, None
+    try:
+        for chunk in llm.generate_stream(prompt):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+                GEMINI_FIRST_CHUNK.observe(first_chunk, operation=operation)
+            response_chars += len(chunk)
+            yield chunk
+    except Exception as exc:
+        GEMINI_ERRORS.inc(operation=operation, error=type(exc).__name__)
+        logger.warning(
+            "llm call failed: %s", type(exc).__name__,
+            extra={**log_fields, "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                   "outcome": "error", "error": type(exc).__name__},
+        )
+        raise
+    duration = time.perf_counter() - start
+    GEMINI_LATENCY.observe(duration, operation=operation)
+    logger.info(
+        "llm call ok",
+        extra={**log_fields, "duration_ms": round(duration * 1000, 1), "outcome": "ok", "response_chars": response_chars,
+               "first_chunk_ms": round((first_chunk or duration) * 1000, 1)},
+    )
+
+
+def resume_contributions_batch(items) -> dict:
+    """
+    Résume plusieurs contributions ({"id", "titre", "contenu"}) en un seul
+    appel à sortie JSON structurée : {id: résumé}. Les contributions absentes
+    de la réponse (ou à résumé vide) ne figurent pas dans le résultat.
+
+    Chaque bloc porte une référence aléatoire propre au lot (et non l'id) :
+    un texte ne peut pas désigner une autre contribution. Une réponse
+    contenant une référence inconnue ou répétée lève BatchMismatch.
+    """
+    token = secrets.token_hex(4)
+    refs = {item["id"]: f"{token}-{index}" for index, item in enumerate(items, start=1)}
+    text = _generate(
+        "resume_contributions_batch", batch_prompt(items, refs),
+        json_schema=BATCH_SCHEMA, max_output_tokens=OUTPUT_TOKENS_PER_ITEM * len(items) + 100,
+    )
+    try:
+        entries = json.loads(text)
+    except ValueError as exc:
+        raise ValueError("Réponse JSON invalide du modèle.") from exc
+    ids = {ref: item_id for item_id, ref in refs.items()}
+    summaries, seen = {}, set()
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        ref, summary = str(entry.get("id")), str(entry.get("resume") or "").strip()
+        if ref not in ids or ref in seen:
+            raise BatchMismatch(f"Référence inattendue dans la réponse du lot : {ref[:40]!r}.")
+        seen.add(ref)
+        if summary:
+            summaries[ids[ref]] = summary
+    return summaries
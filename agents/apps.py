@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AgentsConfig(AppConfig):
     name = 'agents'
+
+    def ready(self):
+        from . import signals  # noqa: F401
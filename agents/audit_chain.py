@@ -0,0 +1,170 @@
+"""
+Chaînage cryptographique du journal d'audit.
+
+Chaque entrée AuditLog stocke le hash de l'entrée précédente (prev_hash) et
+son propre hash (entry_hash). Toute modification ou suppression faite
+directement en base casse la chaîne et est détectée par la vérification.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from datetime import timezone as dt_timezone
+
+from django.db import connections, transaction
+
+from .jsonlog import get_request_id
+from .metrics import AUDIT_ENTRIES_WRITTEN
+
+GENESIS_HASH = "0" * 64
+
+# Identifiant du verrou consultatif PostgreSQL sérialisant les écritures de la chaîne
+CHAIN_LOCK_KEY = 7_262_015
+
+# Colonnes lues par le vérificateur (dans cet ordre)
+CHAIN_FIELDS = (
+    "id", "prev_hash", "entry_hash", "timestamp", "user_id", "action", "target_repr", "ip_address", "request_id",
+)
+
+
+def compute_entry_hash(prev_hash, timestamp, user_id, action, target_repr, ip_address, request_id=""):
+    """
+    Hash SHA-256 d'une entrée, calculé sur une représentation canonique.
+    L'identifiant de requête n'entre dans le hash que s'il est renseigné,
+    ce qui laisse valides les entrées antérieures à son introduction.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(dt_timezone.utc)
+    payload = "\x1f".join((
+        prev_hash,
+        timestamp.isoformat(),
+        "" if user_id is None else str(user_id),
+        action or "",
+        target_repr or "",
+        ip_address or "",
+    ))
+    if request_id:
+        payload += "\x1f" + request_id
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def lock_chain(using="default"):
+    """
+    Sérialise les écritures concurrentes de la chaîne (à appeler dans une transaction).
+    SQLite sérialise déjà les écritures ; PostgreSQL utilise un verrou consultatif.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHAIN_LOCK_KEY])
+
+
+def chain_head(queryset):
+    """ Hash de la dernière entrée de la chaîne (ou GENESIS_HASH si vide). """
+    head = queryset.order_by("-id").values_list("entry_hash", flat=True).first()
+    return head or GENESIS_HASH
+
+
+def seal_entries(entries, prev_hash):
+    """
+    Calcule prev_hash / entry_hash pour une liste d'entrées non sauvegardées,
+    dans l'ordre où elles seront insérées. Retourne le hash de la dernière.
+    """
+    ip_field = None
+    for entry in entries:
+        if ip_field is None:
+            ip_field = entry._meta.get_field("ip_address")
+        if not entry.request_id:
+            entry.request_id = get_request_id()
+        entry.prev_hash = prev_hash
+        entry.entry_hash = compute_entry_hash(
+            prev_hash,
+            entry.timestamp,
+            entry.user_id,
+            entry.action,
+            entry.target_repr,
+            ip_field.get_prep_value(entry.ip_address),
+            entry.request_id,
+        )
+        prev_hash = entry.entry_hash
+    return prev_hash
+
+
+def append_entries(queryset, entries, insert):
+    """
+    Chemin d'écriture unique (save et bulk_create) : verrouille la chaîne,
+    scelle les entrées à partir de la tête courante puis appelle insert().
+    """
+    using = queryset.db
+    with transaction.atomic(using=using):
+        lock_chain(using)
+        seal_entries(entries, chain_head(queryset))
+        result = insert()
+        count = len(entries)
+        transaction.on_commit(lambda: AUDIT_ENTRIES_WRITTEN.inc(count), using=using)
+        return result
+
+
+@dataclass
+class ChainSegmentResult:
+    """ Résultat de la vérification d'un segment [after_id, until_id]. """
+    after_id: int
+    until_id: int
+    first_prev_hash: str = None
+    last_id: int = None
+    last_hash: str = None
+    count: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def verify_segment(after_id=0, until_id=None, expected_prev_hash=None, chunk_size=20000,
+                   max_errors=20, on_chunk=None, using="default"):
+    """
+    Vérifie les entrées d'id > after_id (et <= until_id) par blocs successifs.
+
+    - expected_prev_hash: hash attendu pour la première entrée. S'il vaut None,
+      le prev_hash stocké est accepté tel quel et renvoyé dans first_prev_hash
+      pour que l'appelant raccorde les segments entre eux.
+    - on_chunk(last_id, last_hash): rappel après chaque bloc (points de reprise).
+    """
+    from .models import AuditLog
+
+    result = ChainSegmentResult(after_id=after_id, until_id=until_id)
+    base = AuditLog.objects.using(using).order_by("id")
+    if until_id is not None:
+        base = base.filter(id__lte=until_id)
+
+    prev_hash = expected_prev_hash
+    result.first_prev_hash = expected_prev_hash
+    cursor_id = after_id
+    while True:
+        rows = list(base.filter(id__gt=cursor_id).values_list(*CHAIN_FIELDS)[:chunk_size])
+        if not rows:
+            break
+        for pk, stored_prev, stored_hash, timestamp, user_id, action, target_repr, ip_address, request_id in rows:
+            if prev_hash is None:
+                prev_hash = stored_prev
+                result.first_prev_hash = stored_prev
+            if stored_prev != prev_hash:
+                result.errors.append((pk, "prev_hash ne correspond pas à l'entrée précédente"))
+            expected = compute_entry_hash(
+                stored_prev, timestamp, user_id, action, target_repr, ip_address, request_id
+            )
+            if stored_hash != expected:
+                result.errors.append((pk, "entry_hash invalide (contenu modifié)"))
+            prev_hash = stored_hash
+            result.count += 1
+            if len(result.errors) >= max_errors:
+                break
+        cursor_id = pk
+        result.last_id = cursor_id
+        result.last_hash = prev_hash
+        if len(result.errors) >= max_errors:
+            break
+        if on_chunk is not None and result.ok:
+            on_chunk(cursor_id, prev_hash)
+        if len(rows) < chunk_size:
+            break
+    return result
@@ -0,0 +1,838 @@
+"""
+Briefing de la Présidence : calcul des panneaux.
+
+Chaque panneau est une fonction indépendante `panel(now) -> dict` (clés du
+contexte du template). Les panneaux ne dépendent pas les uns des autres :
+la vue synchrone les calcule à la suite, la vue asynchrone en parallèle
+(acompute_panels). Seules la synthèse IA et le focus 72h combinent des
+résultats, dans assemble_context().
+
+Les effets de bord (journal d'audit, accusés de lecture CNS) sont faits
+avant le calcul des panneaux, dans record_briefing_access().
+"""
+import asyncio
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connections
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .events import publish_event
+from .fragments import Fragment
+from .models import Agent, AuditLog, CNSAvis, Contribution, Decision, FieldObservation, Mission, RecoupementTicket
+from .perf import current_request_stats
+from .security import has_role, is_chef_service, is_cns, is_presidence
+from .services import get_weak_signals
+from .utils import compute_agent_score
+
+
+# --- Panneaux ---
+
+def national_status_panel(now):
+    last_24h = now - timedelta(hours=24)
+    last_3d = now - timedelta(days=3)
+    last_7d = now - timedelta(days=7)
+
+    total_validated_24h = Contribution.objects.filter(statut="VALIDATED", date_creation__gte=last_24h).count()
+    total_rejected_7d = Contribution.objects.filter(statut="REJECTED", date_creation__gte=last_7d).count()
+    # Missions FAILED créées ou terminées/échouées dans les 7 derniers jours
+    missions_failed_active_7d = Mission.objects.filter(status="FAILED", created_at__gte=last_7d).count()
+    contributions_submitted_pending = Contribution.objects.filter(
+        statut="SUBMITTED",
+        date_creation__lt=last_3d
+    ).count()
+
+    national_status = "STABLE"
+    national_status_color = "green"
+    national_status_summary = "La situation nationale est stable. Aucun indicateur critique n'est signalé. Une surveillance proactive est maintenue."
+
+    if missions_failed_active_7d >= 2 or total_validated_24h >= 15: # Critical if too many validated or failed missions
+        national_status = "CRITIQUE"
+        national_status_color = "red"
+        national_status_summary = "La situation nationale est CRITIQUE. Des signaux d'alerte élevés nécessitent une attention immédiate. Réévaluation des protocoles en cours."
+    elif contributions_submitted_pending >= 5 or total_rejected_7d >= 5:
+        national_status = "SOUS TENSION"
+        national_status_color = "orange"
+        national_status_summary = "La situation nationale est sous tension. Plusieurs indicateurs nécessitent une observation renforcée. Des actions correctives sont envisagées."
+
+    return {
+        "national_status": national_status,
+        "national_status_color": national_status_color,
+        "national_status_summary": national_status_summary,
+    }
+
+
+def alerts_panel(now):
+    last_7d = now - timedelta(days=7)
+    alert_level = "GREEN"
+    alert_reasons = []
+
+    # RED conditions
+    red_failed_missions_count = Mission.objects.filter(
+        status="FAILED", completed_at__gte=last_7d
+    ).count()
+    red_rejected_contributions_count = Contribution.objects.filter(
+        statut="REJECTED", validated_at__gte=now - timedelta(hours=48)
+    ).count()
+
+    if red_failed_missions_count >= 1: # au moins 1 Mission status='FAILED' sur les 7 derniers jours
+        alert_level = "RED"
+        alert_reasons.append(f"{red_failed_missions_count} mission(s) échouée(s) récemment ({red_failed_missions_count} en 7j).")
+
+    if red_rejected_contributions_count >= 3: # au moins 3 Contributions refusées sur les 48 dernières heures
+        alert_level = "RED"
+        alert_reasons.append(f"{red_rejected_contributions_count} contribution(s) refusée(s) en 48h.")
+
+    # ORANGE conditions (si pas déjà RED)
+    if alert_level != "RED":
+        orange_pending_contributions_count = Contribution.objects.filter(
+            statut="SUBMITTED",
+            date_creation__gte=now - timedelta(hours=48),
+            date_creation__lt=now - timedelta(hours=6) # Considéré "en attente" si soumis il y a plus de 6h
+        ).count()
+
+        orange_overdue_missions_count = Mission.objects.filter(
+            due_date__lt=now.date(), # Comparer date avec date
+            status__in=['PENDING', 'IN_PROGRESS']
+        ).count()
+
+        if orange_pending_contributions_count >= 5: # au moins 5 Contributions "en attente" sur les 48 dernières heures
+            alert_level = "ORANGE"
+            alert_reasons.append(f"{orange_pending_contributions_count} contribution(s) soumise(s) en attente depuis >6h.")
+
+        if orange_overdue_missions_count >= 2: # au moins 2 Missions en retard
+            alert_level = "ORANGE"
+            alert_reasons.append(f"{orange_overdue_missions_count} mission(s) en retard.")
+
+    # Si aucune alerte ORANGE ou RED
+    if not alert_reasons:
+        alert_reasons.append("Aucune alerte significative. Opérations normales.")
+
+    return {"alert_level": alert_level, "alert_reasons": alert_reasons}
+
+
+def kpis_panel(now):
+    last_24h = now - timedelta(hours=24)
+    last_7d = now - timedelta(days=7)
+
+    kpi_contributions_validated_24h = Contribution.objects.filter(statut="VALIDATED", date_creation__gte=last_24h).count()
+    kpi_contributions_validated_7d = Contribution.objects.filter(statut="VALIDATED", date_creation__gte=last_7d).count()
+
+    kpi_missions_pending = Mission.objects.filter(status="PENDING").count()
+    kpi_missions_in_progress = Mission.objects.filter(status="IN_PROGRESS").count()
+    kpi_missions_completed_7d = Mission.objects.filter(status="COMPLETED", completed_at__gte=last_7d).count()
+    kpi_missions_failed_7d = Mission.objects.filter(status="FAILED", completed_at__gte=last_7d).count()
+
+    # Score global
+    all_agents = Agent.objects.all()
+    if all_agents.exists():
+        global_scores = [compute_agent_score(agent) for agent in all_agents]
+        global_score_avg = sum(global_scores) / len(global_scores)
+    else:
+        global_score_avg = 0
+
+    kpis_data = {
+        "contrib_submitted_24h": Contribution.objects.filter(statut="SUBMITTED", date_creation__gte=last_24h).count(),
+        "contrib_validated_24h": kpi_contributions_validated_24h,
+        "contrib_rejected_24h": Contribution.objects.filter(statut="REJECTED", validated_at__gte=last_24h).count(),
+        "missions_in_progress": kpi_missions_in_progress,
+        "missions_critical": Mission.objects.filter(
+            priority=4, # Assuming priority 4 is 'Critique'
+            status__in=['PENDING', 'IN_PROGRESS']
+        ).count(),
+        # Événements audit sensibles (LOGIN + REJECT_CONTRIBUTION dans les dernières 24h)
+        "sensitive_audit_events_24h": AuditLog.objects.filter(
+            action__in=['LOGIN', 'REJECT_CONTRIBUTION'],
+            timestamp__gte=last_24h
+        ).count(),
+        "global_score_avg": round(global_score_avg) if global_score_avg else 0,
+    }
+
+    return {
+        "kpi_contributions_validated_24h": kpi_contributions_validated_24h,
+        "kpi_contributions_validated_7d": kpi_contributions_validated_7d,
+        "kpi_missions_pending": kpi_missions_pending,
+        "kpi_missions_in_progress": kpi_missions_in_progress,
+        "kpi_missions_completed_7d": kpi_missions_completed_7d,
+        "kpi_missions_failed_7d": kpi_missions_failed_7d,
+        "global_score_avg": round(global_score_avg) if global_score_avg else 0,
+        "kpis": kpis_data,
+    }
+
+
+def timeline_panel(now):
+    timeline_events = []
+    recent_logs = AuditLog.objects.filter(timestamp__gte=now - timedelta(hours=72)).select_related('user').prefetch_related('user__groups')
+    for log_item in recent_logs.order_by('-timestamp')[:10]: # 10 événements max
+        event_type = "SYSTÈME"
+        event_level = "INFO"
+        event_description = log_item.target_repr or log_item.get_action_display()
+
+        # Determine type/source based on user groups or action
+        if log_item.user and log_item.user.is_superuser:
+            event_type = "SUPERUSER"
+        elif has_role(log_item.user, "CHEF_SERVICE"):
+            event_type = "CHEF"
+        elif log_item.user:
+            event_type = "AGENT"
+
+        # Determine level based on action
+        if log_item.action in ['REJECT_CONTRIBUTION', 'FAILED_MISSION']:
+            event_level = "CRITICAL"
+        elif log_item.action in ['SUBMIT_CONTRIBUTION', 'UPDATE_MISSION']:
+            event_level = "WARNING"
+
+        timeline_events.append({
+            'timestamp': log_item.timestamp,
+            'user': log_item.user,
+            'action_display': log_item.get_action_display(),
+            'target_repr': log_item.target_repr,
+            'ip_address': log_item.ip_address,
+            'event_type': event_type,
+            'event_description': event_description,
+            'event_level': event_level,
+        })
+    return {"timeline_events": timeline_events}
+
+
+def latest_decisions_panel(now):
+    return {"latest_decisions": list(Decision.objects.all().select_related('created_by').order_by('-created_at')[:5])}
+
+
+def zone_map_panel(now):
+    """ Carte RDC stylée (simplifiée) : niveau par zone selon les contributions validées 7j. """
+    last_7d = now - timedelta(days=7)
+    zone_data = {
+        "kinshasa": {"level": "green", "label": "Kinshasa", "count": 0},
+        "est": {"level": "orange", "label": "Est", "count": 0},
+        "ouest": {"level": "green", "label": "Ouest", "count": 0},
+        "nord": {"level": "green", "label": "Nord", "count": 0},
+        "sud": {"level": "red", "label": "Sud", "count": 0},
+        "centre": {"level": "green", "label": "Centre", "count": 0},
+    }
+    keywords_to_zones = {
+        'kinshasa': ['kinshasa', 'capitale'],
+        'est': ['est', 'kivu', 'ituri', 'bunia'],
+        'ouest': ['ouest', 'kongo', 'matadi'],
+        'nord': ['nord', 'kisangani'],
+        'sud': ['sud', 'lubumbashi', 'katanga'],
+        'centre': ['centre', 'kasai'],
+    }
+
+    for zone_key, keywords in keywords_to_zones.items():
+        zone_contrib_count = Contribution.objects.filter(
+            statut="VALIDATED",
+            date_creation__gte=last_7d,
+            contenu__icontains=keywords[0] # Simplification, devrait boucler sur tous les keywords
+        ).count()
+        zone_data[zone_key]['count'] = zone_contrib_count
+        if zone_contrib_count > 3: # Exemple de règle
+            zone_data[zone_key]['level'] = "red"
+        elif zone_contrib_count > 1:
+            zone_data[zone_key]['level'] = "orange"
+        else:
+            zone_data[zone_key]['level'] = "green"
+    return {"zone_data": zone_data}
+
+
+ZONE_PROVINCES = {
+    "EST": ["Nord-Kivu", "Sud-Kivu", "Ituri", "Maniema"],
+    "NORD": ["Bas-Uele", "Haut-Uele", "Tshopo"],
+    "CENTRE": ["Kasai", "Kasai-Central", "Kasai-Oriental", "Lomami", "Sankuru"],
+    "OUEST": ["Kinshasa", "Kongo-Central", "Kwango", "Kwilu", "Mai-Ndombe", "Mongala", "Nord-Ubangi", "Sud-Ubangi", "Equateur", "Tshuapa"],
+    "SUD": ["Haut-Katanga", "Lualaba", "Haut-Lomami", "Tanganyika"],
+}
+
+
+def _province_variants(name):
+    lower = name.lower()
+    return {
+        lower,
+        lower.replace("-", " "),
+        lower.replace(" ", "-"),
+    }
+
+
+def _province_q_for_contrib(province):
+    q = Q()
+    for variant in _province_variants(province):
+        q |= Q(titre__icontains=variant) | Q(contenu__icontains=variant)
+    return q
+
+
+def _province_q_for_obs(province):
+    q = Q()
+    for variant in _province_variants(province):
+        q |= Q(zone__icontains=variant)
+    return q
+
+
+def zone_evolution_panel(now):
+    last_7d = now - timedelta(days=7)
+    last_14d = now - timedelta(days=14)
+    zone_evolution = {}
+    for zone_name, provinces in ZONE_PROVINCES.items():
+        zone_contrib_q = Q()
+        zone_obs_q = Q()
+        for province in provinces:
+            zone_contrib_q |= _province_q_for_contrib(province)
+            zone_obs_q |= _province_q_for_obs(province)
+
+        contrib_7d = Contribution.objects.filter(date_creation__gte=last_7d).filter(zone_contrib_q)
+        contrib_prev = Contribution.objects.filter(date_creation__gte=last_14d, date_creation__lt=last_7d).filter(zone_contrib_q)
+        obs_7d = FieldObservation.objects.filter(created_at__gte=last_7d).filter(zone_obs_q)
+        obs_prev = FieldObservation.objects.filter(created_at__gte=last_14d, created_at__lt=last_7d).filter(zone_obs_q)
+
+        incidents_7d = contrib_7d.count() + obs_7d.count()
+        incidents_prev7d = contrib_prev.count() + obs_prev.count()
+
+        if incidents_7d > incidents_prev7d:
+            trend = "hausse"
+        elif incidents_7d < incidents_prev7d:
+            trend = "baisse"
+        else:
+            trend = "stable"
+
+        if incidents_7d >= 10:
+            risk = "critique"
+        elif incidents_7d >= 6:
+            risk = "eleve"
+        elif incidents_7d >= 3:
+            risk = "modere"
+        else:
+            risk = "faible"
+
+        signal_counter = Counter()
+        signal_counter.update([title.strip() for title in contrib_7d.values_list("titre", flat=True) if title and title.strip()])
+        signal_counter.update([subject.strip() for subject in obs_7d.values_list("subject", flat=True) if subject and subject.strip()])
+        top_signals = [item for item, _ in signal_counter.most_common(3)]
+
+        province_counts = []
+        for province in provinces:
+            province_count = contrib_7d.filter(_province_q_for_contrib(province)).count()
+            province_count += obs_7d.filter(_province_q_for_obs(province)).count()
+            province_counts.append((province, province_count))
+        province_counts = sorted(province_counts, key=lambda item: item[1], reverse=True)
+        hotspots = [name for name, count in province_counts if count > 0][:3]
+
+        if trend == "hausse" and risk in ["eleve", "critique"]:
+            projection_7d = "Risque d aggravation sur les 7 prochains jours."
+        else:
+            projection_7d = "Situation sous controle relatif."
+
+        if risk in ["eleve", "critique"]:
+            recommendation = "Renforcer la surveillance regionale."
+        elif risk == "modere":
+            recommendation = "Maintenir la vigilance renforcee."
+        else:
+            recommendation = "Maintenir la vigilance."
+
+        insufficient = incidents_7d == 0 and incidents_prev7d == 0 and not top_signals and not hotspots
+
+        zone_evolution[zone_name] = {
+            "trend": trend,
+            "risk": risk,
+            "incidents_7d": incidents_7d,
+            "incidents_prev7d": incidents_prev7d,
+            "top_signals": top_signals,
+            "hotspots": hotspots,
+            "projection_7d": projection_7d,
+            "recommendation": recommendation,
+            "insufficient": insufficient,
+        }
+    return {"zone_evolution": zone_evolution}
+
+
+def weak_signals_panel(now):
+    return {"weak_signals": get_weak_signals(last_hours=72, limit=5)}
+
+
+def executive_panel(now):
+    """ Tableau exécutif : KPI Présidence, réaction de l'État, focus 72h. """
+    last_72h = now - timedelta(hours=72)
+    active_recoupements = RecoupementTicket.objects.filter(status__in=['OPEN', 'IN_PROGRESS'])
+    active_missions = Mission.objects.filter(status__in=['PENDING', 'IN_PROGRESS'])
+
+    # A6.1 — KPI PRESIDENT (line of cards)
+    kpi_presidence = {
+        "contributions_received_72h": Contribution.objects.filter(date_creation__gte=last_72h).count(),
+        "contributions_validated_72h": Contribution.objects.filter(statut="VALIDATED", date_creation__gte=last_72h).count(),
+        "recoupements_open": active_recoupements.count(),
+        "recoupements_overdue": sum(1 for ticket in active_recoupements if ticket.is_overdue),
+        "missions_active": active_missions.count(),
+    }
+    # KPI6: Délai moyen de réaction (en heures) - Temporairement désactivé pour éviter FieldError sur 'responses'
+    kpi_presidence["avg_reaction_time_h"] = "N/A"
+
+    # A6.2 — “RÉACTION DE L’ÉTAT” (central block)
+    state_reaction = {
+        "overdue_count": kpi_presidence["recoupements_overdue"],
+        "overdue_message": "Action requise" if kpi_presidence["recoupements_overdue"] > 0 else "Aucun recoupement en retard",
+        "in_progress_recoupements": active_recoupements.filter(status='IN_PROGRESS').count(),
+        "escalated_missions": Mission.objects.filter(related_recoupement__isnull=False, created_at__gte=last_72h).count(),
+        "services_under_pressure": []
+    }
+
+    # Top 3 services with most overdue recoupements
+    services_overdue_counts = RecoupementTicket.objects.filter(
+        status__in=['OPEN', 'IN_PROGRESS'],
+        created_at__gte=last_72h,
+    ).values('service_id', 'service__nom').annotate(
+        total_tickets=Count('id')
+    ).order_by('-total_tickets')
+
+    service_overdue_list = []
+    for entry in services_overdue_counts:
+        if entry['service_id']: # Ensure service is linked
+            service_tickets = RecoupementTicket.objects.filter(
+                service_id=entry['service_id'],
+                status__in=['OPEN', 'IN_PROGRESS']
+            )
+            overdue_in_service = sum(1 for ticket in service_tickets if ticket.is_overdue)
+            if overdue_in_service > 0:
+                service_overdue_list.append({
+                    'name': entry['service__nom'],
+                    'overdue_count': overdue_in_service
+                })
+    state_reaction["services_under_pressure"] = sorted(service_overdue_list, key=lambda x: x['overdue_count'], reverse=True)[:3]
+
+    # A6.3 — Focus 72h (top listes) ; top_weak_signals complété par assemble_context()
+    focus_72h = {
+        "top_themes": [],
+        "top_zones": [],
+        "top_weak_signals": [],
+    }
+
+    # Top Themes from RecoupementTicket keywords and Contribution content
+    all_keywords_72h = []
+    for ticket in RecoupementTicket.objects.filter(created_at__gte=last_72h):
+        if ticket.keywords:
+            all_keywords_72h.extend([k.strip().lower() for k in ticket.keywords.split(',') if k.strip()])
+    for contrib in Contribution.objects.filter(date_creation__gte=last_72h):
+        all_keywords_72h.extend([k.strip().lower() for k in contrib.titre.split() + contrib.contenu.split() if k.strip() and len(k.strip()) >= 4])
+
+    keyword_counts = {}
+    for keyword in all_keywords_72h:
+        keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
+
+    sorted_keywords = sorted(keyword_counts.items(), key=lambda item: item[1], reverse=True)
+    focus_72h["top_themes"] = [k for k, v in sorted_keywords if v > 1][:5] # Seulement ceux qui apparaissent plus d'une fois
+
+    # Top Zones (from service of assigned_agents/created_by for active recoupements)
+    all_zones_72h = []
+    for ticket in active_recoupements.filter(created_at__gte=last_72h).prefetch_related('assigned_agents__agent__service', 'created_by__agent__service'):
+        if ticket.created_by and hasattr(ticket.created_by, 'agent') and ticket.created_by.agent.service:
+            all_zones_72h.append(ticket.created_by.agent.service.nom)
+        for user in ticket.assigned_agents.all():
+            if hasattr(user, 'agent') and user.agent.service:
+                all_zones_72h.append(user.agent.service.nom)
+
+    zone_counts = {}
+    for zone in all_zones_72h:
+        zone_counts[zone] = zone_counts.get(zone, 0) + 1
+
+    sorted_zones = sorted(zone_counts.items(), key=lambda item: item[1], reverse=True)
+    focus_72h["top_zones"] = [z for z, v in sorted_zones if v > 0][:5] # Top 5 zones avec au moins un recoupement
+
+    return {"kpi_presidence": kpi_presidence, "state_reaction": state_reaction, "focus_72h": focus_72h}
+
+
+def institutional_actions_panel(now):
+    """ A6.4 — Table “Dernières actions institutionnelles” (72h). """
+    last_72h = now - timedelta(hours=72)
+    institutional_actions = []
+
+    # Missions from recoupement (escalations)
+    for mission in Mission.objects.filter(related_recoupement__isnull=False, created_at__gte=last_72h).select_related('created_by', 'agent_assigned', 'related_recoupement').order_by('-created_at')[:12]:
+        institutional_actions.append({
+            'date': mission.created_at,
+            'type': 'MISSION',
+            'objet': f"Mission #{mission.id}: {mission.titre}",
+            'actor': mission.created_by.username if mission.created_by else "N/A",
+            'status': mission.get_status_display(),
+            'level': mission.related_recoupement.level if mission.related_recoupement else 'INFO',
+        })
+
+    # Recoupement Tickets
+    for ticket in RecoupementTicket.objects.filter(created_at__gte=last_72h).select_related('created_by').order_by('-created_at')[:12]:
+        institutional_actions.append({
+            'date': ticket.created_at,
+            'type': 'REC',
+            'objet': f"Recoupement #{ticket.id}: {ticket.title}",
+            'actor': ticket.created_by.username if ticket.created_by else "N/A",
+            'status': ticket.get_status_display(),
+            'level': ticket.level,
+        })
+
+    # Decisions
+    for decision in Decision.objects.filter(created_at__gte=last_72h).select_related('created_by').order_by('-created_at')[:12]:
+        institutional_actions.append({
+            'date': decision.created_at,
+            'type': 'DECISION',
+            'objet': f"Décision #{decision.id}: {decision.title}",
+            'actor': decision.created_by.username if decision.created_by else "N/A",
+            'status': decision.get_decision_display(),
+            'level': 'INFO', # Default level for decisions
+        })
+
+    # Trier toutes les actions par date
+    return {"institutional_actions": sorted(institutional_actions, key=lambda x: x['date'], reverse=True)[:12]}
+
+
+def cns_traceability_panel(now):
+    """ Traçabilité stratégique (7 jours) - synthèse lecture CNS. """
+    trace_window_start = now - timedelta(days=7)
+    transmit_logs = list(
+        AuditLog.objects.filter(
+            action="TRANSMIT",
+            timestamp__gte=trace_window_start,
+            target_repr__startswith="CNSAvis"
+        ).order_by("timestamp")
+    )
+    read_logs = list(
+        AuditLog.objects.filter(
+            action="READ",
+            timestamp__gte=trace_window_start,
+            target_repr__startswith="CNSAvis"
+        ).order_by("timestamp")
+    )
+    read_by_target = {}
+    for log in read_logs:
+        if log.target_repr and log.target_repr not in read_by_target:
+            read_by_target[log.target_repr] = log
+
+    matched_delays = []
+    for log in transmit_logs:
+        read_log = read_by_target.get(log.target_repr)
+        if read_log:
+            matched_delays.append(read_log.timestamp - log.timestamp)
+
+    avg_delay_minutes = None
+    if matched_delays:
+        total_seconds = sum(delay.total_seconds() for delay in matched_delays)
+        avg_delay_minutes = int(total_seconds // len(matched_delays) // 60)
+
+    trace_read_rate = 0
+    if transmit_logs:
+        trace_read_rate = int((len(read_by_target) / len(transmit_logs)) * 100)
+
+    return {
+        "cns_avis_recent": list(CNSAvis.objects.filter(status="SENT")[:5]),
+        "trace_transmit_count": len(transmit_logs),
+        "trace_read_count": len(read_by_target),
+        "trace_avg_delay_minutes": avg_delay_minutes,
+        "trace_last_read": read_logs[-1] if read_logs else None,
+        "trace_read_rate": trace_read_rate,
+    }
+
+
+PANELS = {
+    "national_status": national_status_panel,
+    "alerts": alerts_panel,
+    "kpis": kpis_panel,
+    "timeline": timeline_panel,
+    "latest_decisions": latest_decisions_panel,
+    "zone_map": zone_map_panel,
+    "zone_evolution": zone_evolution_panel,
+    "weak_signals": weak_signals_panel,
+    "executive": executive_panel,
+    "institutional_actions": institutional_actions_panel,
+    "cns_traceability": cns_traceability_panel,
+}
+
+
+# --- Calcul (séquentiel / concurrent) ---
+
+def compute_panels(now, names=None):
+    """ Calcule les panneaux demandés (tous par défaut) à la suite. """
+    return {name: PANELS[name](now) for name in (names or PANELS)}
+
+
+# Threads dédiés aux panneaux : chacun garde sa connexion DB d'un briefing
+# à l'autre (CONN_MAX_AGE), au plus MBONGI_BRIEFING_CONCURRENCY par process.
+_panel_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "MBONGI_BRIEFING_CONCURRENCY", 6), thread_name_prefix="mbongi-panel",
+)
+
+
+def _run_panel_in_thread(name, now):
+    """
+    Exécute un panneau dans un thread du pool : les requêtes SQL sont
+    comptées dans les statistiques de la requête HTTP. La connexion du
+    thread est conservée, sauf si elle est inutilisable ou a dépassé
+    CONN_MAX_AGE (comme entre deux requêtes HTTP).
+    """
+    stats = current_request_stats()
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            if stats is not None:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(stats.sql_wrapper))
+            return PANELS[name](now)
+    finally:
+        close_old_connections()
+
+
+async def acompute_panels(now, names=None):
+    """
+    Calcule les panneaux en parallèle dans le pool dédié, chacun dans son
+    thread et avec sa connexion DB : la durée totale tend vers celle du
+    panneau le plus lent.
+    """
+    names = list(names or PANELS)
+    run = sync_to_async(_run_panel_in_thread, thread_sensitive=False, executor=_panel_executor)
+    results = await asyncio.gather(*(run(name, now) for name in names))
+    return dict(zip(names, results))
+
+
+# --- Effets de bord et assemblage ---
+
+def record_briefing_access(request):
+    """
+    Journalise l'accès au briefing et marque comme lus les avis CNS en
+    attente (avant le calcul de la traçabilité, qui en tient compte).
+    """
+    ip_address = request.META.get("REMOTE_ADDR")
+    AuditLog.objects.bulk_create([
+        AuditLog(user=request.user, action="VIEW_PRESIDENCE_BRIEFING", target_repr="Présidence briefing", ip_address=ip_address),
+        AuditLog(user=request.user, action="VIEW_RDC_MAP_STATUS", target_repr="Carte RDC sur briefing Présidence", ip_address=ip_address),
+    ])
+
+    # Read receipt Chef sur chargement briefing
+    if is_chef_service(request.user) or is_presidence(request.user):
+        unread_ids = list(CNSAvis.objects.filter(status__in=["SENT", "TRANSMITTED"], read_at__isnull=True).values_list("id", flat=True))
+        if unread_ids:
+            CNSAvis.objects.filter(id__in=unread_ids, read_at__isnull=True).update(read_at=timezone.now())
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    user=request.user,
+                    action="READ",
+                    target_repr=f"CNSAvis #{avis.id} - {avis.title}",
+                    ip_address=ip_address,
+                )
+                for avis in CNSAvis.objects.filter(id__in=unread_ids)
+            ])
+
+
+# --- Instantanés (BriefingSnapshot) : données figées pour les exports PDF ---
+
+def snapshot_data(now):
+    """ Données du briefing sérialisables en JSON (BriefingSnapshot.data). """
+    data = {"generated_at": now}
+    data.update(national_status_panel(now))
+    data.update(alerts_panel(now))
+    data.update(kpis_panel(now))
+    data.update(ai_synthesis(data["national_status"], data))
+    data.update(zone_evolution_panel(now))
+    data.update(weak_signals_panel(now))
+    data.update(institutional_actions_panel(now))
+    data.update(executive_panel(now))
+    data["focus_72h"]["top_weak_signals"] = data["weak_signals"]
+    data["timeline_events"] = [
+        {
+            "timestamp": event["timestamp"],
+            "user": event["user"].username if event["user"] else None,
+            "event_type": event["event_type"],
+            "event_level": event["event_level"],
+            "action_display": event["action_display"],
+            "target_repr": event["target_repr"],
+        }
+        for event in timeline_panel(now)["timeline_events"]
+    ]
+    # Dernières validations / rejets (journal d'audit)
+    data["latest_decisions"] = [
+        {
+            "timestamp": log.timestamp,
+            "user": log.user.username if log.user else None,
+            "action_display": log.get_action_display(),
+            "target_repr": log.target_repr,
+        }
+        for log in AuditLog.objects.filter(
+            action__in=['VALIDATE_CONTRIBUTION', 'REJECT_CONTRIBUTION']
+        ).select_related('user').order_by('-timestamp')[:5]
+    ]
+    return data
+
+
+# --- Événements temps réel (agents.events, flux SSE du briefing) ---
+
+BRIEFING_CHANNEL = "briefing"
+
+_WATCH_LOCK_KEY = "mbongi:briefing:watch"
+_ALERT_LEVEL_KEY = "mbongi:briefing:alert_level"
+_OVERDUE_WATERMARK_KEY = "mbongi:briefing:overdue_watermark"
+
+
+def cns_avis_event(avis):
+    return {
+        "id": avis.pk,
+        "title": avis.title,
+        "content": avis.content[:140],
+        "urgency": avis.urgency,
+        "urgency_display": avis.get_urgency_display(),
+        "date": timezone.localtime(avis.created_at).strftime("%d/%m %H:%M"),
+        "author": avis.created_by.username if avis.created_by_id else "N/A",
+    }
+
+
+def decision_event(decision):
+    return {
+        "id": decision.pk,
+        "title": decision.title[:50],
+        "decision": decision.decision,
+        "decision_display": decision.get_decision_display(),
+        "level": decision.level,
+        "date": timezone.localtime(decision.created_at).strftime("%d/%m %H:%M"),
+        "author": decision.created_by.username if decision.created_by_id else "N/A",
+    }
+
+
+def watch_briefing_state(now=None):
+    """
+    Contrôles périodiques publiés sur le canal du briefing : changement du
+    niveau d'alerte et recoupements passés en retard. Exécuté au plus une
+    fois par MBONGI_BRIEFING_WATCH_SECONDS, tous workers confondus (verrou
+    cache.add), depuis la boucle des flux SSE ouverts.
+    """
+    interval = getattr(settings, "MBONGI_BRIEFING_WATCH_SECONDS", 15)
+    if not cache.add(_WATCH_LOCK_KEY, 1, interval):
+        return
+    now = now or timezone.now()
+
+    alerts = alerts_panel(now)
+    previous = cache.get(_ALERT_LEVEL_KEY)
+    if previous != alerts["alert_level"]:
+        cache.set(_ALERT_LEVEL_KEY, alerts["alert_level"], None)
+        if previous is not None:
+            publish_event(BRIEFING_CHANNEL, "alert_level", {
+                "level": alerts["alert_level"], "previous": previous, "reasons": alerts["alert_reasons"],
+            })
+
+    # Tickets dont l'échéance est passée depuis le dernier contrôle
+    watermark = cache.get(_OVERDUE_WATERMARK_KEY) or now - timedelta(seconds=interval)
+    overdue = (
+        RecoupementTicket.objects.filter(due_at__gt=watermark, due_at__lte=now)
+        .exclude(status="CLOSED")
+        .select_related("service")
+        .order_by("due_at")[:50]
+    )
+    for ticket in overdue:
+        publish_event(BRIEFING_CHANNEL, "recoupement_overdue", {
+            "id": ticket.pk,
+            "title": ticket.title,
+            "level": ticket.level,
+            "service": ticket.service.nom if ticket.service_id else "",
+            "due_at": timezone.localtime(ticket.due_at).strftime("%d/%m %H:%M"),
+        })
+    cache.set(_OVERDUE_WATERMARK_KEY, now, None)
+
+
+def record_weak_signals_computed(request, weak_signals):
+    AuditLog.objects.create(
+        user=request.user,
+        action="SYSTEM_WEAK_SIGNALS",
+        target_repr=f"Présidence: calcul signaux faibles (72h) - {len(weak_signals)} résultats"
+    )
+
+
+def ai_synthesis(national_status, kpis):
+    """ Synthèse IA (simulée) à partir du statut national et des KPIs. """
+    ai_summary = "La situation nationale est " + national_status.lower() + ". "
+    if national_status == "CRITIQUE":
+        ai_summary += "Des défaillances critiques et un volume anormalement élevé de validations urgentes requièrent une intervention immédiate. "
+    elif national_status == "SOUS TENSION":
+        ai_summary += "Des retards dans le traitement des contributions et un nombre croissant de rejets indiquent une surcharge opérationnelle ou des problèmes de qualité. "
+    else:
+        ai_summary += "Les opérations se déroulent selon les prévisions. Les indicateurs sont au vert."
+    ai_summary += "Les signaux dominants sont "
+    if kpis["kpi_contributions_validated_24h"] > 5: ai_summary += "une activité de validation élevée ({} validations 24h). ".format(kpis["kpi_contributions_validated_24h"])
+    if kpis["kpi_missions_failed_7d"] > 0: ai_summary += "des échecs de mission récents ({} en 7j). ".format(kpis["kpi_missions_failed_7d"])
+    if kpis["kpi_missions_pending"] > 0: ai_summary += "des missions en attente de démarrage ({} missions). ".format(kpis["kpi_missions_pending"])
+    if kpis["kpi_missions_in_progress"] > 0: ai_summary += "des opérations en cours ({} missions). ".format(kpis["kpi_missions_in_progress"])
+
+    ai_recommendation = "Recommandation : "
+    if national_status == "CRITIQUE":
+        ai_recommendation += "Activation du protocole d'urgence et convocation du comité de crise. Prioriser l'analyse des échecs de mission."
+    elif national_status == "SOUS TENSION":
+        ai_recommendation += "Réaffecter les ressources pour accélérer le traitement des contributions en attente. Analyser les motifs de rejet."
+    else:
+        ai_recommendation += "Maintenir la vigilance. Optimiser les processus pour réduire les contributions en brouillon."
+
+    ai_projection = "Projection 7 jours (IA) : "
+    if national_status == "CRITIQUE" or national_status == "SOUS TENSION":
+        ai_projection += "Risque élevé de dégradation si aucune action corrective n'est entreprise."
+    else:
+        ai_projection += "Stabilité probable avec des risques modérés identifiés. Evolution à surveiller."
+
+    return {"ai_summary": ai_summary, "ai_recommendation": ai_recommendation, "ai_projection": ai_projection}
+
+
+def shell_context(panels, now, user):
+    """ Contexte commun aux rendus complet et coquille du briefing. """
+    context = {"last_update": now, "recent_decisions_escalations": [], "is_cns": is_cns(user)}
+    for name, values in panels.items():
+        if name != "zone_evolution":
+            context.update(values)
+    return context
+
+
+def assemble_context(panels, now, user):
+    """ Contexte complet du template presidence_briefing.html (tous les panneaux calculés). """
+    context = shell_context(panels, now, user)
+    context.update(ai_synthesis(context["national_status"], context))
+    context["focus_72h"]["top_weak_signals"] = context["weak_signals"] # Réutiliser les signaux faibles déjà calculés
+    context["zone_evolution_data"] = json.dumps(panels["zone_evolution"]["zone_evolution"], ensure_ascii=True)
+    return context
+
+
+# --- Page coquille et fragments (agents.fragments) ---
+
+# Panneaux rapides rendus directement dans la coquille
+SHELL_PANELS = ("national_status", "alerts", "latest_decisions", "zone_map", "cns_traceability")
+
+
+def _synthesis_fragment(request, now):
+    return ai_synthesis(national_status_panel(now)["national_status"], kpis_panel(now))
+
+
+def _record_weak_signals_served(request, values):
+    record_weak_signals_computed(request, values["weak_signals"])
+
+
+def _executive_fragment(request, now):
+    values = executive_panel(now)
+    values["focus_72h"]["top_weak_signals"] = get_weak_signals(last_hours=72, limit=5)
+    return values
+
+
+def _panel_fragment(name):
+    return lambda request, now: PANELS[name](now)
+
+
+PRESIDENCE_FRAGMENTS = {
+    "kpis": Fragment(_panel_fragment("kpis"), "agents/presidence/partials/_kpis.html", ttl=120, tags=("contributions", "missions")),
+    "synthesis": Fragment(_synthesis_fragment, "agents/presidence/partials/_synthesis.html", ttl=120, tags=("contributions", "missions")),
+    "weak_signals": Fragment(
+        _panel_fragment("weak_signals"), "agents/presidence/partials/_weak_signals.html", ttl=60, tags=("contributions",),
+        on_serve=_record_weak_signals_served,
+    ),
+    "executive": Fragment(
+        _executive_fragment, "agents/presidence/partials/_executive.html", ttl=60,
+        tags=("contributions", "missions", "recoupements"),
+    ),
+    "institutional_actions": Fragment(
+        _panel_fragment("institutional_actions"), "agents/presidence/partials/_institutional_actions.html", ttl=60,
+        tags=("missions", "recoupements", "decisions"),
+    ),
+    "timeline": Fragment(_panel_fragment("timeline"), "agents/presidence/partials/_timeline.html", ttl=30),
+    # JSON consommé par la carte (zone_evolution)
+    "zone_evolution": Fragment(_panel_fragment("zone_evolution"), ttl=300, tags=("contributions",)),
+}
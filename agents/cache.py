@@ -0,0 +1,169 @@
+"""
+Couche de cache applicative au-dessus des caches Django (settings.CACHES).
+
+- Clés préfixées par un espace de noms : "mbongi:<namespace>:<part>:<part>".
+- TTL par espace de noms, surchargeable par clé.
+- Invalidation par tags : chaque tag a un numéro de version ; une entrée
+  enregistrée avec des tags est périmée dès qu'un de ses tags change.
+- Protection contre l'effet de meute (single-flight) : un seul calcul par
+  clé à la fois, dans le process (verrou) et entre process (cache.add).
+
+Exemple :
+    briefing_cache = CacheNamespace("briefing", ttl=60)
+    signals = briefing_cache.get_or_set(("weak_signals", 72, 5), compute, tags=["contributions"])
+    invalidate_tags("contributions")
+"""
+import threading
+import time
+import uuid
+
+from django.core.cache import caches
+
+from .metrics import CACHE_REQUESTS
+
+_MISSING = object()
+_KEY_PREFIX = "mbongi"
+
+# Verrous locaux répartis par hash de clé (nombre borné)
+_local_locks = [threading.Lock() for _ in range(64)]
+
+
+def _tag_key(tag):
+    return f"{_KEY_PREFIX}:tag:{tag}"
+
+
+def _local_lock(key):
+    return _local_locks[hash(key) % len(_local_locks)]
+
+
+def _initial_version():
+    # Version initiale non réutilisable : si un tag est évincé du cache puis
+    # recréé, les entrées enregistrées avec l'ancienne version restent périmées.
+    return time.time_ns() // 1000
+
+
+def tag_versions(tags, alias="default"):
+    """ Version courante de chaque tag (initialisée à 1 si absente). """
+    if not tags:
+        return {}
+    cache = caches[alias]
+    keys = {tag: _tag_key(tag) for tag in tags}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _initial_version(), None)
+            version = cache.get(key)
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags, alias="default"):
+    """ Périme toutes les entrées enregistrées avec l'un des tags. """
+    cache = caches[alias]
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Tag jamais utilisé : aucune entrée à périmer
+            cache.add(key, _initial_version(), None)
+
+
+class CacheNamespace:
+    """ Espace de noms de cache avec TTL, tags et calcul single-flight. """
+
+    # Durée maximale d'un calcul protégé avant qu'un autre process prenne le relais
+    lock_ttl = 30
+    # Intervalle d'attente d'un process qui n'a pas obtenu le verrou
+    wait_interval = 0.05
+
+    def __init__(self, namespace, ttl=300, alias="default"):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def key(self, parts):
+        if not isinstance(parts, (list, tuple)):
+            parts = (parts,)
+        return ":".join([_KEY_PREFIX, self.namespace, *(str(part) for part in parts)])
+
+    def get(self, parts, default=None):
+        value = self._get(self.key(parts))
+        self._record(value)
+        return default if value is _MISSING else value
+
+    def set(self, parts, value, ttl=None, tags=()):
+        self._set(self.key(parts), value, ttl, tags)
+
+    def delete(self, parts):
+        self.backend.delete(self.key(parts))
+
+    def delete_many(self, parts_list):
+        keys = [self.key(parts) for parts in parts_list]
+        if keys:
+            self.backend.delete_many(keys)
+
+    def get_or_set(self, parts, compute, ttl=None, tags=()):
+        """
+        Retourne la valeur en cache ou la calcule une seule fois, même si
+        plusieurs requêtes la demandent simultanément.
+        """
+        key = self.key(parts)
+        value = self._get(key)
+        self._record(value)
+        if value is not _MISSING:
+            return value
+
+        with _local_lock(key):
+            value = self._get(key)
+            if value is not _MISSING:
+                return value
+
+            lock_key = f"{key}:lock"
+            token = uuid.uuid4().hex
+            if not self.backend.add(lock_key, token, self.lock_ttl):
+                # Un autre process calcule déjà cette valeur : on l'attend.
+                deadline = time.monotonic() + self.lock_ttl
+                while time.monotonic() < deadline:
+                    time.sleep(self.wait_interval)
+                    value = self._get(key)
+                    if value is not _MISSING:
+                        return value
+                    if self.backend.get(lock_key) is None:
+                        break
+            try:
+                # Versions lues avant le calcul : une invalidation pendant
+                # le calcul rend la valeur immédiatement périmée.
+                versions = tag_versions(tags, self.alias)
+                value = compute()
+                self._store(key, value, ttl, versions)
+                return value
+            finally:
+                if self.backend.get(lock_key) == token:
+                    self.backend.delete(lock_key)
+
+    # --- Interne ---
+
+    def _record(self, value):
+        CACHE_REQUESTS.inc(namespace=self.namespace, result="miss" if value is _MISSING else "hit")
+
+    def _get(self, key):
+        entry = self.backend.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        value, versions = entry
+        if versions and tag_versions(versions.keys(), self.alias) != versions:
+            return _MISSING
+        return value
+
+    def _set(self, key, value, ttl, tags):
+        self._store(key, value, ttl, tag_versions(tags, self.alias))
+
+    def _store(self, key, value, ttl, versions):
+        self.backend.set(key, (value, versions), self.ttl if ttl is None else ttl)
@@ -1,3 +1,6 @@
+from .security import get_user_roles
+
+
 def current_context(request):
     current_service = "ANR"
     current_role = "AGENT"
@@ -6,7 +9,7 @@ def current_context(request):
     user = getattr(request, "user", None)
     if user and getattr(user, "is_authenticated", False):
         service_order = ["ANR", "PNC", "FARDC", "DEMIAP", "DGM", "AMBASSADE", "CNS"]
-        user_groups = set(user.groups.values_list("name", flat=True))
+        user_groups = get_user_roles(user)
 
         for name in service_order:
             if name in user_groups:
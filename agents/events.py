@@ -0,0 +1,175 @@
+"""
+Événements temps réel (publication / abonnement) pour les flux SSE.
+
+Un événement est publié sur un canal ("briefing"...) et reçoit un id
+croissant. Les flux SSE lisent le canal à partir du dernier id reçu : à la
+reconnexion, le navigateur renvoie Last-Event-ID et les événements manqués
+sont rejoués (dans la limite de l'historique conservé).
+
+Courtiers (MBONGI_EVENT_BROKER) :
+- "local" : mémoire du process. Développement / tests, ou un seul worker.
+- "redis" : Redis Streams (REDIS_URL), partagé entre workers gunicorn :
+  un événement publié par un worker est reçu par les flux de tous les autres.
+Par défaut "redis" si REDIS_URL est défini, "local" sinon.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+
+from .metrics import EVENTS_PUBLISHED
+
+logger = logging.getLogger("agents.events")
+
+# Nombre d'événements conservés par canal (rejeu Last-Event-ID)
+HISTORY = 500
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str
+    type: str
+    data: dict
+
+    def encode(self):
+        """ Trame Server-Sent Events. """
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+class LocalBroker:
+    """ Courtier en mémoire du process (ids entiers croissants). """
+
+    def __init__(self, history=HISTORY):
+        self._condition = threading.Condition()
+        self._channels = defaultdict(lambda: deque(maxlen=history))
+        self._sequence = 0
+
+    def publish(self, channel, event_type, data):
+        with self._condition:
+            self._sequence += 1
+            event = Event(str(self._sequence), event_type, data)
+            self._channels[channel].append(event)
+            self._condition.notify_all()
+        return event.id
+
+    def last_id(self, channel):
+        with self._condition:
+            events = self._channels[channel]
+            return events[-1].id if events else "0"
+
+    def read(self, channel, after, timeout):
+        """ Événements postérieurs à `after`, en attendant au plus `timeout` secondes. """
+        try:
+            after = int(after)
+        except (TypeError, ValueError):
+            after = 0
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if after > self._sequence:
+                # Id émis par un process précédent (redémarrage) : repartir d'ici
+                after = self._sequence
+            while True:
+                events = [event for event in self._channels[channel] if int(event.id) > after]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._condition.wait(remaining)
+
+
+class RedisBroker:
+    """ Courtier Redis Streams : une clé "mbongi:events:<canal>" par canal. """
+
+    def __init__(self, url, history=HISTORY):
+        import redis
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._history = history
+
+    def _key(self, channel):
+        return f"mbongi:events:{channel}"
+
+    def publish(self, channel, event_type, data):
+        fields = {"type": event_type, "data": json.dumps(data, ensure_ascii=False, default=str)}
+        return self._client.xadd(self._key(channel), fields, maxlen=self._history, approximate=True)
+
+    def last_id(self, channel):
+        entries = self._client.xrevrange(self._key(channel), count=1)
+        return entries[0][0] if entries else "0-0"
+
+    def read(self, channel, after, timeout):
+        response = self._client.xread({self._key(channel): after or "$"}, count=100, block=int(timeout * 1000))
+        return [
+            Event(entry_id, fields["type"], json.loads(fields["data"]))
+            for _, entries in response or ()
+            for entry_id, fields in entries
+        ]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            redis_url = getattr(settings, "REDIS_URL", None)
+            name = getattr(settings, "MBONGI_EVENT_BROKER", "") or ("redis" if redis_url else "local")
+            _broker = RedisBroker(redis_url) if name == "redis" else LocalBroker()
+        return _broker
+
+
+def reset_broker():
+    """ Oublie le courtier courant (tests, changement de configuration). """
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish_event(channel, event_type, data):
+    """
+    Publie un événement après le commit de la transaction courante.
+    Une panne du courtier est journalisée sans faire échouer l'écriture.
+    """
+    def send():
+        try:
+            get_broker().publish(channel, event_type, data)
+        except Exception:
+            logger.exception("Publication impossible : %s/%s", channel, event_type, extra={"channel": channel, "event": event_type})
+            return
+        EVENTS_PUBLISHED.inc(channel=channel, type=event_type)
+
+    transaction.on_commit(send)
+
+
+def event_stream(channel, last_id=None, on_tick=None, max_seconds=None, heartbeat=None):
+    """
+    Générateur SSE pour StreamingHttpResponse. Le flux se termine après
+    max_seconds (le navigateur se reconnecte avec Last-Event-ID), ce qui
+    libère régulièrement le thread du worker. on_tick() est appelé à chaque
+    tour de boucle (contrôles périodiques qui publient des événements).
+    """
+    broker = get_broker()
+    max_seconds = max_seconds or getattr(settings, "MBONGI_SSE_MAX_SECONDS", 300)
+    heartbeat = heartbeat or getattr(settings, "MBONGI_SSE_HEARTBEAT", 15)
+    if not last_id:
+        last_id = broker.last_id(channel)
+
+    yield "retry: 5000\n\n"
+    deadline = time.monotonic() + max_seconds
+    while time.monotonic() < deadline:
+        if on_tick:
+            on_tick()
+        events = broker.read(channel, last_id, timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+        for event in events:
+            last_id = event.id
+            yield event.encode()
+        if not events:
+            # Commentaire SSE : garde la connexion ouverte à travers les proxys
+            yield ": keepalive\n\n"
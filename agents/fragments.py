@@ -0,0 +1,78 @@
+"""
+Fragments de tableau de bord chargés à la demande.
+
+Une page « coquille » rend immédiatement les panneaux rapides et des
+emplacements (agents/partials/_lazy_panel.html) que le navigateur remplit
+en appelant un endpoint par panneau. Chaque fragment a son propre TTL de
+cache, ses tags d'invalidation (agents.cache) et un ETag : tant que la
+valeur en cache n'a pas changé, le navigateur reçoit un 304.
+
+Les données du panneau sont mises en cache, pas le HTML : le rendu reste
+propre à la requête (jeton CSRF des formulaires, utilisateur courant).
+"""
+import uuid
+from dataclasses import dataclass
+from typing import Callable
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+
+from .cache import CacheNamespace
+
+fragment_cache = CacheNamespace("fragments", ttl=60)
+
+
+def global_scope(request):
+    return "all"
+
+
+def user_scope(request):
+    return f"user:{request.user.pk}"
+
+
+@dataclass
+class Fragment:
+    """
+    compute(request, now) -> dict : contexte du template (ou données JSON
+    si template est None). scope(request) distingue les entrées de cache
+    quand le contenu dépend de l'utilisateur ou de son service.
+    on_serve(request, data), s'il est défini, est appelé à chaque
+    requête, valeur en cache ou non (journal d'audit).
+    """
+    compute: Callable
+    template: str = None
+    ttl: int = 60
+    tags: tuple = ()
+    scope: Callable = global_scope
+    on_serve: Callable = None
+
+
+def fragment_response(request, dashboard, registry, name):
+    """
+    Sert le fragment `name` du registre du tableau de bord `dashboard`
+    (préfixe des clés de cache), avec cache, ETag et 304.
+    """
+    fragment = registry.get(name)
+    if fragment is None:
+        raise Http404("Fragment inconnu.")
+
+    def compute():
+        return {"data": fragment.compute(request, timezone.now()), "version": uuid.uuid4().hex}
+
+    entry = fragment_cache.get_or_set(
+        (dashboard, name, fragment.scope(request)), compute, ttl=fragment.ttl, tags=fragment.tags
+    )
+    if fragment.on_serve is not None:
+        fragment.on_serve(request, entry["data"])
+    etag = f'"{dashboard}-{name}-{entry["version"]}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if fragment.template is None:
+            response = JsonResponse(entry["data"])
+        else:
+            response = render(request, fragment.template, entry["data"])
+    response["ETag"] = etag
+    response["Cache-Control"] = f"private, max-age={fragment.ttl}"
+    return response
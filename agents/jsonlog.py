@@ -0,0 +1,67 @@
+"""
+Journalisation structurée (JSON, une ligne par événement) et identifiant
+de corrélation par requête.
+
+L'identifiant est fixé par agents.middleware.RequestStatsMiddleware (repris
+de l'en-tête X-Request-ID s'il est valide, sinon généré), porté par une
+ContextVar et ajouté à chaque log (RequestIdFilter), aux entrées d'audit,
+aux requêtes SQL lentes et aux appels LLM.
+"""
+import contextvars
+import json
+import logging
+import re
+import uuid
+from datetime import datetime, timezone
+
+_request_id = contextvars.ContextVar("mbongi_request_id", default="")
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Attributs standard d'un LogRecord (tout le reste vient de extra=...)
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def set_request_id(value):
+    return _request_id.set(value)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def request_id_from_header(value):
+    """ Reprend l'identifiant amont (proxy, client) s'il est sûr, sinon en génère un. """
+    if value and _VALID_REQUEST_ID.match(value):
+        return value
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        if not getattr(record, "request_id", ""):
+            # django.request journalise après la sortie des middlewares
+            request = getattr(record, "request", None)
+            record.request_id = getattr(request, "request_id", "") or get_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "") or get_request_id(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
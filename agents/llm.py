@@ -0,0 +1,263 @@
+"""
+Accès au modèle de langage (résumés IA).
+
+generate() envoie un prompt au backend configuré, derrière :
+- un seau à jetons (MBONGI_LLM_RATE requêtes/s, rafale MBONGI_LLM_BURST)
+  partagé par les threads du process : au-delà, l'appel attend au plus
+  MBONGI_LLM_QUEUE_TIMEOUT secondes puis échoue (RateLimited) ;
+- un disjoncteur : après MBONGI_LLM_BREAKER_FAILURES échecs consécutifs,
+  les appels échouent immédiatement (CircuitOpen) pendant
+  MBONGI_LLM_BREAKER_RESET secondes, puis un appel d'essai est autorisé.
+Un modèle lent ou indisponible n'immobilise donc pas les pools de threads.
+
+Backends (MBONGI_LLM_BACKEND) :
+- "gemini" : API Gemini (GEMINI_API_KEY). Un seul client par process,
+  réutilisé (pool de connexions HTTP), délai maximal MBONGI_LLM_TIMEOUT.
+- "fake"   : réponses déterministes construites à partir du prompt, sans
+  réseau. Tests, développement hors ligne et mesures de performance.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+
+
+class LLMUnavailable(Exception):
+    """ Appel refusé sans solliciter le modèle (limite de débit, disjoncteur). """
+
+
+class RateLimited(LLMUnavailable):
+    pass
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class TokenBucket:
+    """ Seau à jetons : `rate` jetons par seconde, au plus `capacity` en réserve. """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=0):
+        """ Prend un jeton, en attendant au plus `timeout` secondes. Retourne False sinon. """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """ Disjoncteur fermé / ouvert / semi-ouvert (un appel d'essai après reset_timeout). """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial:
+                raise CircuitOpen("Modèle indisponible (disjoncteur ouvert).")
+            self._trial = True
+
+    def cancel_call(self):
+        """ Appel autorisé mais finalement non effectué : libère l'essai éventuel. """
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures, self._opened_at, self._trial = 0, None, False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+# --- Backends ---
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, model, timeout):
+        from google import genai
+        from google.genai import types
+
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY manquante (variable d’environnement).")
+        self.model = model
+        self._types = types
+        self._client = genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=int(timeout * 1000)))
+
+    def generate(self, prompt, json_schema=None, max_output_tokens=None):
+        config = None
+        if json_schema is not None or max_output_tokens is not None:
+            config = self._types.GenerateContentConfig(
+                response_mime_type="application/json" if json_schema is not None else None,
+                response_json_schema=json_schema,
+                max_output_tokens=max_output_tokens,
+            )
+        resp = self._client.models.generate_content(model=self.model, contents=prompt, config=config)
+        return (resp.text or "").strip()
+
+    def generate_stream(self, prompt):
+        for chunk in self._client.models.generate_content_stream(model=self.model, contents=prompt):
+            yield chunk.text or ""
+
+
+class FakeBackend:
+    """
+    Réponses déterministes : le résumé reprend le titre et le début du
+    texte ; en JSON, une entrée par bloc "### Contribution <référence>" du prompt.
+    `latency` (secondes) simule le temps de réponse du modèle.
+    """
+    name = "fake"
+
+    _BLOCK = re.compile(r"^### Contribution (\S+)\nTitre: ([^\n]*)\nTexte:\n(.*?)(?=\n\n### Contribution |\Z)", re.M | re.S)
+    _SINGLE = re.compile(r"^Titre: ([^\n]*)\nTexte:\n(.*)\Z", re.M | re.S)
+
+    def __init__(self, model="fake", latency=0):
+        self.model = model
+        self.latency = latency
+
+    @staticmethod
+    def _summary(titre, contenu):
+        excerpt = " ".join(contenu.split())[:200] or "Non précisé"
+        return f"1) Résumé : {titre.strip()} - {excerpt}\n2) Points clés :\n- {excerpt[:80]}\n3) Urgence suggérée : Normal"
+
+    def _text(self, prompt, json_schema=None):
+        if json_schema is not None:
+            return json.dumps(
+                [{"id": ref, "resume": self._summary(titre, contenu)} for ref, titre, contenu in self._BLOCK.findall(prompt)],
+                ensure_ascii=False,
+            )
+        match = self._SINGLE.search(prompt)
+        return self._summary(*match.groups()) if match else self._summary("", prompt)
+
+    def generate(self, prompt, json_schema=None, max_output_tokens=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._text(prompt, json_schema)
+
+    def generate_stream(self, prompt):
+        """ Même texte que generate(), par morceaux de quelques mots. """
+        words = self._text(prompt).split(" ")
+        for index in range(0, len(words), 4):
+            if self.latency:
+                time.sleep(self.latency / 10)
+            yield " ".join(words[index:index + 4]) + (" " if index + 4 < len(words) else "")
+
+
+_backend = None
+_limiter = None
+_breaker = None
+_backend_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_backend():
+    """ Backend du process (créé au premier appel, puis réutilisé). """
+    global _backend, _limiter, _breaker
+    with _backend_lock:
+        if _backend is None:
+            from .ai import DEFAULT_MODEL
+
+            name = _setting("MBONGI_LLM_BACKEND", "gemini")
+            if name == "fake":
+                _backend = FakeBackend(latency=_setting("MBONGI_LLM_FAKE_LATENCY", 0))
+            else:
+                _backend = GeminiBackend(DEFAULT_MODEL, timeout=_setting("MBONGI_LLM_TIMEOUT", 30))
+            _limiter = TokenBucket(_setting("MBONGI_LLM_RATE", 2), _setting("MBONGI_LLM_BURST", 5))
+            _breaker = CircuitBreaker(_setting("MBONGI_LLM_BREAKER_FAILURES", 5), _setting("MBONGI_LLM_BREAKER_RESET", 60))
+        return _backend
+
+
+def reset_backend():
+    """ Oublie le backend courant et l'état du limiteur / disjoncteur (tests, configuration). """
+    global _backend, _limiter, _breaker
+    with _backend_lock:
+        _backend = _limiter = _breaker = None
+
+
+def _admit():
+    """ Contrôles avant un appel (disjoncteur, débit) ; retourne le disjoncteur à notifier. """
+    breaker, limiter = _breaker, _limiter
+    breaker.before_call()
+    if not limiter.acquire(timeout=_setting("MBONGI_LLM_QUEUE_TIMEOUT", 10)):
+        breaker.cancel_call()
+        raise RateLimited("Limite de débit du modèle atteinte.")
+    return breaker
+
+
+def generate(prompt, json_schema=None, max_output_tokens=None):
+    """
+    Texte généré par le backend pour `prompt` (JSON conforme à json_schema
+    si fourni). Lève RateLimited / CircuitOpen sans appeler le modèle.
+    """
+    backend = get_backend()
+    breaker = _admit()
+    try:
+        text = backend.generate(prompt, json_schema=json_schema, max_output_tokens=max_output_tokens)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return text
+
+
+def generate_stream(prompt):
+    """ Comme generate(), mais produit le texte par morceaux au fil de la réponse du modèle. """
+    backend = get_backend()
+    breaker = _admit()
+    try:
+        for chunk in backend.generate_stream(prompt):
+            if chunk:
+                yield chunk
+    except GeneratorExit:
+        # Lecteur parti (navigateur fermé) : ni succès ni échec du modèle
+        breaker.cancel_call()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
@@ -0,0 +1,62 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from agents.management.workers import process_pool
+from agents.service_reports import collect_service_digests, render_service_report, report_filename
+
+
+def _render_worker(digest, since, until, path):
+    try:
+        render_service_report(digest, since, until, path)
+    except Exception as exc:
+        return digest["service"], f"{type(exc).__name__}: {exc}"
+    return digest["service"], None
+
+
+class Command(BaseCommand):
+    help = "Génère le digest PDF hebdomadaire de chaque service (une passe de données, rendu en parallèle)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Fin de la période (AAAA-MM-JJ, exclue). Défaut : aujourd'hui.")
+        parser.add_argument("--days", type=int, default=7, help="Durée de la période en jours.")
+        parser.add_argument("--output-dir", help="Répertoire racine (défaut : MEDIA_ROOT/service_reports).")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus de rendu.")
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                end_date = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date attend le format AAAA-MM-JJ.")
+        else:
+            end_date = timezone.localdate()
+        until = timezone.make_aware(datetime.combine(end_date, datetime.min.time()))
+        since = until - timedelta(days=options["days"])
+
+        output_dir = os.path.join(options["output_dir"] or os.path.join(settings.MEDIA_ROOT, "service_reports"), end_date.isoformat())
+        os.makedirs(output_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        digests = list(collect_service_digests(since, until).values())
+        self.stdout.write(f"{len(digests)} service(s) agrégé(s) en {time.perf_counter() - started:.1f} s.")
+
+        jobs = [(digest, since, until, os.path.join(output_dir, report_filename(digest))) for digest in digests]
+        if options["workers"] > 1 and len(jobs) > 1:
+            with process_pool(options["workers"]) as executor:
+                chunksize = max(1, len(jobs) // (options["workers"] * 4))
+                results = list(executor.map(_render_worker, *zip(*jobs), chunksize=chunksize))
+        else:
+            results = [_render_worker(*job) for job in jobs]
+
+        failures = [(service, error) for service, error in results if error]
+        for service, error in failures:
+            self.stderr.write(f"{service} : {error}")
+        self.stdout.write(f"Rendu terminé en {time.perf_counter() - started:.1f} s : {output_dir}")
+        if failures:
+            raise CommandError(f"{len(failures)} rapport(s) en échec sur {len(results)}.")
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} rapport(s) générés."))
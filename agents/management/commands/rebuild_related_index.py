@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from agents.related import rebuild_vectors
+
+
+class Command(BaseCommand):
+    help = "Recalcule les vecteurs de toutes les contributions (index des contributions liées)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Contributions traitées par requête.")
+
+    def handle(self, *args, **options):
+        total = rebuild_vectors(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{total} vecteur(s) recalculé(s)."))
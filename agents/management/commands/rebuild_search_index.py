@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from agents.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Réindexe les contributions, missions, recoupements et avis CNS (recherche plein texte)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Objets traités par requête.")
+
+    def handle(self, *args, **options):
+        counts = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            "Index reconstruit : " + ", ".join(f"{kind} {total}" for kind, total in counts.items()) + "."
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from agents.models import BriefingSnapshot
+from agents.pdf_jobs import get_pdf_job, run_job, take_snapshot
+
+
+class Command(BaseCommand):
+    help = "Prend un instantané du briefing Présidence et pré-génère son PDF (à planifier, ex. toutes les 10 minutes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, default=48, help="Nombre d'instantanés conservés (les plus anciens et leurs PDF sont supprimés).")
+        parser.add_argument("--no-pdf", action="store_true", help="Instantané seul, sans génération du PDF.")
+
+    def handle(self, *args, **options):
+        snapshot = take_snapshot(source="SCHEDULED")
+        self.stdout.write(f"Instantané #{snapshot.pk} pris.")
+
+        if not options["no_pdf"]:
+            job = run_job(get_pdf_job(snapshot).pk)
+            if job.status != "DONE":
+                raise CommandError(f"PDF de l'instantané #{snapshot.pk} non généré : {job.error or job.get_status_display()}")
+            self.stdout.write(f"PDF généré : {job.file.name}")
+
+        pruned = 0
+        for old in BriefingSnapshot.objects.order_by("-created_at")[options["keep"]:]:
+            for job in old.pdf_jobs.exclude(file=""):
+                job.file.delete(save=False)
+            old.delete()
+            pruned += 1
+        if pruned:
+            self.stdout.write(f"{pruned} ancien(s) instantané(s) supprimé(s).")
+        self.stdout.write(self.style.SUCCESS("Instantané du briefing à jour."))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from agents.pdf_jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Génère les PDF en attente (jobs non traités par le pool de threads, ex. après un redémarrage)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-minutes", type=int, default=10, help="Délai après lequel un job RUNNING est considéré orphelin.")
+        parser.add_argument("--limit", type=int, default=None)
+
+    def handle(self, *args, **options):
+        jobs = run_pending_jobs(stale_after=timedelta(minutes=options["stale_minutes"]), limit=options["limit"])
+        for job in jobs:
+            self.stdout.write(f"Job #{job.pk} ({job.document}, instantané #{job.snapshot_id}) : {job.get_status_display()}")
+        self.stdout.write(self.style.SUCCESS(f"{len(jobs)} job(s) traité(s)."))
@@ -0,0 +1,116 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+
+from agents.audit_chain import GENESIS_HASH, verify_segment
+from agents.management.workers import process_pool
+from agents.models import AuditLog
+
+
+def _verify_segment_worker(after_id, until_id, chunk_size, max_errors):
+    result = verify_segment(after_id=after_id, until_id=until_id, chunk_size=chunk_size, max_errors=max_errors)
+    connections.close_all()
+    return result
+
+
+class Command(BaseCommand):
+    help = "Vérifie la chaîne de hash du journal d'audit (par blocs, reprise sur point de contrôle, segments en parallèle)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=20000, help="Nombre d'entrées lues par requête.")
+        parser.add_argument("--checkpoint", help="Fichier JSON de reprise (lu au démarrage, mis à jour après chaque bloc).")
+        parser.add_argument("--workers", type=int, default=1, help="Nombre de processus pour vérifier les segments en parallèle.")
+        parser.add_argument("--segments", type=int, default=0, help="Nombre de segments (défaut : 4 par processus).")
+        parser.add_argument("--max-errors", type=int, default=20)
+
+    def handle(self, *args, **options):
+        checkpoint_path = options["checkpoint"]
+        after_id, prev_hash = self._load_checkpoint(checkpoint_path)
+
+        if options["workers"] > 1:
+            result_count, last_id, last_hash, errors = self._verify_parallel(after_id, prev_hash, options)
+        else:
+            def save_checkpoint(last_id, last_hash):
+                self._write_checkpoint(checkpoint_path, last_id, last_hash)
+
+            result = verify_segment(
+                after_id=after_id,
+                expected_prev_hash=prev_hash,
+                chunk_size=options["chunk_size"],
+                max_errors=options["max_errors"],
+                on_chunk=save_checkpoint if checkpoint_path else None,
+            )
+            result_count, last_id, last_hash, errors = result.count, result.last_id, result.last_hash, result.errors
+
+        for pk, reason in errors:
+            self.stderr.write(f"AuditLog #{pk}: {reason}")
+        if errors:
+            raise CommandError(f"Chaîne d'audit rompue ({len(errors)} anomalie(s)).")
+
+        if checkpoint_path and last_id is not None:
+            self._write_checkpoint(checkpoint_path, last_id, last_hash)
+        self.stdout.write(self.style.SUCCESS(
+            f"Chaîne d'audit intègre : {result_count} entrée(s) vérifiée(s) après #{after_id}"
+            + (f", jusqu'à #{last_id}." if last_id is not None else ".")
+        ))
+
+    def _verify_parallel(self, after_id, prev_hash, options):
+        """
+        Découpe la plage d'ids en segments vérifiés indépendamment, puis raccorde
+        chaque segment au suivant (dernier hash == prev_hash du segment suivant).
+        """
+        bounds = AuditLog.objects.filter(id__gt=after_id).aggregate(lo=Min("id"), hi=Max("id"))
+        if bounds["lo"] is None:
+            return 0, None, None, []
+
+        workers = options["workers"]
+        nb_segments = options["segments"] or workers * 4
+        span = bounds["hi"] - after_id
+        step = max(1, -(-span // nb_segments))
+        ranges = [(start, min(start + step, bounds["hi"])) for start in range(after_id, bounds["hi"], step)]
+
+        with process_pool(workers) as pool:
+            futures = [
+                pool.submit(_verify_segment_worker, lo, hi, options["chunk_size"], options["max_errors"])
+                for lo, hi in ranges
+            ]
+            results = [f.result() for f in futures]
+
+        errors = []
+        expected = prev_hash
+        count = 0
+        last_id = None
+        for result in results:
+            errors.extend(result.errors)
+            if result.count == 0:
+                continue
+            if result.first_prev_hash != expected:
+                errors.append((result.after_id + 1, f"rupture entre segments (après #{result.after_id})"))
+            expected = result.last_hash
+            last_id = result.last_id
+            count += result.count
+        return count, last_id, expected, errors
+
+    def _load_checkpoint(self, path):
+        if not path or not os.path.exists(path):
+            return 0, GENESIS_HASH
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        last_id, last_hash = int(data["last_id"]), data["last_hash"]
+
+        # Le point de contrôle doit toujours correspondre à l'entrée stockée
+        stored = AuditLog.objects.filter(id=last_id).values_list("entry_hash", flat=True).first()
+        if stored != last_hash:
+            raise CommandError(f"Point de contrôle invalide : l'entrée #{last_id} a été modifiée ou supprimée.")
+        return last_id, last_hash
+
+    def _write_checkpoint(self, path, last_id, last_hash):
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"last_id": last_id, "last_hash": last_hash}, fh)
+        os.replace(tmp_path, path)
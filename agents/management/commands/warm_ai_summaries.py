@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from agents.summaries import warm_validation_queue
+
+
+class Command(BaseCommand):
+    help = "Pré-calcule les résumés IA des contributions en attente de validation (file des chefs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--service", type=int, default=None, help="Limiter à un service (id).")
+        parser.add_argument("--limit", type=int, default=None, help="Nombre maximal de contributions examinées.")
+        parser.add_argument("--workers", type=int, default=1, help="Appels Gemini en parallèle.")
+
+    def handle(self, *args, **options):
+        stats = warm_validation_queue(service_id=options["service"], limit=options["limit"], workers=options["workers"])
+        self.stdout.write(
+            f"{stats['total']} contribution(s) en file : {stats['cached']} déjà résumée(s), "
+            f"{stats['generated']} résumé(s) générés, {stats['failed']} échec(s)."
+        )
+        if stats["failed"]:
+            self.stdout.write(self.style.WARNING("Certains résumés n'ont pas pu être générés (voir les logs agents.llm)."))
+        else:
+            self.stdout.write(self.style.SUCCESS("File de validation à jour."))
@@ -0,0 +1,25 @@
+"""
+Pool de processus partagé par les commandes de gestion parallèles
+(verify_audit_chain, generate_service_reports).
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+def init_worker():
+    # Processus fils : Django doit être initialisé (spawn) et ne pas réutiliser
+    # les connexions héritées du parent (fork).
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def process_pool(max_workers):
+    """
+    ProcessPoolExecutor dont les fils repartent de connexions neuves. Les
+    connexions du parent sont fermées avant le fork : sinon la fermeture
+    côté fils couperait la session Postgres encore utilisée par le parent.
+    """
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker)
@@ -0,0 +1,190 @@
+"""
+Registre de métriques en mémoire (compteurs, histogrammes), exposé au
+format texte Prometheus par agents.views_metrics.
+
+Le registre est propre à chaque process : derrière gunicorn, chaque worker
+expose ses propres valeurs (le scrape interroge un worker à la fois).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# Bornes par défaut (secondes) : de 5 ms à 30 s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [*zip(labelnames, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} : labels attendus {self.labelnames}, reçus {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+                    break
+            state["sum"] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """ Chronomètre le bloc (y compris en cas d'exception). """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state["counts"]) if state else 0
+
+    def _render_samples(self, items):
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state['sum'])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def clear(self):
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Métriques de l'application ---
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "mbongi_http_request_duration_seconds", "Latence des requêtes HTTP par nom d'URL.", ["view"],
+)
+REQUEST_QUERIES = REGISTRY.histogram(
+    "mbongi_http_request_db_queries", "Nombre de requêtes SQL par requête HTTP.", ["view"],
+    buckets=(1, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+GEMINI_LATENCY = REGISTRY.histogram(
+    "mbongi_gemini_request_duration_seconds", "Latence des appels Gemini.", ["operation"],
+)
+GEMINI_FIRST_CHUNK = REGISTRY.histogram(
+    "mbongi_gemini_first_chunk_seconds", "Délai avant le premier morceau des réponses Gemini en flux.", ["operation"],
+)
+GEMINI_ERRORS = REGISTRY.counter(
+    "mbongi_gemini_errors_total", "Appels Gemini en erreur, par type d'exception.", ["operation", "error"],
+)
+PDF_RENDER_LATENCY = REGISTRY.histogram(
+    "mbongi_pdf_render_duration_seconds", "Temps de génération des PDF.", ["document"],
+)
+AUDIT_ENTRIES_WRITTEN = REGISTRY.counter(
+    "mbongi_audit_entries_written_total", "Entrées du journal d'audit écrites (après commit).",
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "mbongi_cache_requests_total", "Lectures du cache applicatif par espace de noms et résultat (hit/miss).",
+    ["namespace", "result"],
+)
+EVENTS_PUBLISHED = REGISTRY.counter(
+    "mbongi_events_published_total", "Événements temps réel publiés (flux SSE), par canal et type.",
+    ["channel", "type"],
+)
+SUMMARY_JOBS = REGISTRY.counter(
+    "mbongi_summary_jobs_total", "Tentatives des jobs de résumé IA, par issue (done/retry/failed).", ["outcome"],
+)
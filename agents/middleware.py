@@ -0,0 +1,108 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.urls import reverse
+
+from .metrics import REQUEST_LATENCY, REQUEST_QUERIES
+from .jsonlog import request_id_from_header, reset_request_id, set_request_id
+from .perf import QUERY_BUDGETS, current_request_stats, start_request_stats, stop_request_stats
+from .profiler import profile_call, should_profile
+
+logger = logging.getLogger("agents.perf")
+
+
+class RequestStatsMiddleware:
+    """
+    Mesure chaque requête : nombre de requêtes SQL, temps DB, temps de
+    rendu et latence totale, par nom de vue (nom d'URL).
+
+    - histogrammes de latence et de requêtes SQL (agents.metrics) ;
+    - identifiant de corrélation (agents.jsonlog), renvoyé dans X-Request-ID ;
+    - journal structuré sur le logger "agents.perf" (WARNING si la vue
+      dépasse son budget de requêtes défini dans agents.perf.QUERY_BUDGETS) ;
+    - en-têtes Server-Timing / X-Mbongi-* pour les comptes staff.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.request_id = request_id_from_header(request.headers.get("X-Request-ID"))
+        id_token = set_request_id(request.request_id)
+        stats, token = start_request_stats()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(stats.sql_wrapper))
+                response = self.get_response(request)
+            stats.total_time = time.perf_counter() - start
+
+            match = getattr(request, "resolver_match", None)
+            stats.view_name = (match.view_name if match else "") or "-"
+            self._log(request, response, stats)
+        finally:
+            stop_request_stats(token)
+            reset_request_id(id_token)
+        REQUEST_LATENCY.observe(stats.total_time, view=stats.view_name)
+        REQUEST_QUERIES.observe(stats.queries, view=stats.view_name)
+
+        response["X-Request-ID"] = request.request_id
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            self._add_headers(response, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Nom de vue connu dès la résolution : utilisé par le journal des requêtes lentes
+        stats = current_request_stats()
+        if stats is not None and request.resolver_match:
+            stats.view_name = request.resolver_match.view_name
+
+    def _log(self, request, response, stats):
+        data = stats.as_dict()
+        data.update(method=request.method, path=request.path, status=response.status_code)
+        budget = QUERY_BUDGETS.get(stats.view_name)
+        over_budget = budget is not None and stats.queries > budget
+        data["budget"] = budget
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            "view=%s status=%s queries=%d budget=%s db_ms=%.1f render_ms=%.1f total_ms=%.1f",
+            data["view"], data["status"], data["queries"], budget,
+            data["db_ms"], data["render_ms"], data["total_ms"],
+            extra={**data, "request_id": request.request_id},
+        )
+
+    def _add_headers(self, response, stats):
+        data = stats.as_dict()
+        response["Server-Timing"] = (
+            f'db;dur={data["db_ms"]}, '
+            f'render;dur={data["render_ms"]}, '
+            f'total;dur={data["total_ms"]}'
+        )
+        response["X-Mbongi-View"] = data["view"]
+        response["X-Mbongi-Queries"] = str(data["queries"])
+
+
+class ProfilerMiddleware:
+    """
+    Profilage cProfile + SQL d'une requête à la demande du staff
+    (?_profile=1 ou en-tête X-Mbongi-Profile: 1), voir agents.profiler.
+    Doit être placé après AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+        response, record = profile_call(request, lambda: self.get_response(request))
+        if record is None:
+            response["X-Mbongi-Profile"] = "busy"
+        else:
+            response["X-Mbongi-Profile"] = record.id
+            response["X-Mbongi-Profile-Url"] = reverse("staff_profile_report", args=[record.id])
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from agents.audit_chain import GENESIS_HASH, compute_entry_hash
+
+
+def backfill_hash_chain(apps, schema_editor):
+    # Chaînage des entrées existantes, par blocs, dans l'ordre des ids
+    AuditLog = apps.get_model("agents", "AuditLog")
+    db = schema_editor.connection.alias
+    prev_hash = GENESIS_HASH
+    last_id = 0
+    while True:
+        rows = list(
+            AuditLog.objects.using(db)
+            .filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "timestamp", "user_id", "action", "target_repr", "ip_address")[:5000]
+        )
+        if not rows:
+            break
+        for pk, timestamp, user_id, action, target_repr, ip_address in rows:
+            entry_hash = compute_entry_hash(prev_hash, timestamp, user_id, action, target_repr, ip_address)
+            AuditLog.objects.using(db).filter(pk=pk).update(prev_hash=prev_hash, entry_hash=entry_hash)
+            prev_hash = entry_hash
+            last_id = pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0029_alter_auditlog_action'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='entry_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='prev_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_hash_chain, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0030_auditlog_hash_chain'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['agent', '-date_creation'], name='contrib_agent_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='decision',
+            index=models.Index(fields=['contribution', '-created_at'], name='decision_contrib_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mission',
+            index=models.Index(fields=['agent_assigned', '-created_at'], name='mission_agent_created_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_service(apps, schema_editor):
+    Agent = apps.get_model("agents", "Agent")
+    Contribution = apps.get_model("agents", "Contribution")
+    Mission = apps.get_model("agents", "Mission")
+    RecoupementTicket = apps.get_model("agents", "RecoupementTicket")
+    db = schema_editor.connection.alias
+
+    Contribution.objects.using(db).update(
+        service_id=Subquery(Agent.objects.filter(pk=OuterRef("agent_id")).values("service_id")[:1])
+    )
+    Mission.objects.using(db).update(
+        service_id=Subquery(Agent.objects.filter(pk=OuterRef("agent_assigned_id")).values("service_id")[:1])
+    )
+    RecoupementTicket.objects.using(db).update(
+        service_id=Subquery(Agent.objects.filter(user_id=OuterRef("created_by_id")).values("service_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0031_visibility_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='service',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='service_contributions', to='agents.service'),
+        ),
+        migrations.AddField(
+            model_name='mission',
+            name='service',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='service_missions', to='agents.service'),
+        ),
+        migrations.AddField(
+            model_name='recoupementticket',
+            name='service',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='service_recoupements', to='agents.service'),
+        ),
+        migrations.RunPython(backfill_service, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0033_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='request_id',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
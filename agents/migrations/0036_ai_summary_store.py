@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0035_briefing_snapshots_pdf_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AISummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=80)),
+                ('prompt_version', models.CharField(max_length=20)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('summary', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contribution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ai_summaries', to='agents.contribution')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('model', 'prompt_version', 'content_hash'), name='aisummary_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0037_summary_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aisummary',
+            name='mission',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ai_summaries', to='agents.mission'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 21:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0038_ai_summary_mission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributionVector',
+            fields=[
+                ('contribution', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='agents.contribution')),
+                ('features', models.BinaryField()),
+                ('weights', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 6.0.1 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+# Champs indexés : titre, textes, agent, service, date (voir agents.search.SOURCES)
+SOURCES = {
+    "contribution": ("Contribution", "titre", ("contenu",), "agent_id", "service_id", "date_creation"),
+    "mission": ("Mission", "titre", ("description", "report"), "agent_assigned_id", "service_id", "created_at"),
+    "recoupement": ("RecoupementTicket", "title", ("evidence", "keywords"), None, "service_id", "created_at"),
+    "cns_avis": ("CNSAvis", "title", ("content", "recommendation"), None, None, "created_at"),
+}
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE agents_searchdocument_fts USING fts5("
+    "title, body, content='agents_searchdocument', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER agents_searchdocument_fts_ai AFTER INSERT ON agents_searchdocument BEGIN "
+    "INSERT INTO agents_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER agents_searchdocument_fts_ad AFTER DELETE ON agents_searchdocument BEGIN "
+    "INSERT INTO agents_searchdocument_fts(agents_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER agents_searchdocument_fts_au AFTER UPDATE OF title, body ON agents_searchdocument BEGIN "
+    "INSERT INTO agents_searchdocument_fts(agents_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO agents_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS agents_searchdocument_fts_au",
+    "DROP TRIGGER IF EXISTS agents_searchdocument_fts_ad",
+    "DROP TRIGGER IF EXISTS agents_searchdocument_fts_ai",
+    "DROP TABLE IF EXISTS agents_searchdocument_fts",
+]
+POSTGRES_FORWARD = [
+    "ALTER TABLE agents_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('french', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('french', coalesce(body, '')), 'B')) STORED",
+    "CREATE INDEX agents_searchdocument_vector_idx ON agents_searchdocument USING GIN (search_vector)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS agents_searchdocument_vector_idx",
+    "ALTER TABLE agents_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_REVERSE)
+
+
+def backfill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model("agents", "SearchDocument")
+    db = schema_editor.connection.alias
+    for kind, (model_name, title, body, agent, service, date) in SOURCES.items():
+        documents = [
+            SearchDocument(
+                kind=kind,
+                object_id=obj.pk,
+                service_id=getattr(obj, service) if service else None,
+                agent_id=getattr(obj, agent) if agent else None,
+                title=(getattr(obj, title) or "")[:200],
+                body="\n\n".join(getattr(obj, name) or "" for name in body),
+                created_at=getattr(obj, date),
+            )
+            for obj in apps.get_model("agents", model_name).objects.using(db).iterator()
+        ]
+        SearchDocument.objects.using(db).bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0039_contribution_vectors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('contribution', 'Contribution'), ('mission', 'Mission'), ('recoupement', 'Recoupement'), ('cns_avis', 'Avis CNS')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('service_id', models.BigIntegerField(blank=True, null=True)),
+                ('agent_id', models.BigIntegerField(blank=True, null=True)),
+                ('title', models.CharField(max_length=200)),
+                ('body', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdoc_kind_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 22:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0040_search_documents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pdfjob',
+            name='snapshot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='agents.briefingsnapshot'),
+        ),
+        migrations.AddConstraint(
+            model_name='pdfjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('snapshot__isnull', True)), fields=('document',), name='pdfjob_pending_snapshot_uniq'),
+        ),
+    ]
@@ -1,7 +1,56 @@
-from django.db import models
+from django.db import models, router
 from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .audit_chain import append_entries
+
+
+class VisibleQuerySet(models.QuerySet):
+    """
+    QuerySet filtrable par périmètre de visibilité.
+    Les sous-classes déclarent le chemin vers le service et vers l'agent.
+    """
+    service_lookup = None
+    agent_lookup = None
+
+    def visible_to(self, user):
+        from .visibility import visibility_scope
+
+        scope, value = visibility_scope(user)
+        if scope == "all":
+            return self
+        if scope == "service":
+            return self.filter(**{self.service_lookup: value})
+        if scope == "own":
+            return self.filter(**{self.agent_lookup: value})
+        return self.none()
+
+
+class AgentQuerySet(VisibleQuerySet):
+    service_lookup = "service_id"
+    agent_lookup = "pk"
+
+
+class ContributionQuerySet(VisibleQuerySet):
+    service_lookup = "service_id"
+    agent_lookup = "agent_id"
+
+
+class MissionQuerySet(VisibleQuerySet):
+    service_lookup = "service_id"
+    agent_lookup = "agent_assigned_id"
+
+
+class DecisionQuerySet(VisibleQuerySet):
+    service_lookup = "contribution__service_id"
+    agent_lookup = "contribution__agent_id"
+
+
+class SummaryJobQuerySet(VisibleQuerySet):
+    service_lookup = "contribution__service_id"
+    agent_lookup = "contribution__agent_id"
 
 
 class Service(models.Model):
@@ -41,11 +90,51 @@ class Agent(models.Model):
 
     date_creation = models.DateTimeField(auto_now_add=True)
 
+    objects = AgentQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.nom} {self.prenom} ({self.matricule})"
 
 
-class Contribution(models.Model):
+class DerivedServiceMixin:
+    """
+    Service dénormalisé recopié de l'agent propriétaire : recalculé à la
+    création et à chaque changement de propriétaire, comparé à la valeur
+    lue en base (_loaded_owner_id, aussi utilisé par agents.signals).
+    owner_field : attname de la FK propriétaire ; owner_agent_field : champ
+    de l'Agent qu'elle désigne ("pk" pour une FK Agent, "user_id" pour une
+    FK utilisateur).
+    """
+    owner_field = None
+    owner_agent_field = "pk"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get(cls.owner_field)
+        return instance
+
+    def derive_service_id(self):
+        owner_id = self.__dict__.get(self.owner_field)
+        # Agent déjà chargé (Contribution(agent=agent)) : pas de requête
+        owner = self._meta.get_field(self.owner_field.removesuffix("_id")).get_cached_value(self, None)
+        if isinstance(owner, Agent) and owner.pk == owner_id:
+            return owner.service_id
+        return Agent.objects.filter(**{self.owner_agent_field: owner_id}).values_list("service_id", flat=True).first()
+
+    def save(self, *args, **kwargs):
+        owner_id = self.__dict__.get(self.owner_field)
+        if owner_id and (self.service_id is None or owner_id != getattr(self, "_loaded_owner_id", None)):
+            self.service_id = self.derive_service_id()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "service"}
+        super().save(*args, **kwargs)
+        self._loaded_owner_id = owner_id
+
+
+class Contribution(DerivedServiceMixin, models.Model):
+    owner_field = "agent_id"
+
     STATUT_CHOICES = [
         ("DRAFT", "Brouillon"),
         ("SUBMITTED", "Soumise"),
@@ -58,6 +147,15 @@ class Contribution(models.Model):
         on_delete=models.PROTECT,
         related_name="contributions"
     )
+    # Service de l'agent, dénormalisé pour les filtres par service (voir agents.signals)
+    service = models.ForeignKey(
+        Service,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="service_contributions"
+    )
 
     titre = models.CharField(max_length=160)
     contenu = models.TextField()
@@ -84,6 +182,21 @@ class Contribution(models.Model):
     validated_at = models.DateTimeField(null=True, blank=True)
     decision_note = models.CharField(max_length=255, blank=True, default="")
 
+    objects = ContributionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Listes visibles (agent ou service via agent) triées par date
+            models.Index(fields=["agent", "-date_creation"], name="contrib_agent_date_idx"),
+            # Filtres des tableaux de bord (briefing, commandement, score agent)
+            models.Index(fields=["statut", "date_creation"], name="contrib_statut_date_idx"),
+            models.Index(fields=["statut", "validated_at"], name="contrib_statut_valid_idx"),
+            models.Index(fields=["agent", "statut"], name="contrib_agent_statut_idx"),
+            models.Index(fields=["service", "statut", "date_creation"], name="contrib_srv_statut_date_idx"),
+            # Fenêtres glissantes (signaux faibles, focus 72h, zones)
+            models.Index(fields=["date_creation"], name="contrib_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.titre} ({self.statut})"
 
@@ -103,9 +216,23 @@ class ContributionShare(models.Model):
         return f"Partage de '{self.contribution.titre}' de {self.service_source.nom} à {self.service_destinataire.nom}"
 
 
+class AuditLogQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Écriture groupée : les entrées sont chaînées en mémoire à partir
+        de la tête courante, puis insérées en une seule requête.
+        """
+        objs = list(objs)
+        if not objs:
+            return objs
+        return append_entries(self, objs, lambda: super(AuditLogQuerySet, self).bulk_create(objs, *args, **kwargs))
+
+
 class AuditLog(models.Model):
     """
     Journal d'audit pour les actions importantes.
+    Append-only et chaîné : chaque entrée stocke le hash de la précédente
+    (voir agents.audit_chain et la commande verify_audit_chain).
     """
     ACTION_CHOICES = [
         ("LOGIN", "Connexion"),
@@ -151,10 +278,22 @@ class AuditLog(models.Model):
         max_length=255, blank=True, help_text="Représentation textuelle de la cible de l'action"
     )
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Horodatage fixé avant l'insertion pour pouvoir être inclus dans le hash
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    prev_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+    entry_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+    # Identifiant de corrélation de la requête HTTP à l'origine de l'entrée
+    request_id = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+    objects = AuditLogQuerySet.as_manager()
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            # Chronologie 72h et traçabilité CNS (TRANSMIT / READ)
+            models.Index(fields=["timestamp"], name="auditlog_timestamp_idx"),
+            models.Index(fields=["action", "timestamp"], name="auditlog_action_ts_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} a effectué '{self.get_action_display()}' le {self.timestamp}"
@@ -162,7 +301,10 @@ class AuditLog(models.Model):
     def save(self, *args, **kwargs):
         if self.pk and not self._state.adding:
             raise ValidationError("AuditLog is append-only.")
-        return super().save(*args, **kwargs)
+        using = kwargs.get("using") or router.db_for_write(AuditLog, instance=self)
+        return append_entries(
+            AuditLog.objects.using(using), [self], lambda: super(AuditLog, self).save(*args, **kwargs)
+        )
 
     def delete(self, *args, **kwargs):
         raise ValidationError("AuditLog is append-only.")
@@ -244,11 +386,14 @@ class AgentStatus(models.Model):
         return f"{self.user.username}: {self.get_status_display()}"
 
 
-class RecoupementTicket(models.Model):
+class RecoupementTicket(DerivedServiceMixin, models.Model):
     """
     Ticket pour le suivi d'un recoupement d'information par un Chef de service,
     souvent initié à partir d'un signal faible.
     """
+    owner_field = "created_by_id"
+    owner_agent_field = "user_id"
+
     STATUS_CHOICES = [
         ('OPEN', 'Ouvert'),
         ('IN_PROGRESS', 'En cours'),
@@ -262,6 +407,8 @@ class RecoupementTicket(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='created_recoupements')
+    # Service du créateur, dénormalisé (voir agents.signals)
+    service = models.ForeignKey(Service, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='service_recoupements')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
     level = models.CharField(max_length=10, choices=LEVEL_CHOICES, default='YELLOW')
     
@@ -280,6 +427,9 @@ class RecoupementTicket(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="recoup_status_created_idx"),
+        ]
 
     def __str__(self):
         return f"Recoupement [{self.level}] {self.title}"
@@ -430,10 +580,12 @@ class FieldObservation(models.Model):
         return f"Observation [{self.zone}] - {self.subject} ({self.get_mood_display()})"
 
 
-class Mission(models.Model):
+class Mission(DerivedServiceMixin, models.Model):
     """
     Représente une mission assignée à un agent par un supérieur.
     """
+    owner_field = "agent_assigned_id"
+
     STATUS_CHOICES = [
         ('PENDING', 'En attente'),
         ('IN_PROGRESS', 'En cours'),
@@ -456,6 +608,15 @@ class Mission(models.Model):
         related_name='missions',
         verbose_name="Agent assigné"
     )
+    # Service de l'agent assigné, dénormalisé (voir agents.signals)
+    service = models.ForeignKey(
+        Service,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='service_missions'
+    )
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -479,8 +640,18 @@ class Mission(models.Model):
         related_name='escalated_missions'
     )
 
+    objects = MissionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["agent_assigned", "-created_at"], name="mission_agent_created_idx"),
+            # Filtres des tableaux de bord (briefing, commandement, score agent)
+            models.Index(fields=["status", "completed_at"], name="mission_status_done_idx"),
+            models.Index(fields=["agent_assigned", "status"], name="mission_agent_status_idx"),
+            models.Index(fields=["service", "status"], name="mission_service_status_idx"),
+            models.Index(fields=["status", "due_date"], name="mission_status_due_idx"),
+        ]
 
     def __str__(self):
         return f"Mission {self.titre}"
@@ -562,8 +733,195 @@ class Decision(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='made_decisions')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = DecisionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["contribution", "-created_at"], name="decision_contrib_created_idx"),
+        ]
 
     def __str__(self):
         return f"Décision {self.get_decision_display()} sur '{self.title}' (Niveau: {self.level})"
+
+
+class BriefingSnapshot(models.Model):
+    """
+    Données du briefing Présidence figées à un instant donné (JSON).
+    Source des exports PDF : un PDF généré pour un instantané est conservé
+    et resservi tel quel (voir PdfJob).
+    """
+    SOURCE_CHOICES = [
+        ('SCHEDULED', 'Planifié'),
+        ('ON_DEMAND', 'À la demande'),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='ON_DEMAND')
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Instantané briefing #{self.pk} ({self.created_at:%d/%m/%Y %H:%M})"
+
+
+def briefing_pdf_path(job, filename):
+    return f"briefings/{job.snapshot_id}/{job.document}.pdf"
+
+
+class PdfJob(models.Model):
+    """
+    Génération d'un PDF en arrière-plan, une par (instantané, document) :
+    les demandes répétées réutilisent le même job et le même fichier.
+    Sans instantané récent, le job est créé sans instantané (un seul par
+    document) et le prend lui-même avant le rendu.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('RUNNING', 'En cours'),
+        ('DONE', 'Terminé'),
+        ('FAILED', 'Échec'),
+    ]
+
+    snapshot = models.ForeignKey(BriefingSnapshot, on_delete=models.CASCADE, null=True, blank=True, related_name='pdf_jobs')
+    document = models.CharField(max_length=50, default='presidence_briefing')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='pdf_jobs')
+    file = models.FileField(upload_to=briefing_pdf_path, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=["snapshot", "document"], name="pdfjob_snapshot_document_uniq"),
+            models.UniqueConstraint(
+                fields=["document"], condition=models.Q(snapshot__isnull=True), name="pdfjob_pending_snapshot_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="pdfjob_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"PDF {self.document} (instantané #{self.snapshot_id}) - {self.get_status_display()}"
+
+
+class AISummary(models.Model):
+    """
+    Résumé IA persisté, clé (modèle, version du prompt, hash titre+contenu) :
+    un contenu identique résumé avec le même prompt n'est jamais renvoyé au
+    modèle. Les résumés d'une contribution ou d'un rapport de mission
+    modifiés sont supprimés (voir agents.signals) ; les résumés partiels des
+    textes longs (version "extrait-…") ne sont rattachés à aucun objet.
+    """
+    model = models.CharField(max_length=80)
+    prompt_version = models.CharField(max_length=20)
+    content_hash = models.CharField(max_length=64)
+    summary = models.TextField()
+    contribution = models.ForeignKey(Contribution, on_delete=models.CASCADE, null=True, blank=True, related_name='ai_summaries')
+    mission = models.ForeignKey(Mission, on_delete=models.CASCADE, null=True, blank=True, related_name='ai_summaries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=["model", "prompt_version", "content_hash"], name="aisummary_key_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Résumé IA {self.model}/{self.prompt_version} {self.content_hash[:12]}"
+
+
+class SummaryJob(models.Model):
+    """
+    Résumé IA d'une contribution calculé en arrière-plan (agents.summary_jobs),
+    avec reprises espacées en cas d'échec de l'appel au modèle. Un seul job
+    actif par version du texte d'une contribution.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('RUNNING', 'En cours'),
+        ('DONE', 'Terminé'),
+        ('FAILED', 'Échec'),
+    ]
+
+    contribution = models.ForeignKey(Contribution, on_delete=models.CASCADE, related_name='summary_jobs')
+    content_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='summary_jobs')
+    summary = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = SummaryJobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contribution", "content_hash"], condition=models.Q(status__in=["PENDING", "RUNNING"]),
+                name="summaryjob_active_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="summaryjob_status_next_idx"),
+        ]
+
+    def __str__(self):
+        return f"Résumé IA contribution #{self.contribution_id} - {self.get_status_display()}"
+
+
+class ContributionVector(models.Model):
+    """
+    Vecteur de termes hachés d'une contribution pour la recherche de
+    contributions liées (agents.related) : indices (int32) et poids tf
+    (float32), stockés tels quels en octets NumPy.
+    """
+    contribution = models.OneToOneField(Contribution, on_delete=models.CASCADE, primary_key=True, related_name='vector')
+    features = models.BinaryField()
+    weights = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Vecteur contribution #{self.contribution_id}"
+
+
+class SearchDocument(models.Model):
+    """
+    Texte indexé d'une contribution, d'une mission, d'un recoupement ou d'un
+    avis CNS pour la recherche plein texte (agents.search). Le moteur de la
+    base (FTS5 sous SQLite, tsvector + GIN sous PostgreSQL) est branché sur
+    cette table par la migration 0040. Service et agent sont recopiés pour
+    filtrer le périmètre dans la même requête.
+    """
+    KIND_CHOICES = [
+        ("contribution", "Contribution"),
+        ("mission", "Mission"),
+        ("recoupement", "Recoupement"),
+        ("cns_avis", "Avis CNS"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    service_id = models.BigIntegerField(null=True, blank=True)
+    agent_id = models.BigIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="searchdoc_kind_object_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
@@ -0,0 +1,256 @@
+"""
+Exports PDF du briefing Présidence en arrière-plan.
+
+- take_snapshot() fige les données du briefing (BriefingSnapshot).
+- request_pdf() crée (ou retrouve) le PdfJob de l'instantané et le met en
+  file : le PDF est rendu après le commit par un pool de threads du
+  process, ou par la commande run_pdf_jobs (reprise des jobs orphelins).
+  Sans instantané récent (fresh_snapshot), le job prend lui-même
+  l'instantané : la requête HTTP ne calcule ni données ni PDF.
+- Un job RUNNING depuis plus de MBONGI_PDF_STALE_AFTER secondes (process
+  interrompu) est remis en file à la demande suivante.
+- Le fichier produit est conservé (MEDIA_ROOT/briefings/<instantané>/) :
+  les téléchargements suivants ne sont qu'une lecture de fichier.
+
+La commande refresh_briefing_snapshot (planifiée) prend un instantané et
+génère son PDF dans la foulée.
+"""
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from reportlab.lib.units import cm
+
+from .briefing import snapshot_data
+from .metrics import PDF_RENDER_LATENCY
+from .models import BriefingSnapshot, PdfJob
+from .reporting import Report
+
+logger = logging.getLogger("agents.pdf")
+
+BRIEFING_DOCUMENT = "presidence_briefing"
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "MBONGI_PDF_WORKERS", 2), thread_name_prefix="mbongi-pdf",
+)
+
+
+# --- Instantanés ---
+
+def take_snapshot(source="ON_DEMAND", now=None):
+    now = now or timezone.now()
+    return BriefingSnapshot.objects.create(source=source, data=snapshot_data(now))
+
+
+def fresh_snapshot():
+    """ Dernier instantané s'il a moins de MBONGI_SNAPSHOT_MAX_AGE secondes, sinon None. """
+    max_age = getattr(settings, "MBONGI_SNAPSHOT_MAX_AGE", 900)
+    return BriefingSnapshot.objects.filter(
+        created_at__gte=timezone.now() - timedelta(seconds=max_age)
+    ).order_by("-created_at").first()
+
+
+# --- Jobs ---
+
+def stale_delay():
+    return timedelta(seconds=getattr(settings, "MBONGI_PDF_STALE_AFTER", 600))
+
+
+def get_pdf_job(snapshot, user=None, document=BRIEFING_DOCUMENT):
+    """ Job PDF de l'instantané (None : instantané à prendre par le job), remis en attente après un échec. """
+    job, _ = PdfJob.objects.get_or_create(snapshot=snapshot, document=document, defaults={"requested_by": user})
+    if job.status == "FAILED":
+        # Nouvelle demande après un échec : on retente
+        PdfJob.objects.filter(pk=job.pk, status="FAILED").update(status="PENDING", error="")
+        job.refresh_from_db()
+    return job
+
+
+def revive_job(job):
+    """ Remet en file (après commit) le job s'il est RUNNING depuis plus de stale_delay(). """
+    if job.status == "RUNNING" and PdfJob.objects.filter(
+        pk=job.pk, status="RUNNING", started_at__lt=timezone.now() - stale_delay(),
+    ).update(status="PENDING"):
+        job.refresh_from_db()
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, job.pk))
+    return job
+
+
+def request_pdf(snapshot, user=None, document=BRIEFING_DOCUMENT):
+    """ Job PDF de l'instantané (None : à prendre par le job), mis en file (après commit) s'il reste à générer. """
+    job = get_pdf_job(snapshot, user, document)
+    if job.status == "PENDING":
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, job.pk))
+        return job
+    return revive_job(job)
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def run_job(job_id):
+    """
+    Génère le PDF du job s'il est encore en attente (réservation atomique :
+    un seul thread / process le traite). Retourne le job à jour.
+    """
+    claimed = PdfJob.objects.filter(pk=job_id, status="PENDING").update(status="RUNNING", started_at=timezone.now())
+    job = PdfJob.objects.select_related("snapshot").get(pk=job_id)
+    if not claimed:
+        return job
+
+    started = time.perf_counter()
+    try:
+        if job.snapshot is None:
+            job.snapshot = take_snapshot()
+            job.save(update_fields=["snapshot"])
+            job.snapshot.refresh_from_db(fields=["data"])  # données relues en JSON, comme un instantané existant
+        # Rendu dans un fichier temporaire (sur disque au-delà de 8 Mo) puis copie vers le stockage
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+            render_briefing_pdf(job.snapshot.data, output)
+            output.seek(0)
+            job.file.save(f"{job.document}.pdf", File(output), save=False)
+    except Exception as exc:
+        job.status = "FAILED"
+        job.error = f"{type(exc).__name__}: {exc}"
+        logger.exception("pdf job failed", extra={"document": job.document, "job": job.pk})
+    else:
+        job.status = "DONE"
+        duration = time.perf_counter() - started
+        PDF_RENDER_LATENCY.observe(duration, document=job.document)
+        logger.info(
+            "pdf rendered",
+            extra={"document": job.document, "job": job.pk, "snapshot": job.snapshot_id, "duration_ms": round(duration * 1000, 1)},
+        )
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "file", "finished_at"])
+    return job
+
+
+def run_pending_jobs(stale_after=None, limit=None):
+    """
+    Traite les jobs en attente (commande run_pdf_jobs). Les jobs RUNNING
+    depuis plus de stale_after (défaut MBONGI_PDF_STALE_AFTER, process
+    interrompu) sont remis en file.
+    """
+    stale_after = stale_after or stale_delay()
+    PdfJob.objects.filter(status="RUNNING", started_at__lt=timezone.now() - stale_after).update(status="PENDING")
+    job_ids = list(PdfJob.objects.filter(status="PENDING").order_by("created_at").values_list("pk", flat=True)[:limit])
+    return [run_job(job_id) for job_id in job_ids]
+
+
+# --- Rendu ---
+
+def _format_ts(value, fmt='%d/%m %H:%M'):
+    return timezone.localtime(parse_datetime(value)).strftime(fmt) if value else ""
+
+
+def render_briefing_pdf(data, output):
+    """ Écrit le PDF du briefing (données d'un instantané) dans `output`. """
+    generated_at = _format_ts(data["generated_at"], '%d/%m/%Y %H:%M:%S')
+    report = Report("BRIEFING PRÉSIDENCE MBONGI-INTEL", subtitle=f"Instantané du {generated_at}")
+
+    report.heading(f"Statut national : {data['national_status']}")
+    report.paragraph(data["national_status_summary"])
+
+    report.heading(f"Alertes intelligentes ({data['alert_level']})")
+    report.bullets(data["alert_reasons"], empty="Aucune alerte significative.")
+
+    report.heading("Synthèse IA & projection")
+    for key in ("ai_summary", "ai_projection", "ai_recommendation"):
+        report.paragraph(data[key])
+
+    kpis = data.get("kpis", {})
+    kpi_presidence = data.get("kpi_presidence", {})
+    report.heading("Indicateurs clés")
+    report.key_values([
+        ("Contributions soumises / validées / rejetées (24h)",
+         f"{kpis.get('contrib_submitted_24h', 0)} / {kpis.get('contrib_validated_24h', 0)} / {kpis.get('contrib_rejected_24h', 0)}"),
+        ("Missions en cours / critiques", f"{kpis.get('missions_in_progress', 0)} / {kpis.get('missions_critical', 0)}"),
+        ("Missions échouées (7j)", data.get("kpi_missions_failed_7d", 0)),
+        ("Recoupements ouverts / en retard",
+         f"{kpi_presidence.get('recoupements_open', 0)} / {kpi_presidence.get('recoupements_overdue', 0)}"),
+        ("Événements d'audit sensibles (24h)", kpis.get("sensitive_audit_events_24h", 0)),
+        ("Score global moyen", data.get("global_score_avg", 0)),
+    ])
+
+    state_reaction = data.get("state_reaction")
+    if state_reaction:
+        report.heading("Réaction de l'État", level=2)
+        report.paragraph(
+            f"{state_reaction['overdue_message']} - {state_reaction['in_progress_recoupements']} recoupement(s) en cours, "
+            f"{state_reaction['escalated_missions']} mission(s) escaladée(s) en 72h."
+        )
+        report.bullets(
+            [f"{service['name']} : {service['overdue_count']} recoupement(s) en retard" for service in state_reaction["services_under_pressure"]],
+            empty="Aucun service sous pression.",
+        )
+
+    if "zone_evolution" in data:
+        report.heading("Évolution par zone (7 jours)")
+        report.table(
+            ["Zone", "Risque", "Tendance", "Incidents 7j / 7j préc.", "Foyers", "Signaux", "Recommandation"],
+            [
+                [
+                    zone, values["risk"], values["trend"], f"{values['incidents_7d']} / {values['incidents_prev7d']}",
+                    ", ".join(values["hotspots"]) or "-", ", ".join(values["top_signals"]) or "-", values["recommendation"],
+                ]
+                for zone, values in data["zone_evolution"].items()
+            ],
+            col_widths=[2 * cm, 1.7 * cm, 1.7 * cm, 2.2 * cm, 2.8 * cm, 3.2 * cm, None],
+        )
+
+    if "weak_signals" in data:
+        report.heading("Signaux faibles (72h)")
+        report.table(
+            ["Niveau", "Signal", "Tendance", "Éléments", "Action"],
+            [[signal["level"], signal["title"], signal["trend"], signal["evidence"], signal["action_hint"]] for signal in data["weak_signals"]],
+            col_widths=[1.6 * cm, 3.5 * cm, 1.8 * cm, 4 * cm, None],
+            empty="Aucun signal faible détecté.",
+        )
+
+    if "institutional_actions" in data:
+        report.heading("Dernières actions institutionnelles (72h)")
+        report.table(
+            ["Date", "Type", "Objet", "Acteur", "Statut", "Niveau"],
+            [
+                [_format_ts(action["date"]), action["type"], action["objet"], action["actor"], action["status"], action["level"]]
+                for action in data["institutional_actions"]
+            ],
+            col_widths=[2 * cm, 1.8 * cm, None, 2.4 * cm, 2.2 * cm, 1.6 * cm],
+            empty="Aucune action institutionnelle récente.",
+        )
+
+    report.heading("Chronologie nationale - 72h")
+    report.table(
+        ["Date", "Source", "Utilisateur", "Action", "Objet"],
+        [
+            [_format_ts(event["timestamp"]), event["event_type"], event["user"] or "Système", event["action_display"], event["target_repr"]]
+            for event in data["timeline_events"]
+        ],
+        col_widths=[2 * cm, 2 * cm, 2.6 * cm, 3.4 * cm, None],
+        empty="Aucune activité récente dans les dernières 72 heures.",
+    )
+
+    report.heading("Dernières décisions")
+    report.table(
+        ["Date", "Utilisateur", "Action", "Objet"],
+        [
+            [_format_ts(decision["timestamp"]), decision["user"] or "Système", decision["action_display"], decision["target_repr"]]
+            for decision in data["latest_decisions"]
+        ],
+        col_widths=[2 * cm, 2.6 * cm, 3.4 * cm, None],
+        empty="Aucune décision récente.",
+    )
+
+    report.render(output, time_budget=getattr(settings, "MBONGI_PDF_TIME_BUDGET", 20))
@@ -0,0 +1,102 @@
+"""
+Mesures de performance par requête : nombre de requêtes SQL, temps DB,
+temps de rendu des templates et latence totale.
+
+Les mesures de la requête en cours sont portées par une ContextVar,
+alimentée par agents.middleware.RequestStatsMiddleware (SQL, total) et
+par agents.templating.TimedDjangoTemplates (rendu).
+"""
+import contextvars
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+# Budget de requêtes SQL par vue chaude (nom d'URL -> nombre maximal), cache
+# froid. Le score agent étant calculé par agent, le coût croît avec la taille
+# des équipes : les budgets sont calibrés sur le jeu de test (8 agents).
+# Briefing et commandement : page coquille seule (panneaux lents en fragments).
+QUERY_BUDGETS = {
+    "presidence_briefing": 40,
+    "chef_commandement": 24,
+    "team_view": 48,
+    "agent_console": 18,
+}
+
+slow_query_logger = logging.getLogger("agents.db.slow")
+
+_current_stats = contextvars.ContextVar("mbongi_request_stats", default=None)
+
+
+@dataclass
+class RequestStats:
+    view_name: str = ""
+    queries: int = 0
+    db_time: float = 0.0
+    render_time: float = 0.0
+    total_time: float = 0.0
+    # Les panneaux du briefing (agents.briefing) exécutent leurs requêtes
+    # dans des threads qui partagent ces compteurs
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, queries=0, db_time=0.0, render_time=0.0):
+        with self._lock:
+            self.queries += queries
+            self.db_time += db_time
+            self.render_time += render_time
+
+    def as_dict(self):
+        return {
+            "view": self.view_name,
+            "queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 1),
+            "render_ms": round(self.render_time * 1000, 1),
+            "total_ms": round(self.total_time * 1000, 1),
+        }
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        """
+        execute_wrapper Django : compte et chronomètre chaque requête, et
+        journalise celles qui dépassent MBONGI_SLOW_QUERY_MS.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(queries=1, db_time=elapsed)
+            threshold_ms = getattr(settings, "MBONGI_SLOW_QUERY_MS", 500)
+            if elapsed * 1000 >= threshold_ms:
+                slow_query_logger.warning(
+                    "slow query %.1f ms in %s",
+                    elapsed * 1000, self.view_name or "-",
+                    extra={
+                        "view": self.view_name,
+                        "duration_ms": round(elapsed * 1000, 1),
+                        "threshold_ms": threshold_ms,
+                        "sql": sql[:2000],
+                        "db_alias": context["connection"].alias,
+                    },
+                )
+
+
+def start_request_stats():
+    stats = RequestStats()
+    return stats, _current_stats.set(stats)
+
+
+def stop_request_stats(token):
+    _current_stats.reset(token)
+
+
+def current_request_stats():
+    return _current_stats.get()
+
+
+def add_render_time(seconds):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add(render_time=seconds)
+
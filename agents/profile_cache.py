@@ -0,0 +1,87 @@
+"""
+Cache inter-requêtes du profil de sécurité d'un utilisateur.
+
+Pour chaque user id : ensemble des rôles (groupes), id de l'agent lié,
+id et nom de son service et indicateur actif. Le backend est un cache
+Django (alias MBONGI_PROFILE_CACHE) via agents.cache, partagé (Redis) en
+production. Les entrées sont invalidées par les signaux de agents.signals.
+
+Ces signaux ne touchent que le cache du process qui les émet : avec un
+backend propre à chaque process (mémoire locale), un rôle retiré resterait
+actif dans les autres workers. Le profil n'est alors pas mis en cache entre
+les requêtes, sauf si MBONGI_PROFILE_CACHE_LOCAL l'autorise explicitement
+(process unique : tests, runserver).
+"""
+import logging
+
+from django.conf import settings
+
+from .cache import CacheNamespace
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_TTL = 300
+# Backends non partagés entre process
+LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+_warned = False
+
+
+def _alias():
+    return getattr(settings, "MBONGI_PROFILE_CACHE", "default")
+
+
+def cache_enabled():
+    """ Cache inter-requêtes utilisable : backend partagé entre les process, ou local autorisé. """
+    global _warned
+    if settings.CACHES[_alias()]["BACKEND"] not in LOCAL_BACKENDS:
+        return True
+    if getattr(settings, "MBONGI_PROFILE_CACHE_LOCAL", False):
+        return True
+    if not _warned:
+        _warned = True
+        logger.warning("profile cache disabled: cache alias %r is local to each process", _alias())
+    return False
+
+
+def _cache():
+    return CacheNamespace("profile:v2", ttl=PROFILE_CACHE_TTL, alias=_alias())
+
+
+def _load_profile(user):
+    from .models import Agent
+
+    agent = Agent.objects.filter(user_id=user.pk).values("id", "service_id", "actif").first()
+    return {
+        "roles": sorted(user.groups.values_list("name", flat=True)),
+        "agent_id": agent["id"] if agent else None,
+        "service_id": agent["service_id"] if agent else None,
+        "agent_actif": bool(agent and agent["actif"]),
+    }
+
+
+def get_user_profile(user):
+    """
+    Profil {roles, agent_id, service_id, agent_actif} de
+    l'utilisateur, mémorisé sur l'objet user et mis en cache entre les
+    requêtes (voir cache_enabled).
+    """
+    if not user or not user.is_authenticated:
+        return None
+    profile = getattr(user, "_mbongi_profile", None)
+    if profile is None:
+        if cache_enabled():
+            profile = _cache().get_or_set(user.pk, lambda: _load_profile(user))
+        else:
+            profile = _load_profile(user)
+        user._mbongi_profile = profile
+    return profile
+
+
+def invalidate_user_profiles(user_ids):
+    """ Supprime les profils en cache des utilisateurs donnés. """
+    if cache_enabled():
+        _cache().delete_many([user_id for user_id in user_ids if user_id is not None])
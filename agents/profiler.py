@@ -0,0 +1,174 @@
+"""
+Profilage à la demande d'une requête (staff uniquement).
+
+Déclenchement : paramètre ?_profile=1 ou en-tête "X-Mbongi-Profile: 1".
+La requête est exécutée sous cProfile avec capture des requêtes SQL ;
+le résultat est conservé dans un tampon circulaire borné (par process)
+et téléchargeable depuis /agents/staff/profiles/.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+# Texte SQL conservé par requête (borne mémoire du tampon)
+MAX_SQL_LENGTH = 2000
+
+# Une seule session cProfile à la fois par process (cProfile est global)
+_profiling_lock = threading.Lock()
+_buffer_lock = threading.Lock()
+_buffer = deque(maxlen=getattr(settings, "MBONGI_PROFILER_MAX", 20))
+
+
+@dataclass
+class RequestProfile:
+    id: str
+    created_at: datetime
+    method: str
+    path: str
+    view_name: str
+    username: str
+    status: int
+    total_ms: float
+    stats: bytes
+    queries: list = field(default_factory=list)
+
+    @property
+    def db_ms(self):
+        return sum(query["ms"] for query in self.queries)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "method": self.method,
+            "path": self.path,
+            "view": self.view_name,
+            "user": self.username,
+            "status": self.status,
+            "total_ms": round(self.total_ms, 1),
+            "db_ms": round(self.db_ms, 1),
+            "queries": len(self.queries),
+        }
+
+    def report(self, limit=60):
+        """ Rapport texte : fonctions les plus coûteuses puis requêtes SQL. """
+        out = io.StringIO()
+        summary = self.summary()
+        out.write(
+            f"{summary['method']} {summary['path']} ({summary['view']}) -> {summary['status']}\n"
+            f"utilisateur={summary['user']} total={summary['total_ms']} ms "
+            f"db={summary['db_ms']} ms requêtes={summary['queries']}\n\n"
+        )
+        out.write("=== cProfile (cumulatif) ===\n")
+        stats = pstats.Stats(_StatsSource(self.stats), stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        out.write("\n=== Requêtes SQL (par durée) ===\n")
+        for query in sorted(self.queries, key=lambda q: q["ms"], reverse=True):
+            out.write(f"{query['ms']:9.2f} ms  {query['sql']}\n")
+        return out.getvalue()
+
+
+class _StatsSource:
+    """ Adaptateur pour pstats.Stats à partir d'un dump marshal. """
+
+    def __init__(self, data):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+def should_profile(request):
+    if not getattr(settings, "MBONGI_PROFILER_ENABLED", True):
+        return False
+    if request.GET.get("_profile") != "1" and request.headers.get("X-Mbongi-Profile") != "1":
+        return False
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+def profile_call(request, func):
+    """
+    Exécute func() sous cProfile en capturant les requêtes SQL.
+    Retourne (réponse, RequestProfile) ou (réponse, None) si une autre
+    session de profilage est déjà en cours dans ce process.
+    """
+    if not _profiling_lock.acquire(blocking=False):
+        return func(), None
+    try:
+        queries = []
+
+        def capture_sql(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append({"sql": sql[:MAX_SQL_LENGTH], "ms": (time.perf_counter() - start) * 1000})
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(capture_sql))
+            try:
+                profiler.enable()
+            except ValueError:
+                # Autre profileur actif (ex. couverture de tests) : pas de profil
+                return func(), None
+            try:
+                response = func()
+            finally:
+                profiler.disable()
+        total_ms = (time.perf_counter() - start) * 1000
+        profiler.create_stats()
+    finally:
+        _profiling_lock.release()
+
+    match = getattr(request, "resolver_match", None)
+    record = RequestProfile(
+        id=uuid.uuid4().hex[:12],
+        created_at=timezone.now(),
+        method=request.method,
+        path=request.path,
+        view_name=(match.view_name if match else "") or "-",
+        username=request.user.get_username(),
+        status=response.status_code,
+        total_ms=total_ms,
+        stats=marshal.dumps(profiler.stats),
+        queries=queries,
+    )
+    store_profile(record)
+    return response, record
+
+
+def store_profile(record):
+    with _buffer_lock:
+        _buffer.append(record)
+
+
+def list_profiles():
+    """ Profils conservés, du plus récent au plus ancien. """
+    with _buffer_lock:
+        return list(reversed(_buffer))
+
+
+def get_profile(profile_id):
+    with _buffer_lock:
+        return next((record for record in _buffer if record.id == profile_id), None)
+
+
+def clear_profiles():
+    with _buffer_lock:
+        _buffer.clear()
@@ -0,0 +1,312 @@
+"""
+Contributions liées (similarité TF-IDF sur termes hachés, sans service externe).
+
+- Chaque contribution a un vecteur de termes hachés (ContributionVector) :
+  indices int32 et poids tf float32, recalculé à l'enregistrement (signal
+  post_save) ou par la commande rebuild_related_index.
+- Chaque process garde un index en mémoire (tableaux NumPy triés par terme,
+  pondérés TF-IDF et normalisés). Les changements sont détectés en base
+  (date de dernière modification et nombre de vecteurs) : seuls les
+  vecteurs modifiés sont relus et ajoutés à un delta, l'instantané complet
+  est reconstruit en arrière-plan quand le delta grossit.
+- Une recherche ne parcourt que les listes des termes de la contribution
+  source (searchsorted + bincount) puis masque les contributions hors du
+  périmètre de l'utilisateur (visibility_scope).
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Contribution, ContributionVector
+from .visibility import visibility_scope
+
+# Espace des termes hachés (collisions rares, tableau idf de 4 Mo)
+N_FEATURES = 2 ** 20
+# Poids des termes du titre par rapport à ceux du contenu
+TITLE_WEIGHT = 2
+# Marge de relecture des vecteurs (transactions validées après un chargement)
+REFRESH_MARGIN = timedelta(seconds=60)
+# Taille du delta (vecteurs modifiés) au-delà de laquelle l'instantané est reconstruit
+REBUILD_MIN_DELTA = 200
+
+STOPWORDS = frozenset("""
+les des une est pour dans par sur avec aux ces ses son sont pas plus que qui
+mais elle ils elles nous vous leur leurs cette cet tout tous etre avoir fait
+ete entre sans sous apres avant aussi comme donc alors ainsi dont lors non
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]{3,}")
+
+
+def tokenize(text):
+    """ Mots normalisés (minuscules, sans accents), hors mots vides. """
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    return [token for token in _TOKEN.findall(text) if token not in STOPWORDS]
+
+
+def vectorize(titre, contenu):
+    """ (indices, poids tf) du texte : indices int32 triés, poids 1 + log(n) en float32. """
+    counts = Counter()
+    for token in tokenize(titre):
+        counts[zlib.crc32(token.encode("ascii")) % N_FEATURES] += TITLE_WEIGHT
+    for token in tokenize(contenu):
+        counts[zlib.crc32(token.encode("ascii")) % N_FEATURES] += 1
+    features = np.array(sorted(counts), dtype=np.int32)
+    weights = np.array([1 + math.log(counts[feature]) for feature in features.tolist()], dtype=np.float32)
+    return features, weights
+
+
+def update_vector(contribution):
+    """ Recalcule le vecteur de la contribution (les index des process le voient via updated_at). """
+    features, weights = vectorize(contribution.titre, contribution.contenu)
+    ContributionVector.objects.update_or_create(
+        contribution=contribution, defaults={"features": features.tobytes(), "weights": weights.tobytes()},
+    )
+
+
+def touch_vectors(contribution_ids):
+    """ Signale aux index un changement de périmètre (service, agent) sans changement de texte. """
+    return ContributionVector.objects.filter(contribution_id__in=contribution_ids).update(updated_at=timezone.now())
+
+
+def rebuild_vectors(batch_size=500):
+    """ Recalcule les vecteurs de toutes les contributions (commande rebuild_related_index). """
+    total = 0
+    queryset = Contribution.objects.only("id", "titre", "contenu").order_by("pk")
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        vectors = []
+        for contribution in batch:
+            features, weights = vectorize(contribution.titre, contribution.contenu)
+            vectors.append(ContributionVector(contribution=contribution, features=features.tobytes(), weights=weights.tobytes()))
+        ContributionVector.objects.bulk_create(
+            vectors, update_conflicts=True, unique_fields=["contribution"], update_fields=["features", "weights", "updated_at"],
+        )
+        total += len(batch)
+        last_pk = batch[-1].pk
+    return total
+
+
+def _signature():
+    """ (dernière modification, nombre) des vecteurs : change à chaque ajout, modification ou suppression. """
+    return tuple(ContributionVector.objects.aggregate(last=Max("updated_at"), count=Count("pk")).values())
+
+
+def _rows(queryset):
+    for pk, features, weights, service_id, agent_id in queryset.values_list(
+        "contribution_id", "features", "weights", "contribution__service_id", "contribution__agent_id",
+    ):
+        yield pk, np.frombuffer(features, dtype=np.int32), np.frombuffer(weights, dtype=np.float32), service_id, agent_id
+
+
+def _normalize(features, weights, idf):
+    weights = weights * idf[features]
+    return weights / max(float(np.linalg.norm(weights)), 1e-12)
+
+
+class Snapshot:
+    """ Index TF-IDF figé (tableaux NumPy triés par terme), construit en une fois. """
+
+    def __init__(self, rows):
+        ids, lengths, all_features, all_weights, services, agents = [], [], [], [], [], []
+        for pk, features, weights, service_id, agent_id in sorted(rows, key=lambda row: row[0]):
+            ids.append(pk)
+            lengths.append(len(features))
+            all_features.append(features)
+            all_weights.append(weights)
+            services.append(-1 if service_id is None else service_id)
+            agents.append(agent_id)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.position = {pk: index for index, pk in enumerate(ids)}
+        features = np.concatenate(all_features) if ids else np.zeros(0, dtype=np.int32)
+        weights = np.concatenate(all_weights) if ids else np.zeros(0, dtype=np.float32)
+        rows = np.repeat(np.arange(len(ids), dtype=np.int32), np.array(lengths, dtype=np.int64))
+
+        df = np.bincount(features, minlength=N_FEATURES)
+        self.idf = (np.log((1 + len(ids)) / (1 + df)) + 1).astype(np.float32)
+        weights = weights * self.idf[features]
+        norms = np.sqrt(np.bincount(rows, weights=weights.astype(np.float64) ** 2, minlength=len(ids)))
+        weights = (weights / np.maximum(norms, 1e-12)[rows]).astype(np.float32)
+
+        order = np.argsort(features, kind="stable")
+        self.features, self.rows, self.weights = features[order], rows[order], weights[order]
+        self.services = np.array(services, dtype=np.int64)
+        self.agents = np.array(agents, dtype=np.int64)
+
+    def scores(self, query_features, query_weights):
+        """ Similarité cosinus de chaque contribution de l'instantané (parcours des seuls termes de la requête). """
+        starts = np.searchsorted(self.features, query_features, side="left")
+        ends = np.searchsorted(self.features, query_features, side="right")
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(len(self.ids))
+        postings = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends) if end > start])
+        return np.bincount(
+            self.rows[postings], weights=self.weights[postings] * np.repeat(query_weights, lengths), minlength=len(self.ids),
+        )
+
+
+@dataclass(frozen=True)
+class IndexState:
+    """
+    Instantané, vecteurs modifiés depuis (delta), contributions supprimées
+    et lignes périmées de l'instantané : remplacés ensemble, en une seule
+    affectation, pour qu'une recherche ne voie jamais un mélange.
+    """
+    snapshot: Snapshot
+    delta: dict = field(default_factory=dict)
+    removed: frozenset = frozenset()
+    stale: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+
+class RelatedIndex:
+    """
+    Index du process : un instantané (Snapshot) plus les vecteurs modifiés
+    depuis (delta), relus en base quand la signature des vecteurs change
+    (au plus toutes les MBONGI_RELATED_CHECK_INTERVAL secondes). Les lignes
+    périmées de l'instantané sont masquées et le delta est comparé
+    directement. Quand le delta grossit, un nouvel instantané est construit
+    dans un thread, hors des requêtes, puis substitué. L'état (IndexState)
+    n'est remplacé que sous le verrou ; les recherches le lisent une fois.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+        self._signature = None
+        self._watermark = None
+        self._checked_at = 0
+        self._rebuilding = False
+
+    def refresh(self):
+        interval = getattr(settings, "MBONGI_RELATED_CHECK_INTERVAL", 2)
+        if self._state is not None and time.monotonic() - self._checked_at < interval:
+            return
+        with self._lock:
+            self._checked_at = time.monotonic()
+            signature = _signature()
+            if self._state is None:
+                # Premier chargement du process
+                self._state = IndexState(Snapshot(_rows(ContributionVector.objects.all())))
+                self._signature, self._watermark = signature, signature[0]
+                return
+            if signature == self._signature:
+                return
+            self._apply_changes(signature)
+            state = self._state
+            if len(state.delta) > max(REBUILD_MIN_DELTA, len(state.snapshot.ids) // 10) and not self._rebuilding:
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild, name="mbongi-related-index", daemon=True).start()
+
+    def _apply_changes(self, signature):
+        state = self._state
+        snapshot, delta = state.snapshot, dict(state.delta)
+        rows = ContributionVector.objects.all()
+        if self._watermark is not None:
+            rows = rows.filter(updated_at__gte=self._watermark - REFRESH_MARGIN)
+        for pk, features, weights, service_id, agent_id in _rows(rows):
+            delta[pk] = (features, _normalize(features, weights, snapshot.idf), -1 if service_id is None else service_id, agent_id)
+        removed = state.removed
+        if len((set(snapshot.position) - removed) | set(delta)) != signature[1]:
+            # Suppressions : seules les contributions encore présentes sont gardées
+            live = set(ContributionVector.objects.values_list("contribution_id", flat=True))
+            delta = {pk: doc for pk, doc in delta.items() if pk in live}
+            removed = frozenset(set(snapshot.position) - live)
+        stale = [snapshot.position[pk] for pk in set(delta) | removed if pk in snapshot.position]
+        stale = np.array(sorted(set(state.stale.tolist()) | set(stale)), dtype=np.int64)
+        self._state = IndexState(snapshot, delta, removed, stale)
+        self._signature, self._watermark = signature, signature[0]
+
+    def _rebuild(self):
+        try:
+            signature = _signature()
+            snapshot = Snapshot(_rows(ContributionVector.objects.all()))
+            with self._lock:
+                self._state = IndexState(snapshot)
+                # Les modifications postérieures au chargement sont relues au prochain refresh
+                self._signature, self._watermark = None, signature[0]
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            connection.close()
+
+    def query(self, features, weights, scope, value, exclude=None, k=5):
+        """ [(pk, score)] des k contributions les plus proches dans le périmètre (scope, value). """
+        state = self._state
+        if scope == "none" or state is None or not len(features):
+            return []
+        snapshot, delta, stale = state.snapshot, state.delta, state.stale
+        query = _normalize(features, weights, snapshot.idf)
+
+        scores = snapshot.scores(features, query)
+        if scope == "service":
+            scores[snapshot.services != value] = 0
+        elif scope == "own":
+            scores[snapshot.agents != value] = 0
+        scores[stale] = 0
+        if exclude in snapshot.position:
+            scores[snapshot.position[exclude]] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        hits = [(int(snapshot.ids[index]), float(scores[index])) for index in candidates]
+
+        for pk, (doc_features, doc_weights, service_id, agent_id) in delta.items():
+            if pk == exclude or (scope == "service" and service_id != value) or (scope == "own" and agent_id != value):
+                continue
+            _, query_index, doc_index = np.intersect1d(features, doc_features, assume_unique=True, return_indices=True)
+            score = float(np.dot(query[query_index], doc_weights[doc_index]))
+            if score > 0:
+                hits.append((pk, score))
+        hits.sort(key=lambda hit: -hit[1])
+        return [(pk, round(score, 4)) for pk, score in hits[:k]]
+
+
+_index = RelatedIndex()
+
+
+def reset_index():
+    """ Oublie l'index du process ; il est rechargé en entier à la requête suivante (tests). """
+    global _index
+    _index = RelatedIndex()
+
+
+def related_contributions(contribution, user, k=5):
+    """ Contributions les plus proches de `contribution` visibles par `user` : [{id, titre, ..., score}]. """
+    vector = ContributionVector.objects.filter(contribution=contribution).values_list("features", "weights").first()
+    if vector is not None:
+        features, weights = np.frombuffer(vector[0], dtype=np.int32), np.frombuffer(vector[1], dtype=np.float32)
+    else:
+        features, weights = vectorize(contribution.titre, contribution.contenu)
+
+    _index.refresh()
+    scope, value = visibility_scope(user)
+    hits = _index.query(features, weights, scope, value, exclude=contribution.pk, k=k)
+    # Relecture filtrée : l'index peut avoir un temps de retard (changement de service)
+    rows = Contribution.objects.visible_to(user).in_bulk([pk for pk, _ in hits])
+    return [
+        {
+            "id": pk,
+            "titre": rows[pk].titre,
+            "statut": rows[pk].statut,
+            "date_creation": rows[pk].date_creation,
+            "score": score,
+        }
+        for pk, score in hits
+        if pk in rows
+    ]
@@ -0,0 +1,166 @@
+"""
+Mise en page des rapports PDF (ReportLab platypus).
+
+Un Report empile des éléments (titres, paragraphes à retour à la ligne,
+listes, tableaux) ; la pagination, l'en-tête et le pied de page sont gérés
+par ReportLab. Les styles sont construits une seule fois par process.
+
+Le document est écrit directement dans le fichier de sortie fourni (fichier
+temporaire, réponse HTTP...) sans copie intermédiaire en mémoire, et le
+rendu est interrompu (ReportTimeBudgetExceeded) au-delà du budget de temps.
+
+Exemple :
+    report = Report("BRIEFING PRÉSIDENCE", subtitle="19/10/2026 10:00")
+    report.heading("Alertes")
+    report.bullets(["2 missions échouées"])
+    report.table(["Date", "Objet"], [["19/10", "Mission #4"]])
+    report.render(output, time_budget=20)
+"""
+import time
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import (
+    BaseDocTemplate, Frame, KeepTogether, ListFlowable, ListItem, PageTemplate, Paragraph, Spacer, Table, TableStyle,
+)
+
+# Lignes au-delà desquelles un tableau est tronqué (borne du temps de rendu)
+MAX_TABLE_ROWS = 200
+
+PAGE_SIZE = A4
+MARGIN = 1.8 * cm
+
+
+class ReportTimeBudgetExceeded(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def report_styles():
+    """ Styles des rapports (construits une fois par process). """
+    base = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle("MbongiTitle", parent=base["Title"], fontSize=18, leading=22, spaceAfter=4),
+        "subtitle": ParagraphStyle("MbongiSubtitle", parent=base["Normal"], alignment=TA_CENTER, textColor=colors.grey, spaceAfter=12),
+        "h1": ParagraphStyle("MbongiH1", parent=base["Heading2"], fontSize=13, leading=16, spaceBefore=10, spaceAfter=4, textColor=colors.HexColor("#1f3a5f")),
+        "h2": ParagraphStyle("MbongiH2", parent=base["Heading3"], fontSize=11, leading=14, spaceBefore=6, spaceAfter=2),
+        "body": ParagraphStyle("MbongiBody", parent=base["BodyText"], fontSize=9.5, leading=12.5),
+        "muted": ParagraphStyle("MbongiMuted", parent=base["BodyText"], fontSize=9, leading=12, textColor=colors.grey),
+        "cell": ParagraphStyle("MbongiCell", parent=base["BodyText"], fontSize=8, leading=10),
+        "cell_header": ParagraphStyle("MbongiCellHeader", parent=base["BodyText"], fontName="Helvetica-Bold", fontSize=8, leading=10, textColor=colors.white),
+    }
+
+
+@lru_cache(maxsize=None)
+def _table_style():
+    return TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f3a5f")),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f2f4f7")]),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#c5cbd3")),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+    ])
+
+
+def _text(value):
+    return escape("" if value is None else str(value))
+
+
+class _BudgetedDocTemplate(BaseDocTemplate):
+    """ Document qui s'interrompt si le rendu dépasse son échéance. """
+
+    deadline = None
+
+    def afterFlowable(self, flowable):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ReportTimeBudgetExceeded(f"Rendu interrompu à la page {self.page} (budget de temps dépassé).")
+
+
+class Report:
+    def __init__(self, title, subtitle="", classification="CONFIDENTIEL"):
+        self.title = title
+        self.subtitle = subtitle
+        self.classification = classification
+        self.story = [Paragraph(_text(title), report_styles()["title"])]
+        if subtitle:
+            self.story.append(Paragraph(_text(subtitle), report_styles()["subtitle"]))
+
+    # --- Éléments ---
+
+    def heading(self, text, level=1):
+        self.story.append(Paragraph(_text(text), report_styles()["h1" if level == 1 else "h2"]))
+
+    def paragraph(self, text, style="body"):
+        self.story.append(Paragraph(_text(text), report_styles()[style]))
+
+    def bullets(self, items, empty="Aucun élément."):
+        if not items:
+            self.paragraph(empty, "muted")
+            return
+        style = report_styles()["body"]
+        self.story.append(ListFlowable(
+            [ListItem(Paragraph(_text(item), style), leftIndent=10) for item in items],
+            bulletType="bullet", start="•", leftIndent=10,
+        ))
+
+    def key_values(self, pairs):
+        """ Tableau à deux colonnes libellé / valeur, gardé sur une même page. """
+        styles = report_styles()
+        rows = [[Paragraph(f"<b>{_text(label)}</b>", styles["cell"]), Paragraph(_text(value), styles["cell"])] for label, value in pairs]
+        table = Table(rows, colWidths=[6 * cm, None])
+        table.setStyle(TableStyle([
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#c5cbd3")),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]))
+        self.story.append(KeepTogether(table))
+
+    def table(self, headers, rows, col_widths=None, empty="Aucune donnée.", max_rows=MAX_TABLE_ROWS):
+        """ Tableau à cellules retour-à-la-ligne ; l'en-tête est répété sur chaque page. """
+        if not rows:
+            self.paragraph(empty, "muted")
+            return
+        styles = report_styles()
+        data = [[Paragraph(_text(header), styles["cell_header"]) for header in headers]]
+        data += [[Paragraph(_text(cell), styles["cell"]) for cell in row] for row in rows[:max_rows]]
+        table = Table(data, colWidths=col_widths, repeatRows=1)
+        table.setStyle(_table_style())
+        self.story.append(table)
+        if len(rows) > max_rows:
+            self.paragraph(f"{len(rows) - max_rows} ligne(s) supplémentaire(s) non reproduite(s).", "muted")
+
+    def spacer(self, height=0.3 * cm):
+        self.story.append(Spacer(1, height))
+
+    # --- Rendu ---
+
+    def _draw_page(self, canvas, doc):
+        width, height = PAGE_SIZE
+        canvas.saveState()
+        canvas.setFont("Helvetica-Bold", 8)
+        canvas.setFillColor(colors.HexColor("#1f3a5f"))
+        canvas.drawString(MARGIN, height - MARGIN + 0.6 * cm, self.title)
+        canvas.setFont("Helvetica", 8)
+        canvas.drawRightString(width - MARGIN, height - MARGIN + 0.6 * cm, self.subtitle)
+        canvas.setFillColor(colors.grey)
+        canvas.drawString(MARGIN, MARGIN - 0.8 * cm, self.classification)
+        canvas.drawRightString(width - MARGIN, MARGIN - 0.8 * cm, f"Page {doc.page}")
+        canvas.restoreState()
+
+    def render(self, output, time_budget=None):
+        """ Écrit le PDF dans `output` (chemin ou fichier binaire). """
+        width, height = PAGE_SIZE
+        doc = _BudgetedDocTemplate(
+            output, pagesize=PAGE_SIZE, title=self.title,
+            leftMargin=MARGIN, rightMargin=MARGIN, topMargin=MARGIN, bottomMargin=MARGIN,
+        )
+        frame = Frame(MARGIN, MARGIN, width - 2 * MARGIN, height - 2 * MARGIN, id="content")
+        doc.addPageTemplates([PageTemplate(id="page", frames=[frame], onPage=self._draw_page)])
+        if time_budget:
+            doc.deadline = time.monotonic() + time_budget
+        doc.build(list(self.story))
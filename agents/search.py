@@ -0,0 +1,220 @@
+"""
+Recherche plein texte (contributions, missions, recoupements, avis CNS).
+
+Le texte de chaque objet est recopié dans SearchDocument (signaux post_save
+/ post_delete, commande rebuild_search_index), avec son service et son
+agent. Le moteur natif de la base indexe cette table (migration 0040) :
+- SQLite : table virtuelle FTS5 à contenu externe, tenue à jour par des
+  triggers ; classement bm25 (titre pondéré x2) ;
+- PostgreSQL : colonne tsvector générée (titre poids A, texte poids B,
+  configuration "french") et index GIN ; classement ts_rank_cd.
+
+Une recherche est une seule requête indexée, filtrée par le périmètre de
+l'utilisateur (visibility_scope) : superuser tout, chef son service, agent
+ses contributions et missions ; les avis CNS sont réservés au CNS et à la
+Présidence. L'admin utilise le même index (matching_ids).
+"""
+import math
+import re
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import CNSAvis, Contribution, Mission, RecoupementTicket, SearchDocument
+from .security import is_cns, is_presidence
+from .visibility import visibility_scope
+
+PAGE_SIZE = 20
+# Termes retenus d'une requête (au-delà, ignorés)
+MAX_TERMS = 12
+FTS_TABLE = "agents_searchdocument_fts"
+
+_TERM = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class Source:
+    """ Champs indexés d'un modèle et champs de périmètre (None : non filtrable par agent / service). """
+    model: type
+    title: str
+    body: tuple
+    agent: str | None
+    service: str | None
+    date: str
+
+    def fields(self):
+        """ Champs dont la modification change le document indexé (save(update_fields=...)). """
+        names = {self.title, *self.body}
+        for attname in (self.agent, self.service):
+            if attname:
+                names |= {attname, attname.removesuffix("_id")}
+        return names
+
+
+SOURCES = {
+    "contribution": Source(Contribution, "titre", ("contenu",), "agent_id", "service_id", "date_creation"),
+    "mission": Source(Mission, "titre", ("description", "report"), "agent_assigned_id", "service_id", "created_at"),
+    "recoupement": Source(RecoupementTicket, "title", ("evidence", "keywords"), None, "service_id", "created_at"),
+    "cns_avis": Source(CNSAvis, "title", ("content", "recommendation"), None, None, "created_at"),
+}
+KIND_BY_MODEL = {source.model: kind for kind, source in SOURCES.items()}
+
+
+# --- Indexation ---
+
+def build_document(kind, obj):
+    """ SearchDocument (non enregistré) de l'objet. """
+    source = SOURCES[kind]
+    return SearchDocument(
+        kind=kind,
+        object_id=obj.pk,
+        service_id=getattr(obj, source.service) if source.service else None,
+        agent_id=getattr(obj, source.agent) if source.agent else None,
+        title=(getattr(obj, source.title) or "")[:200],
+        body="\n\n".join(getattr(obj, name) or "" for name in source.body),
+        created_at=getattr(obj, source.date),
+    )
+
+
+def index_object(obj):
+    """ Crée ou met à jour le document de l'objet. """
+    document = build_document(KIND_BY_MODEL[type(obj)], obj)
+    SearchDocument.objects.update_or_create(
+        kind=document.kind, object_id=document.object_id,
+        defaults={
+            field: getattr(document, field) for field in ("service_id", "agent_id", "title", "body", "created_at")
+        },
+    )
+
+
+def unindex_object(obj):
+    SearchDocument.objects.filter(kind=KIND_BY_MODEL[type(obj)], object_id=obj.pk).delete()
+
+
+def rebuild_index(batch_size=500):
+    """ Réindexe tous les objets (commande rebuild_search_index). Retourne {type: nombre}. """
+    counts = {}
+    for kind, source in SOURCES.items():
+        fields = {"pk", source.title, *source.body, source.date} | {name for name in (source.agent, source.service) if name}
+        queryset = source.model.objects.only(*fields - {"pk"}).order_by("pk")
+        with transaction.atomic():
+            SearchDocument.objects.filter(kind=kind).delete()
+            counts[kind] = 0
+            last_pk = 0
+            while True:
+                batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                SearchDocument.objects.bulk_create([build_document(kind, obj) for obj in batch])
+                counts[kind] += len(batch)
+                last_pk = batch[-1].pk
+    return counts
+
+
+# --- Requêtes ---
+
+def _terms(text):
+    return _TERM.findall(text or "")[:MAX_TERMS]
+
+
+def _match_clause(text):
+    """ (condition SQL, paramètres) de correspondance plein texte sur la table "d", ou None si aucun terme. """
+    terms = _terms(text)
+    if not terms:
+        return None
+    if connection.vendor == "postgresql":
+        return "d.search_vector @@ websearch_to_tsquery('french', %s)", [" ".join(terms)]
+    # Termes entre guillemets (syntaxe FTS5 neutralisée), recherche par préfixe
+    query = " ".join(f'"{term}"*' for term in terms)
+    return f"d.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)", [query]
+
+
+def matching_ids(kind, text):
+    """ Sous-requête des identifiants d'objets `kind` correspondant à `text` (filtre pk__in), ou None. """
+    match = _match_clause(text)
+    if match is None:
+        return None
+    condition, params = match
+    return RawSQL(f"SELECT d.object_id FROM agents_searchdocument d WHERE d.kind = %s AND {condition}", [kind, *params])
+
+
+def _scope_clause(user):
+    """ (condition SQL, paramètres) du périmètre de l'utilisateur, ou None s'il ne voit rien. """
+    scope, value = visibility_scope(user)
+    clauses, params = [], []
+    if scope == "all":
+        clauses.append("d.kind <> 'cns_avis'")
+    elif scope == "service":
+        clauses.append("(d.kind <> 'cns_avis' AND d.service_id = %s)")
+        params.append(value)
+    elif scope == "own":
+        clauses.append("d.agent_id = %s")
+        params.append(value)
+    if is_cns(user) or is_presidence(user):
+        clauses.append("d.kind = 'cns_avis'")
+    if not clauses:
+        return None
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def _ranked_sql(where):
+    """ SELECT (id, score, extrait) classé par pertinence décroissante, selon le moteur de la base. """
+    if connection.vendor == "postgresql":
+        return (
+            "SELECT d.id, ts_rank_cd(d.search_vector, q) AS score, "
+            "ts_headline('french', d.body, q, 'StartSel=[, StopSel=], MaxWords=30, MinWords=12') "
+            "FROM agents_searchdocument d, websearch_to_tsquery('french', %s) q "
+            f"WHERE d.search_vector @@ q AND {where} "
+            "ORDER BY score DESC, d.id DESC LIMIT %s OFFSET %s"
+        )
+    return (
+        f"SELECT d.id, -bm25({FTS_TABLE}, 2.0, 1.0) AS score, snippet({FTS_TABLE}, 1, '[', ']', '…', 16) "
+        f"FROM {FTS_TABLE} JOIN agents_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND {where} "
+        "ORDER BY score DESC, d.id DESC LIMIT %s OFFSET %s"
+    )
+
+
+def search(user, text, kinds=None, page=1, per_page=PAGE_SIZE):
+    """
+    Documents visibles par `user` correspondant à `text`, classés par
+    pertinence. kinds : types retenus (défaut : tous). Retourne
+    {"total", "page", "pages", "results": [{type, id, titre, extrait, score, date}]}.
+    """
+    empty = {"total": 0, "page": page, "pages": 0, "results": []}
+    match, scope = _match_clause(text), _scope_clause(user)
+    if match is None or scope is None:
+        return empty
+    condition, match_params = match
+    where, params = scope
+    if kinds:
+        where += " AND d.kind IN (" + ", ".join(["%s"] * len(kinds)) + ")"
+        params = [*params, *kinds]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM agents_searchdocument d WHERE {condition} AND {where}", [*match_params, *params])
+        total = cursor.fetchone()[0]
+        if not total:
+            return empty
+        cursor.execute(_ranked_sql(where), [*match_params, *params, per_page, (page - 1) * per_page])
+        rows = cursor.fetchall()
+
+    documents = SearchDocument.objects.in_bulk([row[0] for row in rows])
+    return {
+        "total": total,
+        "page": page,
+        "pages": math.ceil(total / per_page),
+        "results": [
+            {
+                "type": documents[pk].kind,
+                "id": documents[pk].object_id,
+                "titre": documents[pk].title,
+                "extrait": excerpt,
+                "score": round(float(score), 4),
+                "date": documents[pk].created_at,
+            }
+            for pk, score, excerpt in rows
+            if pk in documents
+        ],
+    }
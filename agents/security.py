@@ -1,8 +1,37 @@
 from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.shortcuts import redirect
 
+from .profile_cache import get_user_profile
+
+
+def get_user_roles(user) -> frozenset:
+    """
+    Noms des groupes de l'utilisateur, lus dans le profil en cache
+    (agents.profile_cache) puis mémorisés sur l'objet user, partagé par
+    toute la requête : décorateurs, context processors et vues.
+    Réutilise les groupes préchargés s'ils existent.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_mbongi_roles", None)
+    if roles is None:
+        prefetched = getattr(user, "_prefetched_objects_cache", {}).get("groups")
+        if prefetched is not None:
+            roles = frozenset(group.name for group in prefetched)
+        else:
+            roles = frozenset(get_user_profile(user)["roles"])
+        user._mbongi_roles = roles
+    return roles
+
+
+def has_role(user, *names) -> bool:
+    """ Vrai si l'utilisateur appartient à au moins un des groupes donnés. """
+    return not get_user_roles(user).isdisjoint(names)
+
 
 def is_chef_service(user) -> bool:
     if not user or not user.is_authenticated:
@@ -11,7 +40,7 @@ def is_chef_service(user) -> bool:
     if user.is_staff or user.is_superuser:
         return True
     # groupe "CHEF_SERVICE"
-    return user.groups.filter(name="CHEF_SERVICE").exists()
+    return has_role(user, "CHEF_SERVICE")
 
 
 def chef_required(view_func):
@@ -36,17 +65,28 @@ def is_presidence(user) -> bool:
     if user.is_staff or user.is_superuser:
         return True
     # groupe "PRESIDENCE"
-    return user.groups.filter(name="PRESIDENCE").exists()
+    return has_role(user, "PRESIDENCE")
 
 def is_cns(user) -> bool:
     if not user or not user.is_authenticated:
         return False
-    return user.groups.filter(name="CNS").exists()
+    return has_role(user, "CNS")
 
 def presidence_or_cns_required(view_func):
     """
     Bloque l'accés si l'utilisateur n'est pas autorisé pour la Présidence ou le CNS.
     """
+    if iscoroutinefunction(view_func):
+        @login_required
+        @wraps(view_func)
+        async def _async_wrapped(request, *args, **kwargs):
+            user = await request.auser()
+            if not await sync_to_async(lambda: is_presidence(user) or is_cns(user))():
+                await sync_to_async(messages.error)(request, "Accés refusé : vue réservée à la Présidence/CNS.")
+                return redirect("dashboard")
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped
+
     @login_required
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
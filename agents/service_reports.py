@@ -0,0 +1,142 @@
+"""
+Digest PDF hebdomadaire par service (commande generate_service_reports).
+
+collect_service_digests() lit les données de TOUS les services en une
+passe (une requête agrégée par table, groupée par service) ; le rendu de
+chaque PDF (render_service_report) ne touche pas la base et peut donc
+s'exécuter dans des processus séparés.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.text import slugify
+from reportlab.lib.units import cm
+
+from .models import Agent, Contribution, Decision, Mission, RecoupementTicket, Service
+from .reporting import Report
+
+# Contributions prioritaires listées par service
+TOP_CONTRIBUTIONS = 10
+
+
+def _empty_digest(service):
+    return {
+        "service_id": service["id"],
+        "service": service["nom"],
+        "agents_total": 0,
+        "agents_active": 0,
+        "contributions": {},
+        "missions": {},
+        "missions_completed": 0,
+        "missions_failed": 0,
+        "missions_overdue": 0,
+        "recoupements_open": 0,
+        "recoupements_overdue": 0,
+        "recoupements_by_level": {},
+        "decisions": {},
+        "top_contributions": [],
+    }
+
+
+def collect_service_digests(since, until):
+    """
+    Données du digest de chaque service sur [since, until[ :
+    {service_id: dict sérialisable}, en un nombre fixe de requêtes.
+    """
+    digests = {service["id"]: _empty_digest(service) for service in Service.objects.values("id", "nom")}
+
+    def rows(queryset, service_field="service_id"):
+        for row in queryset:
+            digest = digests.get(row.pop(service_field))
+            if digest is not None:
+                yield digest, row
+
+    for digest, row in rows(Agent.objects.values("service_id").annotate(
+        total=Count("id"), active=Count("id", filter=Q(actif=True)),
+    )):
+        digest["agents_total"], digest["agents_active"] = row["total"], row["active"]
+
+    for digest, row in rows(Contribution.objects.filter(
+        date_creation__gte=since, date_creation__lt=until,
+    ).values("service_id", "statut").annotate(total=Count("id"))):
+        digest["contributions"][row["statut"]] = row["total"]
+
+    for digest, row in rows(Mission.objects.values("service_id").annotate(
+        pending=Count("id", filter=Q(status="PENDING")),
+        in_progress=Count("id", filter=Q(status="IN_PROGRESS")),
+        completed=Count("id", filter=Q(status="COMPLETED", completed_at__gte=since, completed_at__lt=until)),
+        failed=Count("id", filter=Q(status="FAILED", completed_at__gte=since, completed_at__lt=until)),
+        overdue=Count("id", filter=Q(status__in=["PENDING", "IN_PROGRESS"], due_date__lt=until.date())),
+    )):
+        digest["missions"] = {"PENDING": row["pending"], "IN_PROGRESS": row["in_progress"]}
+        digest["missions_completed"], digest["missions_failed"] = row["completed"], row["failed"]
+        digest["missions_overdue"] = row["overdue"]
+
+    for digest, row in rows(RecoupementTicket.objects.filter(
+        status__in=["OPEN", "IN_PROGRESS"],
+    ).values("service_id", "level").annotate(
+        total=Count("id"), overdue=Count("id", filter=Q(due_at__lt=until)),
+    )):
+        digest["recoupements_by_level"][row["level"]] = row["total"]
+        digest["recoupements_open"] += row["total"]
+        digest["recoupements_overdue"] += row["overdue"]
+
+    for digest, row in rows(Decision.objects.filter(
+        created_at__gte=since, created_at__lt=until,
+    ).values("contribution__service_id", "decision").annotate(total=Count("id")), "contribution__service_id"):
+        digest["decisions"][row["decision"]] = row["total"]
+
+    # Contributions prioritaires : une seule lecture, réparties ensuite par service
+    per_service = defaultdict(int)
+    for digest, row in rows(Contribution.objects.filter(
+        date_creation__gte=since, date_creation__lt=until, statut__in=["SUBMITTED", "VALIDATED"],
+    ).order_by("-priorite", "-date_creation").values("service_id", "titre", "statut", "priorite", "date_creation")):
+        if per_service[digest["service_id"]] < TOP_CONTRIBUTIONS:
+            per_service[digest["service_id"]] += 1
+            digest["top_contributions"].append(row)
+
+    return digests
+
+
+def report_filename(digest):
+    return f"{slugify(digest['service']) or 'service'}-{digest['service_id']}.pdf"
+
+
+def render_service_report(digest, since, until, path):
+    """ Écrit le digest PDF d'un service (aucun accès base). """
+    period = f"Du {timezone.localtime(since):%d/%m/%Y} au {timezone.localtime(until):%d/%m/%Y}"
+    report = Report(f"DIGEST HEBDOMADAIRE - {digest['service'].upper()}", subtitle=period)
+    contributions = digest["contributions"]
+
+    report.heading("Activité de la semaine")
+    report.key_values([
+        ("Agents (actifs / total)", f"{digest['agents_active']} / {digest['agents_total']}"),
+        ("Contributions soumises / validées / rejetées",
+         f"{contributions.get('SUBMITTED', 0)} / {contributions.get('VALIDATED', 0)} / {contributions.get('REJECTED', 0)}"),
+        ("Missions en attente / en cours", f"{digest['missions'].get('PENDING', 0)} / {digest['missions'].get('IN_PROGRESS', 0)}"),
+        ("Missions terminées / échouées (semaine)", f"{digest['missions_completed']} / {digest['missions_failed']}"),
+        ("Missions en retard", digest["missions_overdue"]),
+        ("Recoupements ouverts / en retard", f"{digest['recoupements_open']} / {digest['recoupements_overdue']}"),
+        ("Décisions (validées / refusées / ordonnées)",
+         f"{digest['decisions'].get('VALIDEE', 0)} / {digest['decisions'].get('REFUSEE', 0)} / {digest['decisions'].get('ORDONNEE', 0)}"),
+    ])
+
+    report.heading("Recoupements ouverts par niveau")
+    report.bullets(
+        [f"{level} : {total}" for level, total in sorted(digest["recoupements_by_level"].items())],
+        empty="Aucun recoupement ouvert.",
+    )
+
+    report.heading("Contributions prioritaires")
+    report.table(
+        ["Date", "Priorité", "Statut", "Titre"],
+        [
+            [timezone.localtime(item["date_creation"]).strftime("%d/%m %H:%M"), item["priorite"], item["statut"], item["titre"]]
+            for item in digest["top_contributions"]
+        ],
+        col_widths=[2.4 * cm, 1.8 * cm, 2.4 * cm, None],
+        empty="Aucune contribution sur la période.",
+    )
+    report.render(path)
+    return path
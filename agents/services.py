@@ -3,6 +3,7 @@ from django.utils import timezone
 from django.db.models import Count, Q
 from django.contrib.auth.models import User
 
+from .cache import CacheNamespace
 from .models import Contribution, Mission, AuditLog, Agent # Importez Agent pour filtrer par service
 
 
@@ -153,7 +154,23 @@ import re
 from collections import defaultdict
 from django.db.models import Avg
 
+signals_cache = CacheNamespace("weak_signals", ttl=60)
+
+
 def get_weak_signals(last_hours=72, limit=5):
+    """
+    Signaux faibles (voir _compute_weak_signals), partagés entre le briefing
+    et le commandement. Recalculés au plus une fois par minute ou dès
+    qu'une contribution change (tag "contributions").
+    """
+    return signals_cache.get_or_set(
+        (last_hours, limit),
+        lambda: _compute_weak_signals(last_hours, limit),
+        tags=["contributions"],
+    )
+
+
+def _compute_weak_signals(last_hours=72, limit=5):
     """
     Détecte les signaux faibles à partir des contributions récentes
     et retourne une liste de dictionnaires formatés.
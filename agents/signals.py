@@ -0,0 +1,175 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .briefing import BRIEFING_CHANNEL, cns_avis_event, decision_event
+from .cache import invalidate_tags
+from .events import publish_event
+from .models import Agent, CNSAvis, Contribution, Decision, Mission, RecoupementTicket, SearchDocument
+from .profile_cache import invalidate_user_profiles
+from .related import touch_vectors, update_vector
+from .search import KIND_BY_MODEL, SOURCES, index_object, unindex_object
+from .summaries import purge_stale_summaries
+
+User = get_user_model()
+
+
+# --- Invalidation du cache de profil (agents.profile_cache) ---
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_profiles_on_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # group.user_set.add/remove/clear(...)
+        if action == "pre_clear":
+            invalidate_user_profiles(instance.user_set.values_list("pk", flat=True))
+        elif action in ("post_add", "post_remove"):
+            invalidate_user_profiles(pk_set or [])
+    elif action in ("post_add", "post_remove", "post_clear"):
+        # user.groups.add/remove/clear(...)
+        invalidate_user_profiles([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_profiles_on_group_change(sender, instance, **kwargs):
+    # Renommage ou suppression d'un groupe : tous ses membres sont concernés
+    if instance.pk:
+        invalidate_user_profiles(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_profile_on_user_created(sender, instance, created, **kwargs):
+    # Un nouvel utilisateur peut réutiliser l'id d'un compte supprimé
+    if created:
+        invalidate_user_profiles([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def invalidate_profile_on_user_deleted(sender, instance, **kwargs):
+    invalidate_user_profiles([instance.pk])
+
+
+@receiver(pre_save, sender=Agent)
+def remember_agent_previous_state(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = Agent.objects.filter(pk=instance.pk).values("user_id", "service_id").first()
+    instance._previous_user_id = previous["user_id"] if previous else None
+    instance._previous_service_id = previous["service_id"] if previous else None
+
+
+@receiver(post_save, sender=Agent)
+@receiver(post_delete, sender=Agent)
+def invalidate_profile_on_agent_change(sender, instance, **kwargs):
+    invalidate_user_profiles({instance.user_id, getattr(instance, "_previous_user_id", None)})
+
+
+# --- Service dénormalisé (Contribution / Mission / RecoupementTicket) ---
+
+@receiver(post_save, sender=Agent)
+def propagate_agent_service(sender, instance, created, **kwargs):
+    if created:
+        return
+    service_changed = instance.service_id != getattr(instance, "_previous_service_id", instance.service_id)
+    user_changed = instance.user_id != getattr(instance, "_previous_user_id", instance.user_id)
+    if service_changed:
+        Contribution.objects.filter(agent=instance).update(service=instance.service_id)
+        touch_vectors(Contribution.objects.filter(agent=instance).values("pk"))
+        Mission.objects.filter(agent_assigned=instance).update(service=instance.service_id)
+        SearchDocument.objects.filter(kind__in=["contribution", "mission"], agent_id=instance.pk).update(service_id=instance.service_id)
+    if (service_changed or user_changed) and instance.user_id:
+        tickets = RecoupementTicket.objects.filter(created_by_id=instance.user_id)
+        tickets.update(service=instance.service_id)
+        SearchDocument.objects.filter(kind="recoupement", object_id__in=tickets.values("pk")).update(service_id=instance.service_id)
+        invalidate_tags("recoupements")
+
+
+# --- Invalidation du cache applicatif (agents.cache) ---
+
+def _owner_tags(instance):
+    """ Tags agent:<id> du propriétaire actuel et, après une réaffectation, du précédent (DerivedServiceMixin). """
+    owners = {instance.__dict__.get(instance.owner_field), getattr(instance, "_loaded_owner_id", None)}
+    return [f"agent:{owner_id}" for owner_id in owners if owner_id]
+
+
+@receiver(post_save, sender=Contribution)
+@receiver(post_delete, sender=Contribution)
+def invalidate_contribution_caches(sender, instance, **kwargs):
+    invalidate_tags("contributions", *_owner_tags(instance))
+
+
+@receiver(post_save, sender=Contribution)
+def purge_contribution_summaries(sender, instance, created, update_fields=None, **kwargs):
+    # Résumés IA (agents.summaries) d'une version précédente du texte
+    if created or (update_fields is not None and not {"titre", "contenu"} & set(update_fields)):
+        return
+    purge_stale_summaries(instance)
+
+
+@receiver(post_save, sender=Contribution)
+def update_contribution_vector(sender, instance, created, update_fields=None, **kwargs):
+    # Index des contributions liées (agents.related) : texte et périmètre
+    if update_fields is not None and not {"titre", "contenu", "agent", "agent_id", "service", "service_id"} & set(update_fields):
+        return
+    update_vector(instance)
+
+
+@receiver(post_save, sender=Mission)
+def purge_mission_report_summaries(sender, instance, created, update_fields=None, **kwargs):
+    # Résumés IA d'une version précédente du rapport de mission
+    if created or (update_fields is not None and not {"titre", "report"} & set(update_fields)):
+        return
+    purge_stale_summaries(instance)
+
+
+@receiver(post_save, sender=Mission)
+@receiver(post_delete, sender=Mission)
+def invalidate_mission_caches(sender, instance, **kwargs):
+    invalidate_tags("missions", *_owner_tags(instance))
+
+
+@receiver(post_save, sender=RecoupementTicket)
+@receiver(post_delete, sender=RecoupementTicket)
+def invalidate_recoupement_caches(sender, instance, **kwargs):
+    invalidate_tags("recoupements")
+
+
+@receiver(post_save, sender=Decision)
+@receiver(post_delete, sender=Decision)
+def invalidate_decision_caches(sender, instance, **kwargs):
+    invalidate_tags("decisions")
+
+
+# --- Index de recherche plein texte (agents.search) ---
+
+@receiver(post_save, sender=Contribution)
+@receiver(post_save, sender=Mission)
+@receiver(post_save, sender=RecoupementTicket)
+@receiver(post_save, sender=CNSAvis)
+def index_search_document(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SOURCES[KIND_BY_MODEL[sender]].fields() & set(update_fields):
+        return
+    index_object(instance)
+
+
+@receiver(post_delete, sender=Contribution)
+@receiver(post_delete, sender=Mission)
+@receiver(post_delete, sender=RecoupementTicket)
+@receiver(post_delete, sender=CNSAvis)
+def unindex_search_document(sender, instance, **kwargs):
+    unindex_object(instance)
+
+
+# --- Événements temps réel du briefing (agents.events) ---
+
+@receiver(post_save, sender=CNSAvis)
+def publish_cns_avis(sender, instance, created, **kwargs):
+    if created and instance.status != "DRAFT":
+        publish_event(BRIEFING_CHANNEL, "cns_avis", cns_avis_event(instance))
+
+
+@receiver(post_save, sender=Decision)
+def publish_decision(sender, instance, created, **kwargs):
+    if created:
+        publish_event(BRIEFING_CHANNEL, "decision", decision_event(instance))
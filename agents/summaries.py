@@ -0,0 +1,333 @@
+"""
+Résumés IA persistés (modèle AISummary).
+
+Un résumé est identifié par (modèle, version du prompt, hash du titre et du
+contenu) : tant que la contribution (ou le rapport de mission) n'est pas
+modifiée, le résumé est servi depuis la base sans appel à Gemini. Une
+modification du texte change le hash (le résumé précédent n'est plus
+trouvé) et les signaux post_save suppriment les résumés devenus obsolètes.
+
+Les textes longs (au-delà de MBONGI_SUMMARY_CHUNK_CHARS) sont résumés en
+map-reduce : découpe aux paragraphes, résumé de chaque morceau (en cache
+par morceau : après une modification, seuls les morceaux changés sont
+renvoyés au modèle), puis fusion des résumés partiels.
+
+summarize_contributions() résume plusieurs contributions en regroupant
+celles à calculer en lots (un appel au modèle par lot) ; il sert aux jobs
+(agents.summary_jobs) et à warm_validation_queue() qui pré-calcule les
+résumés de la file de validation (commande warm_ai_summaries).
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .ai import (
+    BATCH_PROMPT_VERSION, CHUNK_PROMPT_VERSION, DEFAULT_MODEL, MISSION_PROMPT_VERSION, PROMPT_VERSION, BatchMismatch,
+    merge_prompt, merge_summaries, pack_batches, resume_chunk, resume_contribution, resume_contributions_batch, split_text,
+    stream_prompt, stream_resume_contribution,
+)
+from .metrics import CACHE_REQUESTS
+from .models import AISummary, Contribution, Mission
+
+logger = logging.getLogger("agents.llm")
+
+# Versions de prompt servies pour une contribution, par ordre de préférence
+# (résumé unitaire, puis résumé produit dans un lot)
+CONTRIBUTION_PROMPT_VERSIONS = (PROMPT_VERSION, BATCH_PROMPT_VERSION)
+
+
+def content_hash(titre, contenu):
+    """ Empreinte SHA-256 du texte résumé (titre + contenu). """
+    return hashlib.sha256(f"{titre}\n\x00\n{contenu}".encode("utf-8")).hexdigest()
+
+
+def summary_source(obj):
+    """ (titre, texte, version du prompt, document) du résumé d'une contribution ou d'un rapport de mission. """
+    if isinstance(obj, Mission):
+        return obj.titre, obj.report, MISSION_PROMPT_VERSION, "mission"
+    return obj.titre, obj.contenu, PROMPT_VERSION, "contribution"
+
+
+def summary_key(obj, prompt_version=None):
+    titre, text, default_version, _ = summary_source(obj)
+    return {"model": DEFAULT_MODEL, "prompt_version": prompt_version or default_version, "content_hash": content_hash(titre, text)}
+
+
+def summary_versions(obj):
+    """ Versions de prompt dont un résumé persisté peut être servi pour `obj`. """
+    return (MISSION_PROMPT_VERSION,) if isinstance(obj, Mission) else CONTRIBUTION_PROMPT_VERSIONS
+
+
+def _preferred(rows, versions):
+    """ {content_hash: texte} à partir de (content_hash, version, texte), en gardant la version préférée. """
+    best = {}
+    for digest, version, summary in rows:
+        if digest not in best or versions.index(version) < versions.index(best[digest][0]):
+            best[digest] = (version, summary)
+    return {digest: summary for digest, (_, summary) in best.items()}
+
+
+def get_cached_summary(obj):
+    """ Résumé persisté de la version courante du texte (contribution ou rapport de mission), ou None. """
+    key, versions = summary_key(obj), summary_versions(obj)
+    rows = AISummary.objects.filter(
+        model=key["model"], content_hash=key["content_hash"], prompt_version__in=versions,
+    ).values_list("content_hash", "prompt_version", "summary")
+    summary = _preferred(rows, versions).get(key["content_hash"])
+    CACHE_REQUESTS.inc(namespace="ai_summaries", result="miss" if summary is None else "hit")
+    return summary
+
+
+def get_cached_summaries(contributions):
+    """ Résumés persistés de plusieurs contributions (une requête) : {pk: texte}. """
+    digests = {contribution.pk: content_hash(contribution.titre, contribution.contenu) for contribution in contributions}
+    stored = _preferred(AISummary.objects.filter(
+        model=DEFAULT_MODEL, prompt_version__in=CONTRIBUTION_PROMPT_VERSIONS, content_hash__in=set(digests.values()),
+    ).values_list("content_hash", "prompt_version", "summary"), CONTRIBUTION_PROMPT_VERSIONS)
+    summaries = {pk: stored[digest] for pk, digest in digests.items() if digest in stored}
+    CACHE_REQUESTS.inc(len(summaries), namespace="ai_summaries", result="hit")
+    CACHE_REQUESTS.inc(len(digests) - len(summaries), namespace="ai_summaries", result="miss")
+    return summaries
+
+
+def purge_stale_summaries(obj):
+    """ Supprime les résumés de la contribution / mission qui ne correspondent plus à son texte. """
+    document = summary_source(obj)[3]
+    return AISummary.objects.filter(**{document: obj}).exclude(content_hash=summary_key(obj)["content_hash"]).delete()[0]
+
+
+def store_summaries(pairs, prompt_version=None):
+    """
+    Enregistre des résumés [(objet, texte)] sous prompt_version (défaut :
+    celle du prompt unitaire) ; un résumé déjà présent pour le même contenu
+    est conservé.
+    """
+    AISummary.objects.bulk_create(
+        [AISummary(**summary_key(obj, prompt_version), summary=text, **{summary_source(obj)[3]: obj}) for obj, text in pairs],
+        ignore_conflicts=True,
+    )
+
+
+# --- Textes longs (map-reduce) ---
+
+def chunk_chars():
+    return getattr(settings, "MBONGI_SUMMARY_CHUNK_CHARS", 6000)
+
+
+def is_long(text):
+    """ Texte résumé par morceaux plutôt qu'en un seul prompt. """
+    return len(text) > chunk_chars()
+
+
+def map_chunks(chunks):
+    """
+    Résumés partiels des morceaux, dans l'ordre. Ceux d'un morceau déjà vu
+    (même texte) viennent de la base ; les autres sont demandés au modèle en
+    parallèle (MBONGI_SUMMARY_MAP_WORKERS) puis enregistrés. La première
+    erreur est propagée une fois les résumés obtenus enregistrés.
+    """
+    digests = [content_hash("", chunk) for chunk in chunks]
+    stored = dict(AISummary.objects.filter(
+        model=DEFAULT_MODEL, prompt_version=CHUNK_PROMPT_VERSION, content_hash__in=set(digests),
+    ).values_list("content_hash", "summary"))
+    missing = {digest: chunk for digest, chunk in zip(digests, chunks) if digest not in stored}
+    CACHE_REQUESTS.inc(len(digests) - len(missing), namespace="ai_chunk_summaries", result="hit")
+    CACHE_REQUESTS.inc(len(missing), namespace="ai_chunk_summaries", result="miss")
+    if not missing:
+        return [stored[digest] for digest in digests]
+
+    workers = min(getattr(settings, "MBONGI_SUMMARY_MAP_WORKERS", 4), len(missing))
+    generated, error = {}, None
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mbongi-ai") as executor:
+        futures = {digest: executor.submit(resume_chunk, chunk) for digest, chunk in missing.items()}
+        for digest, future in futures.items():
+            try:
+                generated[digest] = future.result()
+            except Exception as exc:
+                error = error or exc
+    AISummary.objects.bulk_create(
+        [
+            AISummary(model=DEFAULT_MODEL, prompt_version=CHUNK_PROMPT_VERSION, content_hash=digest, summary=text)
+            for digest, text in generated.items()
+        ],
+        ignore_conflicts=True,
+    )
+    if error is not None:
+        raise error
+    stored.update(generated)
+    return [stored[digest] for digest in digests]
+
+
+def _reduce(titre, partials, document):
+    """ Fusionne les résumés partiels par groupes jusqu'à ce qu'ils tiennent dans un seul prompt. """
+    limit = chunk_chars()
+    while len(partials) > 1 and sum(len(partial) for partial in partials) > limit:
+        groups, size = [[]], 0
+        for partial in partials:
+            if groups[-1] and size + len(partial) > limit:
+                groups.append([])
+                size = 0
+            groups[-1].append(partial)
+            size += len(partial)
+        if len(groups) == len(partials):
+            break
+        partials = [merge_summaries(titre, group, document) if len(group) > 1 else group[0] for group in groups]
+    return partials
+
+
+def _partials(obj):
+    titre, text, _, document = summary_source(obj)
+    return titre, _reduce(titre, map_chunks(split_text(text, chunk_chars())), document), document
+
+
+def summarize(obj):
+    """
+    Résumé d'une contribution ou d'un rapport de mission : (texte, en_cache).
+    Un texte long est découpé, ses morceaux résumés (en cache par morceau)
+    puis fusionnés. Les erreurs du modèle sont propagées.
+    """
+    cached = get_cached_summary(obj)
+    if cached is not None:
+        return cached, True
+    summary = _compute_summary(obj)
+    store_summaries([(obj, summary)])
+    return summary, False
+
+
+def _compute_summary(obj):
+    titre, text, _, document = summary_source(obj)
+    if is_long(text):
+        return merge_summaries(*_partials(obj))
+    return resume_contribution(titre, text, document)
+
+
+def stream_summary(obj):
+    """
+    Résumé produit en flux par le modèle (morceaux de texte), enregistré
+    une fois la réponse complète. Pour un texte long, les résumés partiels
+    sont calculés d'abord et seule la fusion finale est diffusée. Un flux
+    interrompu (lecteur parti, erreur) n'enregistre pas le résumé final.
+    """
+    titre, text, _, document = summary_source(obj)
+    if is_long(text):
+        chunks = stream_prompt("merge_summaries_stream", merge_prompt(*_partials(obj)))
+    else:
+        chunks = stream_resume_contribution(titre, text, document)
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    summary = "".join(parts).strip()
+    if summary:
+        store_summaries([(obj, summary)])
+
+
+def _call_batch(batch):
+    """ ({id: (texte, version du prompt)}, erreur) d'un lot. """
+    try:
+        return {pk: (text, BATCH_PROMPT_VERSION) for pk, text in resume_contributions_batch(batch).items()}, None
+    except BatchMismatch as exc:
+        # Réponse incohérente : rien n'en est retenu, un appel par contribution
+        logger.warning("summary batch rejected: %s", exc, extra={"items": len(batch)})
+        texts, error = {}, None
+        for item in batch:
+            try:
+                texts[item["id"]] = (resume_contribution(item["titre"], item["contenu"]), PROMPT_VERSION)
+            except Exception as item_exc:
+                error = f"{type(item_exc).__name__}: {item_exc}"
+        return texts, error
+    except Exception as exc:
+        return {}, f"{type(exc).__name__}: {exc}"
+
+
+def summarize_contributions(contributions, workers=1):
+    """
+    Résumés de plusieurs contributions : ceux déjà en base d'abord (une
+    requête), les autres regroupés en lots (un appel au modèle par lot, dans
+    la limite de MBONGI_SUMMARY_BATCH_TOKENS jetons) puis enregistrés. Les
+    textes longs sont résumés à part, par morceaux.
+
+    Retourne (résumés, erreurs) : {pk: (texte, en_cache)} et {pk: message}
+    pour les contributions dont le lot a échoué ou que la réponse omet.
+    """
+    digests = {contribution.pk: content_hash(contribution.titre, contribution.contenu) for contribution in contributions}
+    summaries = {pk: (text, True) for pk, text in get_cached_summaries(contributions).items()}
+    missing = {}
+    for contribution in contributions:
+        if contribution.pk not in summaries:
+            # Une seule génération par contenu distinct
+            missing.setdefault(digests[contribution.pk], contribution)
+
+    generated, errors = {}, {}
+    for digest, contribution in list(missing.items()):
+        if is_long(contribution.contenu):
+            # Texte long : résumé par morceaux, hors des lots
+            del missing[digest]
+            try:
+                generated[digest] = (_compute_summary(contribution), PROMPT_VERSION, contribution)
+            except Exception as exc:
+                errors[digest] = f"{type(exc).__name__}: {exc}"
+
+    items = [{"id": c.pk, "titre": c.titre, "contenu": c.contenu} for c in missing.values()]
+    batches = list(pack_batches(
+        items,
+        token_budget=getattr(settings, "MBONGI_SUMMARY_BATCH_TOKENS", 8000),
+        max_items=getattr(settings, "MBONGI_SUMMARY_BATCH_SIZE", 10),
+    ))
+    if workers > 1 and len(batches) > 1:
+        # Appels réseau en parallèle ; les écritures restent dans ce thread
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mbongi-ai") as executor:
+            responses = list(executor.map(_call_batch, batches))
+    else:
+        responses = [_call_batch(batch) for batch in batches]
+
+    for batch, (texts, error) in zip(batches, responses):
+        for item in batch:
+            if item["id"] in texts:
+                generated[digests[item["id"]]] = (*texts[item["id"]], missing[digests[item["id"]]])
+            else:
+                errors[digests[item["id"]]] = error or "Résumé absent de la réponse du modèle."
+    for prompt_version in CONTRIBUTION_PROMPT_VERSIONS:
+        store_summaries(
+            [(contribution, text) for text, version, contribution in generated.values() if version == prompt_version],
+            prompt_version,
+        )
+
+    failures = {}
+    for contribution in contributions:
+        digest = digests[contribution.pk]
+        if digest in generated:
+            summaries[contribution.pk] = (generated[digest][0], False)
+        elif digest in errors:
+            failures[contribution.pk] = errors[digest]
+    return summaries, failures
+
+
+def validation_queue(service_id=None):
+    """
+    Contributions soumises, en attente de validation par un chef, dans
+    l'ordre de traitement (priorité, puis ancienneté). Source unique de la
+    file des vues chef et de warm_ai_summaries.
+    """
+    queryset = Contribution.objects.filter(statut="SUBMITTED").order_by("priorite", "date_creation")
+    if service_id is not None:
+        queryset = queryset.filter(service_id=service_id)
+    return queryset
+
+
+def warm_validation_queue(service_id=None, limit=None, workers=1):
+    """
+    Calcule les résumés manquants de la file de validation, par lots.
+    Retourne {"total", "cached", "generated", "failed"}.
+    """
+    contributions = list(validation_queue(service_id).only("id", "titre", "contenu")[:limit])
+    summaries, failures = summarize_contributions(contributions, workers=workers)
+    cached = sum(1 for _, from_store in summaries.values() if from_store)
+    return {
+        "total": len(contributions),
+        "cached": cached,
+        "generated": len(summaries) - cached,
+        "failed": len(failures),
+    }
@@ -0,0 +1,325 @@
+"""
+Résumés IA en arrière-plan.
+
+- request_summary() / request_summaries() crée (ou retrouve) le SummaryJob
+  de la version courante de chaque contribution et le met en file : la
+  requête HTTP rend la main aussitôt, le client interroge l'état du job.
+- Les jobs sont exécutés après le commit par un pool de threads du process,
+  ceux d'une même demande en lots (un appel au modèle par lot) ;
+  un échec de l'appel au modèle est retenté avec un délai doublé à chaque
+  tentative (MBONGI_SUMMARY_BACKOFF), jusqu'à MBONGI_SUMMARY_MAX_ATTEMPTS ;
+  la reprise est replanifiée (minuterie) sans occuper un thread du pool.
+- La commande run_summary_jobs reprend les jobs en attente (redémarrage
+  du process, reprises planifiées).
+- Résumé en flux (SSE) : la génération a lieu dans le pool, jamais dans la
+  requête. Les morceaux sont publiés sur le canal SUMMARY_CHANNEL
+  (agents.events) et relayés par follow_summary() ; les requêtes
+  simultanées sur un même texte suivent la même génération (job de la
+  contribution, clé du texte pour un rapport de mission).
+
+Le résultat est aussi enregistré dans le magasin de résumés
+(agents.summaries) : les demandes suivantes ne créent plus de job.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+
+from .events import get_broker, publish_event
+from .metrics import SUMMARY_JOBS
+from .models import SummaryJob
+from .summaries import content_hash, get_cached_summary, stream_summary, summarize_contributions, summary_key
+
+logger = logging.getLogger("agents.llm")
+
+SUMMARY_CHANNEL = "summaries"
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "MBONGI_SUMMARY_WORKERS", 2), thread_name_prefix="mbongi-summary",
+)
+# Clés des résumés en cours de génération en flux dans ce process
+_streaming = set()
+_streaming_lock = threading.Lock()
+
+
+def max_attempts():
+    return getattr(settings, "MBONGI_SUMMARY_MAX_ATTEMPTS", 4)
+
+
+def backoff_delay(attempts):
+    """ Délai avant la tentative suivante : base * 2^(n-1), plafonné, avec gigue. """
+    base = getattr(settings, "MBONGI_SUMMARY_BACKOFF", 2)
+    delay = min(base * 2 ** max(attempts - 1, 0), 300)
+    return delay * random.uniform(0.8, 1.2)
+
+
+# --- Jobs ---
+
+def job_payload(job):
+    """ État d'un job pour les réponses JSON (interrogé jusqu'à DONE / FAILED). """
+    return {
+        "id": job.pk,
+        "contribution": job.contribution_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "resume": job.summary if job.status == "DONE" else None,
+        "error": job.error if job.status == "FAILED" else "",
+        "status_url": reverse("ai_summary_job", args=[job.pk]),
+    }
+
+
+def request_summaries(contributions, user=None, stream=False):
+    """
+    Jobs de résumé de la version courante des contributions ; les nouveaux
+    sont mis en file ensemble (après commit) et traités par lots, ou un à un
+    en flux (stream=True, voir follow_summary).
+    """
+    jobs, created = [], []
+    for contribution in contributions:
+        digest = content_hash(contribution.titre, contribution.contenu)
+        active = SummaryJob.objects.filter(contribution=contribution, content_hash=digest, status__in=["PENDING", "RUNNING"])
+        job = active.first()
+        if job is None:
+            try:
+                with transaction.atomic():
+                    job = SummaryJob.objects.create(contribution=contribution, content_hash=digest, requested_by=user)
+                created.append(job.pk)
+            except IntegrityError:
+                # Demande concurrente pour la même version : on rejoint son job
+                job = active.get()
+        jobs.append(job)
+    if created and stream:
+        for job_id in created:
+            transaction.on_commit(lambda job_id=job_id: _executor.submit(_stream_in_thread, job_id=job_id))
+    elif created:
+        transaction.on_commit(lambda: _executor.submit(_run_in_thread, created))
+    return jobs
+
+
+def request_summary(contribution, user=None, stream=False):
+    """ Job de résumé de la version courante de la contribution, mis en file s'il est nouveau. """
+    return request_summaries([contribution], user, stream)[0]
+
+
+def request_stream(obj):
+    """
+    Génération en flux (après commit) du résumé d'un rapport de mission,
+    sans job : une seule à la fois par texte dans le process.
+    """
+    transaction.on_commit(lambda: _executor.submit(_stream_in_thread, obj=obj))
+
+
+def _run_in_thread(job_ids):
+    """
+    Une tentative des jobs ; ceux à reprendre sont resoumis au pool à leur
+    échéance par une minuterie, le thread du pool est rendu aussitôt.
+    """
+    try:
+        retrying = [job for job in run_jobs(job_ids) if job.status == "PENDING"]
+    finally:
+        connections.close_all()
+    if retrying:
+        _schedule_retry(retrying)
+
+
+def _schedule_retry(jobs):
+    """ Resoumet les jobs au pool à la plus proche de leurs échéances. """
+    next_attempt = min(job.next_attempt_at for job in jobs)
+    delay = max((next_attempt - timezone.now()).total_seconds(), 0)
+    timer = threading.Timer(delay, _executor.submit, args=(_run_in_thread, [job.pk for job in jobs]))
+    timer.daemon = True
+    timer.start()
+
+
+def run_jobs(job_ids):
+    """
+    Une tentative pour chacun des jobs en attente dont l'échéance est passée
+    (réservation atomique : un seul thread / process les traite), résumés
+    ensemble par lots. Retourne les jobs à jour, dans l'ordre de job_ids.
+    """
+    now = timezone.now()
+    SummaryJob.objects.filter(pk__in=job_ids, status="PENDING", next_attempt_at__lte=now).update(
+        status="RUNNING", started_at=now, attempts=F("attempts") + 1,
+    )
+    jobs = SummaryJob.objects.select_related("contribution").in_bulk(job_ids)
+    claimed = [job for job in jobs.values() if job.status == "RUNNING" and job.started_at == now]
+    if claimed:
+        summaries, failures = summarize_contributions([job.contribution for job in claimed])
+        for job in claimed:
+            if job.contribution_id in summaries:
+                job.summary = summaries[job.contribution_id][0]
+                job.status, job.error, job.finished_at = "DONE", "", timezone.now()
+                SUMMARY_JOBS.inc(outcome="done")
+            else:
+                _record_failure(job, failures.get(job.contribution_id, "Résumé indisponible."))
+        SummaryJob.objects.bulk_update(claimed, ["status", "summary", "error", "next_attempt_at", "finished_at"])
+        for job in claimed:
+            _publish_outcome(stream_key(job.contribution), job.summary if job.status == "DONE" else None, job)
+    return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+
+def _record_failure(job, error):
+    job.error = error
+    if job.attempts < max_attempts():
+        job.status = "PENDING"
+        job.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+        SUMMARY_JOBS.inc(outcome="retry")
+    else:
+        job.status = "FAILED"
+        job.finished_at = timezone.now()
+        SUMMARY_JOBS.inc(outcome="failed")
+    logger.warning(
+        "summary job attempt failed: %s", error,
+        extra={"job": job.pk, "contribution": job.contribution_id, "attempt": job.attempts, "status": job.status},
+    )
+
+
+def run_job(job_id):
+    """ Une tentative du job (voir run_jobs). """
+    return run_jobs([job_id])[0]
+
+
+def run_pending_jobs(stale_after=timedelta(minutes=10), limit=None):
+    """
+    Une tentative pour chaque job arrivé à échéance (commande
+    run_summary_jobs), par lots. Les jobs RUNNING depuis plus de
+    stale_after (process interrompu) sont remis en file.
+    """
+    now = timezone.now()
+    SummaryJob.objects.filter(status="RUNNING", started_at__lt=now - stale_after).update(status="PENDING")
+    job_ids = list(
+        SummaryJob.objects.filter(status="PENDING", next_attempt_at__lte=now)
+        .order_by("next_attempt_at").values_list("pk", flat=True)[:limit]
+    )
+    return run_jobs(job_ids)
+
+
+# --- Flux ---
+
+def stream_key(obj):
+    """ Clé d'une génération en flux : version du prompt et empreinte du texte. """
+    key = summary_key(obj)
+    return f"{key['prompt_version']}:{key['content_hash']}"
+
+
+def _publish_outcome(key, summary, job=None):
+    """ Fin d'une génération sur SUMMARY_CHANNEL : "done" (résumé complet) ou "error". """
+    if summary is not None:
+        publish_event(SUMMARY_CHANNEL, "done", {"key": key, "resume": summary})
+    else:
+        publish_event(SUMMARY_CHANNEL, "error", {
+            "key": key, "error": job.error if job else "Résumé indisponible.", "job": job_payload(job) if job else None,
+        })
+
+
+def _claim(job_id):
+    """ Réserve le job (PENDING arrivé à échéance) pour une tentative ; None s'il est déjà pris. """
+    now = timezone.now()
+    claimed = SummaryJob.objects.filter(pk=job_id, status="PENDING", next_attempt_at__lte=now).update(
+        status="RUNNING", started_at=now, attempts=F("attempts") + 1,
+    )
+    return SummaryJob.objects.select_related("contribution").get(pk=job_id) if claimed else None
+
+
+def _stream_in_thread(job_id=None, obj=None):
+    """
+    Génère en flux le résumé du job (ou d'un rapport de mission) et publie
+    chaque morceau sur SUMMARY_CHANNEL, puis l'issue ("done" / "error").
+    """
+    job = None
+    try:
+        if job_id is not None:
+            job = _claim(job_id)
+            if job is None:
+                return
+            obj = job.contribution
+        key = stream_key(obj)
+        if job is None:
+            # Le job dédoublonne les contributions ; un rapport de mission, la clé de son texte
+            with _streaming_lock:
+                if key in _streaming:
+                    return
+                _streaming.add(key)
+        try:
+            parts = []
+            for seq, chunk in enumerate(stream_summary(obj), start=1):
+                parts.append(chunk)
+                publish_event(SUMMARY_CHANNEL, "chunk", {"key": key, "seq": seq, "text": chunk})
+            summary = "".join(parts).strip() or None
+            error = None if summary else "Résumé vide."
+        except Exception as exc:
+            summary, error = None, f"{type(exc).__name__}: {exc}"
+        finally:
+            if job is None:
+                with _streaming_lock:
+                    _streaming.discard(key)
+
+        if job is not None:
+            if summary is not None:
+                job.summary, job.status, job.error, job.finished_at = summary, "DONE", "", timezone.now()
+                SUMMARY_JOBS.inc(outcome="done")
+            else:
+                _record_failure(job, error)
+            job.save(update_fields=["status", "summary", "error", "next_attempt_at", "finished_at"])
+        elif error:
+            logger.warning("summary stream failed: %s", error, extra={"key": key})
+        _publish_outcome(key, summary, job)
+    finally:
+        connections.close_all()
+    if job is not None and job.status == "PENDING":
+        _schedule_retry([job])
+
+
+def follow_summary(obj, after, job=None):
+    """
+    Relaie la génération en flux du résumé de `obj` à partir de l'événement
+    `after` de SUMMARY_CHANNEL : ("chunk", texte), ("keepalive", None), puis
+    ("done", None) ou ("error", message). Les morceaux ne sont relayés que
+    depuis le premier : une requête arrivée en cours de génération reçoit le
+    résumé complet d'un bloc. Si un événement est manqué, l'état est relu
+    en base à chaque battement ; au-delà de MBONGI_SSE_MAX_SECONDS, "error".
+    """
+    broker, key = get_broker(), stream_key(obj)
+    heartbeat = getattr(settings, "MBONGI_SSE_HEARTBEAT", 15)
+    deadline = time.monotonic() + getattr(settings, "MBONGI_SSE_MAX_SECONDS", 300)
+    relayed = 0
+    while time.monotonic() < deadline:
+        events = broker.read(SUMMARY_CHANNEL, after, timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+        for event in events:
+            after = event.id
+            if event.data.get("key") != key:
+                continue
+            if event.type == "chunk" and event.data["seq"] == relayed + 1:
+                relayed += 1
+                yield "chunk", event.data["text"]
+            elif event.type == "done":
+                if not relayed:
+                    yield "chunk", event.data["resume"]
+                yield "done", None
+                return
+            elif event.type == "error":
+                yield "error", event.data["error"]
+                return
+        if events:
+            continue
+        summary = get_cached_summary(obj)
+        if summary is not None:
+            if not relayed:
+                yield "chunk", summary
+            yield "done", None
+            return
+        if job is not None:
+            job.refresh_from_db(fields=["status", "error", "attempts"])
+            if job.status in ("FAILED", "PENDING") and job.error:
+                yield "error", job.error
+                return
+        yield "keepalive", None
+    yield "error", "Résumé toujours en cours : réessayer plus tard."
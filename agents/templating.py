@@ -0,0 +1,32 @@
+"""
+Backend de templates Django instrumenté : mesure le temps de rendu
+et l'ajoute aux statistiques de la requête en cours (agents.perf).
+"""
+import time
+
+from django.template.backends.django import DjangoTemplates
+
+from .perf import add_render_time
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            add_render_time(time.perf_counter() - start)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
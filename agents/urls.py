@@ -3,7 +3,7 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
 from .views import (
-    ai_resume_contribution, contribution_new, agent_profile,
+    ai_resume_contribution, ai_resume_contribution_stream, ai_summary_job, related_contributions_view, search_view, contribution_new, agent_profile,
     agent_photo_upload, staff_agent_detail, agent_console_view,
     start_patrol_view, end_patrol_view, accept_microtask_view, complete_microtask_view,
     list_shared_contributions_view, share_contribution_view, dgm_renseignement_view,
@@ -16,11 +16,17 @@ from .views_decision import contribution_decide, contribution_review_view
 from .views_decision import decision_list_view
 from .views_audit import audit_log_view
 from .views_chef import (
-    chef_commandement_view, create_recoupement_ticket, take_recoupement_ticket,
-    close_recoupement_ticket, view_recoupement_ticket, escalate_recoupement_to_mission
+    chef_commandement_view, chef_commandement_fragment_view, create_recoupement_ticket, take_recoupement_ticket,
+    close_recoupement_ticket, view_recoupement_ticket, escalate_recoupement_to_mission, chef_summarize_queue_view,
 )
-from .views_mission import mission_create_view, mission_detail_view
-from .views_presidence import presidence_briefing_view, presidence_briefing_pdf_view, presidence_cns_avis_read_view, presidence_cns_avis_decision_view
+from .views_mission import mission_create_view, mission_detail_view, mission_report_summary_stream_view
+from .views_presidence import (
+    presidence_briefing_view, presidence_briefing_async_view, presidence_briefing_fragment_view,
+    presidence_briefing_stream_view, presidence_briefing_pdf_view, presidence_pdf_job_create_view,
+    presidence_pdf_job_view, presidence_pdf_job_download_view,
+    presidence_cns_avis_read_view, presidence_cns_avis_decision_view,
+)
+from .views_metrics import metrics_view, profile_list_view, profile_report_view, profile_download_view
 
 
 @login_required
@@ -36,6 +42,10 @@ urlpatterns = [
     # Contributions
     path("contributions/new/", contribution_new, name="contribution_new"),
     path("contributions/<int:pk>/resume/", ai_resume_contribution, name="ai_resume_contribution"),
+    path("contributions/<int:pk>/resume/stream/", ai_resume_contribution_stream, name="ai_resume_contribution_stream"),
+    path("contributions/summary-jobs/<int:pk>/", ai_summary_job, name="ai_summary_job"),
+    path("contributions/<int:pk>/related/", related_contributions_view, name="related_contributions"),
+    path("search/", search_view, name="search"),
     path("contributions/<int:pk>/decide/", contribution_decide, name="contribution_decide"),
     path("contributions/<int:pk>/review/", contribution_review_view, name="contribution_review"),
     path("share/<int:pk>/", share_contribution_view, name="share_contribution"),
@@ -52,6 +62,7 @@ urlpatterns = [
     # Missions
     path('missions/new/', mission_create_view, name='mission_create'),
     path('missions/<int:pk>/', mission_detail_view, name='mission_detail'),
+    path('missions/<int:pk>/report/summary/stream/', mission_report_summary_stream_view, name='mission_report_summary_stream'),
 
     # Profil agent
     path("profile/", agent_profile, name="agent_profile"),
@@ -70,7 +81,13 @@ urlpatterns = [
 
     # Briefing Présidence
     path("presidence/briefing/", presidence_briefing_view, name="presidence_briefing"),
+    path("presidence/briefing/async/", presidence_briefing_async_view, name="presidence_briefing_async"),
+    path("presidence/briefing/fragments/<slug:name>/", presidence_briefing_fragment_view, name="presidence_briefing_fragment"),
+    path("presidence/briefing/stream/", presidence_briefing_stream_view, name="presidence_briefing_stream"),
     path("presidence/briefing/pdf/", presidence_briefing_pdf_view, name="presidence_briefing_pdf"),
+    path("presidence/briefing/pdf/jobs/", presidence_pdf_job_create_view, name="presidence_pdf_job_create"),
+    path("presidence/briefing/pdf/jobs/<int:pk>/", presidence_pdf_job_view, name="presidence_pdf_job"),
+    path("presidence/briefing/pdf/jobs/<int:pk>/download/", presidence_pdf_job_download_view, name="presidence_pdf_job_download"),
     path("presidence/avis/<int:pk>/read/", presidence_cns_avis_read_view, name="presidence_cns_avis_read"),
     path("presidence/avis/<int:pk>/decision/", presidence_cns_avis_decision_view, name="presidence_cns_avis_decision"),
     
@@ -79,6 +96,8 @@ urlpatterns = [
 
     # Vue Commandement Chef
     path("chef/commandement/", chef_commandement_view, name="chef_commandement"),
+    path("chef/commandement/fragments/<slug:name>/", chef_commandement_fragment_view, name="chef_commandement_fragment"),
+    path("chef/commandement/summaries/", chef_summarize_queue_view, name="chef_summarize_queue"),
     path("chef/recoupement/create/", create_recoupement_ticket, name="chef_create_recoupement"),
     path("chef/recoupement/<int:pk>/", view_recoupement_ticket, name="chef_view_recoupement"),
     path("chef/recoupement/<int:pk>/take/", take_recoupement_ticket, name="chef_take_recoupement"),
@@ -87,4 +106,8 @@ urlpatterns = [
 
     # Vue staff (hors /admin)
     path("staff/agents/<int:pk>/", staff_agent_detail, name="staff_agent_detail"),
+    path("staff/metrics/", metrics_view, name="metrics"),
+    path("staff/profiles/", profile_list_view, name="staff_profiles"),
+    path("staff/profiles/<str:profile_id>/", profile_report_view, name="staff_profile_report"),
+    path("staff/profiles/<str:profile_id>/download/", profile_download_view, name="staff_profile_download"),
 ]
@@ -1,8 +1,35 @@
 from django.utils import timezone
 from datetime import timedelta
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from .cache import CacheNamespace
 from .models import Contribution, Mission
 
+
+def get_visible_object_or_403(queryset, user, pk, message="Accès interdit."):
+    """
+    Récupère un objet dans le périmètre visible de l'utilisateur
+    (queryset.visible_to). 404 s'il n'existe pas, 403 s'il est hors périmètre.
+    """
+    obj = queryset.visible_to(user).filter(pk=pk).first()
+    if obj is None:
+        get_object_or_404(queryset.model, pk=pk)
+        raise PermissionDenied(message)
+    return obj
+
+
+score_cache = CacheNamespace("agent_score", ttl=300)
+
+
 def compute_agent_score(agent):
+    """
+    Score de fiabilité d'un agent, mis en cache et invalidé (tag agent:<id>)
+    dès qu'une de ses contributions ou missions change.
+    """
+    return score_cache.get_or_set(agent.pk, lambda: _compute_agent_score(agent), tags=[f"agent:{agent.pk}"])
+
+
+def _compute_agent_score(agent):
     """
     Calcule le score de fiabilité d'un agent à la volée.
     Le score est borné entre 0 et 100.
@@ -1,14 +1,20 @@
+import time
+
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Case, When, F, Value, BooleanField
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.urls import NoReverseMatch, reverse
 
-from .models import Agent, Contribution, AuditLog, Mission, RecoupementTicket, AgentStatus, MicroTask, MicroMission, Service, ContributionShare, CNSAvis
-from .ai import resume_contribution
+from .models import Agent, Contribution, AuditLog, Mission, RecoupementTicket, AgentStatus, MicroTask, MicroMission, Service, ContributionShare, CNSAvis, SummaryJob
+from .events import Event, get_broker
+from .related import related_contributions
+from .search import SOURCES as SEARCH_SOURCES, search
+from .summaries import get_cached_summary
+from .summary_jobs import SUMMARY_CHANNEL, follow_summary, job_payload, request_stream, request_summary
 from .forms import (
     ContributionForm,
     AgentPhotoForm,
@@ -21,7 +27,8 @@ from .forms import (
     CNSAvisForm,
 )
 from .security import is_chef_service, chef_required, is_cns
-from .utils import compute_agent_score
+from .profile_cache import get_user_profile
+from .utils import compute_agent_score, get_visible_object_or_403
 
 
 def staff_required(view):
@@ -54,27 +61,125 @@ def ai_resume_contribution(request, pk: int):
     Résumé IA d'une contribution.
     - Agent: seulement ses propres contributions
     - Chef: peut résumer celles des agents de son service
+    Le résumé déjà calculé pour la version courante du texte est renvoyé
+    directement ; sinon un job est mis en file (202) et le client interroge
+    status_url (ai_summary_job) jusqu'à DONE / FAILED. L'appel au modèle
+    n'a jamais lieu dans la requête (pas plus qu'en flux, voir
+    ai_resume_contribution_stream).
     """
-    me = getattr(request.user, "agent_profile", None)
-    if not me:
+    profile = get_user_profile(request.user)
+    if not profile or profile["agent_id"] is None:
         return HttpResponseForbidden("Profil agent manquant.")
 
-    contrib = get_object_or_404(Contribution, pk=pk)
+    # Périmètre appliqué en SQL (agent: ses contributions, chef: son service)
+    contrib = get_visible_object_or_403(Contribution.objects, request.user, pk)
+
+    text = get_cached_summary(contrib)
+    if text is not None:
+        return JsonResponse({"ok": True, "resume": text, "cached": True})
+    job = request_summary(contrib, request.user)
+    return JsonResponse({"ok": True, "job": job_payload(job)}, status=202)
+
+
+def _summary_event_stream(obj, cached_text, after=None, job=None):
+    """ Trames SSE du résumé : meta, morceaux ("chunk"), puis "done" ou "error". """
+    yield Event("0", "meta", {"cached": cached_text is not None, "job": job_payload(job) if job else None}).encode()
+    if cached_text is not None:
+        yield Event("1", "chunk", {"text": cached_text}).encode()
+        yield Event("2", "done", {"cached": True}).encode()
+        return
+    index = 0
+    for kind, text in follow_summary(obj, after, job):
+        if kind == "keepalive":
+            # Commentaire SSE : garde la connexion ouverte à travers les proxys
+            yield ": keepalive\n\n"
+            continue
+        index += 1
+        if kind == "chunk":
+            yield Event(str(index), "chunk", {"text": text}).encode()
+        elif kind == "error":
+            yield Event(str(index), "error", {"error": text}).encode()
+        else:
+            yield Event(str(index), "done", {"cached": False}).encode()
+
+
+def summary_stream_response(request, obj):
+    """
+    Réponse SSE du résumé IA d'une contribution ou d'un rapport de mission.
+    La génération est confiée au pool de agents.summary_jobs (job de la
+    contribution) ; la réponse relaie ses morceaux.
+    """
+    cached_text, after, job = get_cached_summary(obj), None, None
+    if cached_text is None:
+        # Position du canal prise avant la mise en file : aucun morceau manqué
+        after = get_broker().last_id(SUMMARY_CHANNEL)
+        if isinstance(obj, Contribution):
+            job = request_summary(obj, request.user, stream=True)
+        else:
+            request_stream(obj)
+    response = StreamingHttpResponse(_summary_event_stream(obj, cached_text, after, job), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no" # Pas de mise en tampon par nginx
+    return response
+
+
+@login_required
+def ai_resume_contribution_stream(request, pk: int):
+    """
+    Résumé IA en flux SSE : la génération tourne dans le pool des jobs de
+    résumé (un seul job par version du texte, partagé par les requêtes
+    simultanées) et ses morceaux sont relayés au fur et à mesure.
+    Un résumé déjà calculé est envoyé d'un bloc.
+    """
+    profile = get_user_profile(request.user)
+    if not profile or profile["agent_id"] is None:
+        return HttpResponseForbidden("Profil agent manquant.")
+    contrib = get_visible_object_or_403(Contribution.objects, request.user, pk)
+    return summary_stream_response(request, contrib)
+
+
+@login_required
+def ai_summary_job(request, pk: int):
+    """ État d'un job de résumé IA (à interroger jusqu'à DONE / FAILED). """
+    job = get_visible_object_or_403(SummaryJob.objects, request.user, pk)
+    return JsonResponse(job_payload(job))
 
-    # Agent normal => uniquement ses contributions
-    if not is_chef_service(request.user):
-        if contrib.agent_id != me.id:
-            return HttpResponseForbidden("Accès interdit.")
-    else:
-        # Chef => uniquement même service
-        if contrib.agent.service_id != me.service_id:
-            return HttpResponseForbidden("Accès interdit (service).")
 
+@login_required
+def related_contributions_view(request, pk: int):
+    """
+    Contributions les plus proches (similarité cosinus TF-IDF, agents.related)
+    parmi celles que l'utilisateur peut voir. ?k= nombre de résultats (max 20).
+    """
+    contrib = get_visible_object_or_403(Contribution.objects, request.user, pk)
+    try:
+        k = min(max(int(request.GET.get("k", 5)), 1), 20)
+    except ValueError:
+        k = 5
+    started = time.perf_counter()
+    results = related_contributions(contrib, request.user, k=k)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    return JsonResponse({"ok": True, "results": results, "took_ms": took_ms})
+
+
+@login_required
+def search_view(request):
+    """
+    Recherche plein texte (agents.search) dans les contributions, missions,
+    recoupements et avis CNS visibles par l'utilisateur, par pertinence.
+    ?q= texte, ?type= types séparés par des virgules, ?page= (20 par page).
+    """
+    query = request.GET.get("q", "").strip()
+    if len(query) < 2:
+        return JsonResponse({"ok": False, "error": "Requête trop courte."}, status=400)
+    kinds = [kind for kind in request.GET.get("type", "").split(",") if kind]
+    if set(kinds) - set(SEARCH_SOURCES):
+        return JsonResponse({"ok": False, "error": "Type inconnu."}, status=400)
     try:
-        text = resume_contribution(contrib.titre, contrib.contenu)
-        return JsonResponse({"ok": True, "resume": text})
-    except Exception as e:
-        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    return JsonResponse({"ok": True, "query": query, **search(request.user, query, kinds=kinds or None, page=page)})
 
 @login_required
 def agent_profile(request):
@@ -92,13 +197,10 @@ def agent_profile(request):
 
     # Chef peut demander ?a=<id>
     if agent_id and is_chef_service(request.user):
-        target = get_object_or_404(Agent.objects.select_related("service"), pk=agent_id)
-
         # sécurité : chef voit uniquement les agents de son service
-        if target.service_id != me.service_id:
-            return HttpResponseForbidden("Accès interdit (service).")
-
-        agent = target
+        agent = get_visible_object_or_403(
+            Agent.objects.select_related("service"), request.user, agent_id, "Accès interdit (service)."
+        )
         staff_view = True
     else:
         # Agent normal (ou chef sans paramètre) => son propre dossier
@@ -401,7 +503,17 @@ def agent_photo_upload(request):
 
 def get_my_agent(request):
     # Ne dépend pas du related_name (agent_profile / agent / autre)
-    return Agent.objects.select_related("service").filter(user=request.user).first()
+    # Le profil en cache évite la requête pour les comptes sans agent.
+    profile = get_user_profile(request.user)
+    if not profile or profile["agent_id"] is None:
+        return None
+    return Agent.objects.select_related("service").filter(pk=profile["agent_id"]).first()
+
+
+def has_active_agent(user) -> bool:
+    """ Profil agent lié et actif (lu dans le cache de profil). """
+    profile = get_user_profile(user)
+    return bool(profile and profile["agent_actif"])
 
 
 @login_required
@@ -410,7 +522,7 @@ def agent_console_view(request):
     Console Agent Active (A8) - Vue minimale.
     """
     # Vérifie que l'utilisateur a un profil Agent
-    if not hasattr(request.user, 'agent') or not request.user.agent.actif:
+    if not has_active_agent(request.user):
         return HttpResponseForbidden("Accès refusé : Profil agent non trouvé ou inactif.")
 
     # Récupérer ou créer le statut de l'agent
@@ -554,7 +666,7 @@ def accept_microtask_view(request, pk):
     """
     Permet à un agent de prendre en charge une micro-tâche.
     """
-    if not hasattr(request.user, 'agent') or not request.user.agent.actif:
+    if not has_active_agent(request.user):
         return HttpResponseForbidden("Accès refusé : Profil agent non trouvé ou inactif.")
 
     agent_status, created = AgentStatus.objects.get_or_create(user=request.user)
@@ -587,7 +699,7 @@ def complete_microtask_view(request, pk):
     """
     Permet à un agent de marquer une micro-tâche comme terminée.
     """
-    if not hasattr(request.user, 'agent') or not request.user.agent.actif:
+    if not has_active_agent(request.user):
         return HttpResponseForbidden("Accès refusé : Profil agent non trouvé ou inactif.")
 
     agent_status, created = AgentStatus.objects.get_or_create(user=request.user)
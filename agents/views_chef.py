@@ -3,48 +3,48 @@ from django.utils import timezone
 from django.shortcuts import render, get_object_or_404, redirect
 from django.db.models import Count, Q
 from django.contrib import messages
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from django.views.decorators.http import require_POST
 
 from django.contrib.auth import get_user_model # Importation du modèle User
+from agents.fragments import Fragment, fragment_response, user_scope
 from agents.models import Agent, Contribution, Mission, AuditLog, RecoupementTicket
 from agents.security import chef_required
 from agents.utils import compute_agent_score # Pour le calcul du score global moyen
 from agents.services import get_weak_signals
+from agents.summaries import get_cached_summaries, validation_queue
+from agents.summary_jobs import job_payload, request_summaries
 
 
-@chef_required
-def chef_commandement_view(request):
-    """
-    Vue de commandement tactique pour les chefs de service.
-    Affiche un tableau de bord consolidé pour la supervision tactique.
-    """
-    now = timezone.now()
+def _chef_agent(request):
+    return get_object_or_404(Agent.objects.select_related('service'), user=request.user)
+
+
+def chef_kpis(user, chef_agent_profile, now):
+    """ Tableau tactique (KPIs) du service du chef. """
     last_24h = now - timedelta(hours=24)
     last_7d = now - timedelta(days=7)
-    
-    chef_agent_profile = get_object_or_404(Agent.objects.select_related('service'), user=request.user)
-    service_agents = Agent.objects.filter(service=chef_agent_profile.service)
-
+    # Contributions / missions portent le service dénormalisé : filtres sur une seule table
+    service_id = chef_agent_profile.service_id
+    service_agents = Agent.objects.filter(service_id=service_id)
 
-    # --- 1) Tableau tactique (KPIs) ---
     kpis = {
         # Contributions
-        "contrib_submitted_24h": Contribution.objects.filter(agent__in=service_agents, statut="SUBMITTED", date_creation__gte=last_24h).count(),
-        "contrib_validated_24h": Contribution.objects.filter(agent__in=service_agents, statut="VALIDATED", date_creation__gte=last_24h).count(),
-        "contrib_rejected_24h": Contribution.objects.filter(agent__in=service_agents, statut="REJECTED", validated_at__gte=last_24h).count(),
-        "total_contrib_submitted": Contribution.objects.filter(agent__in=service_agents, statut="SUBMITTED").count(),
+        "contrib_submitted_24h": Contribution.objects.filter(service_id=service_id, statut="SUBMITTED", date_creation__gte=last_24h).count(),
+        "contrib_validated_24h": Contribution.objects.filter(service_id=service_id, statut="VALIDATED", date_creation__gte=last_24h).count(),
+        "contrib_rejected_24h": Contribution.objects.filter(service_id=service_id, statut="REJECTED", validated_at__gte=last_24h).count(),
+        "total_contrib_submitted": Contribution.objects.filter(service_id=service_id, statut="SUBMITTED").count(),
         
         # Missions
-        "missions_total": Mission.objects.filter(agent_assigned__in=service_agents).count(),
-        "missions_in_progress": Mission.objects.filter(agent_assigned__in=service_agents, status="IN_PROGRESS").count(),
-        "missions_pending": Mission.objects.filter(agent_assigned__in=service_agents, status="PENDING").count(),
-        "missions_failed_7d": Mission.objects.filter(agent_assigned__in=service_agents, status="FAILED", completed_at__gte=last_7d).count(),
-        "missions_completed_7d": Mission.objects.filter(agent_assigned__in=service_agents, status="COMPLETED", completed_at__gte=last_7d).count(),
+        "missions_total": Mission.objects.filter(service_id=service_id).count(),
+        "missions_in_progress": Mission.objects.filter(service_id=service_id, status="IN_PROGRESS").count(),
+        "missions_pending": Mission.objects.filter(service_id=service_id, status="PENDING").count(),
+        "missions_failed_7d": Mission.objects.filter(service_id=service_id, status="FAILED", completed_at__gte=last_7d).count(),
+        "missions_completed_7d": Mission.objects.filter(service_id=service_id, status="COMPLETED", completed_at__gte=last_7d).count(),
 
         # Sécurité / Audit
         "audit_critical_events_24h": AuditLog.objects.filter(
-            Q(user__in=[request.user]), # Logué par le chef
+            Q(user__in=[user]), # Logué par le chef
             Q(action__in=['LOGIN', 'REJECT_CONTRIBUTION', 'UPDATE_MISSION']), # Actions critiques pour démo
             timestamp__gte=last_24h
         ).count(),
@@ -55,31 +55,60 @@ def chef_commandement_view(request):
     if service_agents.exists():
         service_scores = [compute_agent_score(agent) for agent in service_agents]
         kpis["global_service_score_avg"] = round(sum(service_scores) / len(service_scores))
+    return kpis
+
+
+def chef_command_journal(user, chef_agent_profile, now):
+    """ Journal de commandement (AuditLog des agents du service et du chef, 48h). """
+    User = get_user_model() # Assure que User est défini ici
+    return list(AuditLog.objects.filter(
+        Q(user__in=User.objects.filter(agent__service_id=chef_agent_profile.service_id)) | Q(user=user), # Logs des agents du service ou du chef
+        timestamp__gte=now - timedelta(hours=48)
+    ).select_related('user').order_by('-timestamp')[:10])
+
+
+# Panneaux chargés par fragment (agents.fragments) : KPIs et journal propres au chef
+CHEF_FRAGMENTS = {
+    "kpis": Fragment(
+        lambda request, now: {"kpis": chef_kpis(request.user, _chef_agent(request), now)},
+        "agents/chef/partials/_kpis_commandement.html", ttl=60, tags=("contributions", "missions"), scope=user_scope,
+    ),
+    "journal": Fragment(
+        lambda request, now: {"command_journal": chef_command_journal(request.user, _chef_agent(request), now)},
+        "agents/chef/partials/_journal_commandement.html", ttl=30, scope=user_scope,
+    ),
+    "weak_signals": Fragment(
+        lambda request, now: {"weak_signals": get_weak_signals(72, 5)},
+        "agents/chef/partials/_signaux_faibles.html", ttl=60, tags=("contributions",),
+    ),
+}
+
+
+@chef_required
+def chef_commandement_view(request):
+    """
+    Vue de commandement tactique pour les chefs de service.
+    Affiche un tableau de bord consolidé pour la supervision tactique :
+    les files de travail sont rendues ici, les KPIs, le journal et les
+    signaux faibles sont chargés ensuite par chef_commandement_fragment_view.
+    """
+    now = timezone.now()
+    chef_agent_profile = _chef_agent(request)
+    service_id = chef_agent_profile.service_id
 
 
-    # --- 2) Missions prioritaires (top 5 non complétées) ---
+    # --- 1) Missions prioritaires (top 5 non complétées) ---
     priority_missions = Mission.objects.filter(
-        agent_assigned__in=service_agents,
+        service_id=service_id,
         status__in=['PENDING', 'IN_PROGRESS', 'FAILED']
     ).order_by('-priority', 'due_date')[:5]
 
 
-    # --- 3) File de validation contributions (top 5 soumises) ---
-    validation_queue = Contribution.objects.filter(
-        agent__in=service_agents,
-        statut='SUBMITTED'
-    ).order_by('priorite', 'date_creation')[:5]
-
-
-    # --- 4) Journal de commandement (AuditLog du service) ---
-    User = get_user_model() # Assure que User est défini ici
-    command_journal = AuditLog.objects.filter(
-        Q(user__in=User.objects.filter(agent__in=service_agents)) | Q(user=request.user), # Logs des agents du service ou du chef
-        timestamp__gte=now - timedelta(hours=48)
-    ).order_by('-timestamp')[:10]
+    # --- 2) File de validation contributions (top 5 soumises) ---
+    submitted = validation_queue(service_id)[:5]
 
 
-    # --- 5) File de recoupement (tickets ouverts/en cours) ---
+    # --- 3) File de recoupement (tickets ouverts/en cours) ---
     recoupement_queue = RecoupementTicket.objects.filter(
         created_by=request.user,
         status__in=['OPEN', 'IN_PROGRESS']
@@ -88,24 +117,51 @@ def chef_commandement_view(request):
     overdue_count = sum(1 for ticket in recoupement_queue if ticket.is_overdue)
 
 
-    # --- 6) Signaux faibles (pour création de recoupements) ---
-    weak_signals = get_weak_signals(72, 5)
-
-
     context = {
         "last_update": now,
         "chef_agent_profile": chef_agent_profile,
-        "kpis": kpis,
         "priority_missions": priority_missions,
-        "validation_queue": validation_queue,
-        "command_journal": command_journal,
+        "validation_queue": submitted,
         "recoupement_queue": recoupement_queue[:10], # Limiter après comptage
         "overdue_count": overdue_count,
-        "weak_signals": weak_signals,
+        "lazy_panels": True,
     }
     return render(request, 'agents/chef_commandement.html', context)
 
 
+# Contributions résumées au plus par demande groupée
+SUMMARY_QUEUE_LIMIT = 50
+
+
+@require_POST
+@chef_required
+def chef_summarize_queue_view(request):
+    """
+    Résumés IA groupés de la file de validation du service (ou des
+    contributions `ids` sélectionnées) : les résumés déjà calculés sont
+    renvoyés, les autres mis en file ensemble et résumés par lots ; 202
+    tant qu'il reste des jobs à interroger.
+    """
+    queue = validation_queue().visible_to(request.user)
+    ids = [value for value in request.POST.getlist("ids") if value.isdigit()]
+    if ids:
+        queue = queue.filter(pk__in=ids)
+    contributions = list(queue.only("id", "titre", "contenu")[:SUMMARY_QUEUE_LIMIT])
+
+    summaries = get_cached_summaries(contributions)
+    jobs = request_summaries([c for c in contributions if c.pk not in summaries], request.user)
+    return JsonResponse(
+        {"ok": True, "summaries": summaries, "jobs": {job.contribution_id: job_payload(job) for job in jobs}},
+        status=202 if jobs else 200,
+    )
+
+
+@chef_required
+def chef_commandement_fragment_view(request, name):
+    """ Fragment d'un panneau du tableau de commandement, avec cache et ETag. """
+    return fragment_response(request, "chef", CHEF_FRAGMENTS, name)
+
+
 @require_POST
 @chef_required
 def create_recoupement_ticket(request):
@@ -1,11 +1,10 @@
-from django.shortcuts import get_object_or_404, render, redirect
+from django.shortcuts import render, redirect
 from django.utils import timezone
 from django.views.decorators.http import require_POST
-from django.http import HttpResponseForbidden
 
 from .models import Contribution, AuditLog, Decision # Import de Decision
-from .security import chef_required
-from agents.views import get_my_agent # Importation de get_my_agent
+from .security import chef_required, is_presidence
+from .utils import get_visible_object_or_403
 
 @chef_required
 @require_POST
@@ -15,7 +14,7 @@ def contribution_decide(request, pk: int):
     - action=validate  => VALIDATED + log + création Décision
     - action=reject    => REJECTED + log + création Décision
     """
-    c = get_object_or_404(Contribution, pk=pk)
+    c = get_visible_object_or_403(Contribution.objects, request.user, pk)
 
     action = request.POST.get("action", "").strip().lower()
     note = (request.POST.get("note", "") or "").strip()
@@ -79,19 +78,14 @@ def contribution_review_view(request, pk: int):
     Affiche une page de revue détaillée pour une contribution,
     avec possibilité de Valider/Refuser.
     """
-    contribution = get_object_or_404(Contribution.objects.select_related('agent__service'), pk=pk)
-    
-    # Les superusers ont toujours accès à tout
-    if request.user.is_superuser:
-        pass # Accès autorisé
-    else:
-        chef_agent_profile = get_my_agent(request)
-
-        # Si chef_agent_profile est manquant pour un chef (non-superuser),
-        # ou si le service de la contribution ne correspond pas à celui du chef, refuser l'accès.
-        if not chef_agent_profile or \
-           contribution.agent.service != chef_agent_profile.service:
-            return HttpResponseForbidden("Accès non autorisé à cette ressource (profil agent chef manquant ou service non correspondant).")
+    # Les superusers ont toujours accès à tout ; un chef uniquement à son service
+    # (refusé si son profil agent est manquant).
+    contribution = get_visible_object_or_403(
+        Contribution.objects.select_related('agent__service'),
+        request.user,
+        pk,
+        "Accès non autorisé à cette ressource (profil agent chef manquant ou service non correspondant).",
+    )
 
     # Dans ce template, le formulaire de décision sera intégré
     # et postera vers contribution_decide
@@ -108,11 +102,8 @@ def decision_list_view(request):
     Affiche la liste chronologique de toutes les décisions prises.
     Accessible uniquement aux Chefs et à la Présidence.
     """
-    decisions = Decision.objects.all().select_related('contribution__agent', 'created_by').order_by('-created_at')
-
-    # Si l'utilisateur est un chef de service, il ne voit que les décisions de son service
-    if not request.user.is_superuser and hasattr(request.user, 'agent_profile'):
-        chef_service = request.user.agent_profile.service
-        decisions = decisions.filter(contribution__agent__service=chef_service)
+    # La Présidence (staff compris) voit tout ; un chef de service, les décisions de son service
+    decisions = Decision.objects.all() if is_presidence(request.user) else Decision.objects.visible_to(request.user)
+    decisions = decisions.select_related('contribution__agent', 'created_by').order_by('-created_at')
 
     return render(request, "agents/decisions/decision_list.html", {"decisions": decisions})
@@ -0,0 +1,57 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+
+from agents.metrics import REGISTRY
+from agents.profiler import get_profile, list_profiles
+from .views import staff_required
+
+
+def _authorized(request):
+    user = request.user
+    if user.is_authenticated and user.is_staff:
+        return True
+    # Scrape Prometheus : jeton partagé (MBONGI_METRICS_TOKEN), sans session
+    token = getattr(settings, "MBONGI_METRICS_TOKEN", "")
+    header = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+
+
+def metrics_view(request):
+    """
+    Métriques du process au format d'exposition texte Prometheus.
+    Réservé au staff (ou au scraper muni du jeton MBONGI_METRICS_TOKEN).
+    """
+    if not _authorized(request):
+        return HttpResponseForbidden("Accès interdit.")
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@staff_required
+def profile_list_view(request):
+    """ Profils à la demande conservés par ce process (plus récent d'abord). """
+    return JsonResponse({"profiles": [record.summary() for record in list_profiles()]})
+
+
+def _get_profile_or_404(profile_id):
+    record = get_profile(profile_id)
+    if record is None:
+        raise Http404("Profil introuvable (expiré ou servi par un autre process).")
+    return record
+
+
+@staff_required
+def profile_report_view(request, profile_id):
+    """ Rapport texte : fonctions cProfile et requêtes SQL triées par durée. """
+    record = _get_profile_or_404(profile_id)
+    return HttpResponse(record.report(), content_type="text/plain; charset=utf-8")
+
+
+@staff_required
+def profile_download_view(request, profile_id):
+    """ Dump pstats brut (snakeviz, python -m pstats...). """
+    record = _get_profile_or_404(profile_id)
+    response = HttpResponse(record.stats, content_type="application/octet-stream")
+    response["Content-Disposition"] = f'attachment; filename="mbongi-{record.view_name}-{record.id}.prof"'
+    return response
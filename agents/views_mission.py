@@ -1,12 +1,14 @@
 from .forms import MissionForm, MissionUpdateForm
-from .security import chef_required, is_chef_service
-from .views import get_my_agent # Importation de get_my_agent
-from django.shortcuts import get_object_or_404
+from .security import chef_required
+from .views import get_my_agent, summary_stream_response # Importation de get_my_agent
 from .models import Mission
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseForbidden, JsonResponse
 from django.utils import timezone
-from django.http import HttpResponseForbidden
 from django.shortcuts import render, redirect
 from agents.models import AuditLog
+from .profile_cache import get_user_profile
+from .utils import get_visible_object_or_403
 
 
 
@@ -44,19 +46,13 @@ def mission_detail_view(request, pk):
     """
     Vue pour un agent pour voir les détails d'une mission et changer son statut.
     """
-    mission = get_object_or_404(Mission, pk=pk)
-    agent_profile = get_my_agent(request) # Utilisation de la fonction robuste
-
-    if not agent_profile:
+    profile = get_user_profile(request.user)
+    if not profile or profile["agent_id"] is None:
         # Rediriger si aucun profil agent n'est trouvé
         return redirect('dashboard')
 
     # Sécurité: l'agent ne voit que ses missions, le chef que celles de son service
-    if is_chef_service(request.user):
-        if mission.agent_assigned.service != agent_profile.service:
-            return HttpResponseForbidden("Accès non autorisé.")
-    elif mission.agent_assigned != agent_profile: # Vérifier si la mission appartient bien à cet agent
-        return HttpResponseForbidden("Accès non autorisé.")
+    mission = get_visible_object_or_403(Mission.objects, request.user, pk, "Accès non autorisé.")
 
     if request.method == 'POST':
         form = MissionUpdateForm(request.POST, instance=mission)
@@ -83,3 +79,19 @@ def mission_detail_view(request, pk):
         form = MissionUpdateForm(instance=mission)
 
     return render(request, 'agents/mission_detail.html', {'mission': mission, 'form': form})
+
+
+@login_required
+def mission_report_summary_stream_view(request, pk):
+    """
+    Résumé IA du rapport de mission en flux SSE (même périmètre que la
+    mission), généré dans le pool des jobs de résumé. Les rapports longs
+    sont résumés par morceaux puis fusionnés.
+    """
+    profile = get_user_profile(request.user)
+    if not profile or profile["agent_id"] is None:
+        return HttpResponseForbidden("Profil agent manquant.")
+    mission = get_visible_object_or_403(Mission.objects, request.user, pk, "Accès non autorisé.")
+    if not mission.report.strip():
+        return JsonResponse({"ok": False, "error": "Aucun rapport pour cette mission."}, status=404)
+    return summary_stream_response(request, mission)
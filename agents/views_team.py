@@ -39,7 +39,7 @@ def team_view(request):
     if qs_agents.exists():
         counts = (
             Contribution.objects
-            .filter(agent__in=qs_agents)
+            .filter(service_id=me.service_id)
             .values("agent_id")
             .annotate(
                 total=Count("id"),
@@ -0,0 +1,30 @@
+"""
+Périmètre de visibilité d'un utilisateur, partagé par les querysets
+(VisibleQuerySet.visible_to), l'index des contributions proches et la
+recherche plein texte.
+"""
+from .profile_cache import get_user_profile
+from .security import is_chef_service
+
+
+def visibility_scope(user):
+    """
+    Périmètre de visibilité d'un utilisateur, sans requête (profil en cache) :
+    ("all", None) superuser, ("service", service_id) chef,
+    ("own", agent_id) agent, ("none", None) sinon.
+    Un membre du staff est traité comme un chef : sans fiche agent
+    rattachée à un service, il ne voit rien par ce biais (les vues de la
+    Présidence lèvent le filtre elles-mêmes).
+    """
+    if not user or not user.is_authenticated:
+        return "none", None
+    if user.is_superuser:
+        return "all", None
+    profile = get_user_profile(user)
+    if is_chef_service(user):
+        if profile["service_id"] is not None:
+            return "service", profile["service_id"]
+        return "none", None
+    if profile["agent_id"] is not None:
+        return "own", profile["agent_id"]
+    return "none", None
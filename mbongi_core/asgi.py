@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+Les vues asynchrones (ex. agents:presidence_briefing_async) n'apportent leur
+gain que servies en ASGI, par exemple :
+    gunicorn mbongi_core.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
@@ -58,11 +58,15 @@ CSRF_TRUSTED_ORIGINS = [
 # =========================
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Mesure SQL / rendu / latence par vue (en premier pour tout couvrir)
+    'agents.middleware.RequestStatsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Profilage à la demande du staff (?_profile=1), après l'authentification
+    'agents.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
@@ -82,7 +86,8 @@ WSGI_APPLICATION = 'mbongi_core.wsgi.application'
 # =========================
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + mesure du temps de rendu (agents.perf)
+        'BACKEND': 'agents.templating.TimedDjangoTemplates',
         'DIRS': [],  # on utilise APP_DIRS
         'APP_DIRS': True,
         'OPTIONS': {
@@ -118,6 +123,151 @@ else:
         }
     }
 
+# =========================
+# CACHE
+# =========================
+# REDIS_URL (production, partagé entre workers) > MBONGI_CACHE_DIR (fichiers)
+# > mémoire locale du process (développement / tests).
+REDIS_URL = os.environ.get("REDIS_URL")
+MBONGI_CACHE_DIR = os.environ.get("MBONGI_CACHE_DIR")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "mbongi",
+        }
+    }
+elif MBONGI_CACHE_DIR:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": MBONGI_CACHE_DIR,
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "mbongi-local",
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
+
+# Alias du cache Django utilisé par agents.profile_cache (rôles / agent / service).
+MBONGI_PROFILE_CACHE = os.environ.get("MBONGI_PROFILE_CACHE", "default")
+# Un cache en mémoire locale n'est pas partagé entre workers : le profil n'y est
+# mis en cache que si l'on déclare un process unique (MBONGI_PROFILE_CACHE_LOCAL=1).
+MBONGI_PROFILE_CACHE_LOCAL = os.environ.get("MBONGI_PROFILE_CACHE_LOCAL") == "1"
+
+# Jeton "Bearer" du scraper Prometheus pour /agents/staff/metrics/ (vide = staff seulement)
+MBONGI_METRICS_TOKEN = os.environ.get("MBONGI_METRICS_TOKEN", "")
+
+# Profilage à la demande (staff) : activation et nombre de profils conservés par process
+MBONGI_PROFILER_ENABLED = os.environ.get("MBONGI_PROFILER_ENABLED", "True") == "True"
+MBONGI_PROFILER_MAX = int(os.environ.get("MBONGI_PROFILER_MAX", "20"))
+
+# Briefing asynchrone : threads dédiés au calcul des panneaux, par process
+# (chacun garde sa connexion DB, dans la limite de CONN_MAX_AGE)
+MBONGI_BRIEFING_CONCURRENCY = int(os.environ.get("MBONGI_BRIEFING_CONCURRENCY", "6"))
+
+# Flux temps réel (SSE) du briefing (agents.events). Courtier : "local"
+# (mémoire du process) ou "redis" (REDIS_URL, partagé entre workers) ;
+# vide = redis si REDIS_URL est défini. Chaque flux ouvert occupe un thread
+# de worker (gunicorn --worker-class gthread) et se termine après
+# MBONGI_SSE_MAX_SECONDS (reconnexion automatique du navigateur).
+MBONGI_EVENT_BROKER = os.environ.get("MBONGI_EVENT_BROKER", "")
+MBONGI_SSE_MAX_SECONDS = int(os.environ.get("MBONGI_SSE_MAX_SECONDS", "300"))
+MBONGI_SSE_HEARTBEAT = int(os.environ.get("MBONGI_SSE_HEARTBEAT", "15"))
+# Contrôle périodique du niveau d'alerte et des recoupements en retard
+MBONGI_BRIEFING_WATCH_SECONDS = int(os.environ.get("MBONGI_BRIEFING_WATCH_SECONDS", "15"))
+
+# Exports PDF (agents.pdf_jobs) : threads de génération par process et âge
+# maximal (secondes) d'un instantané du briefing réutilisé pour l'export.
+# Planifier refresh_briefing_snapshot à un intervalle inférieur.
+MBONGI_PDF_WORKERS = int(os.environ.get("MBONGI_PDF_WORKERS", "2"))
+MBONGI_SNAPSHOT_MAX_AGE = int(os.environ.get("MBONGI_SNAPSHOT_MAX_AGE", "900"))
+# Durée maximale (secondes) du rendu d'un PDF avant abandon (job en échec)
+MBONGI_PDF_TIME_BUDGET = float(os.environ.get("MBONGI_PDF_TIME_BUDGET", "20"))
+# Au-delà (secondes), un job RUNNING est considéré interrompu et remis en file
+MBONGI_PDF_STALE_AFTER = int(os.environ.get("MBONGI_PDF_STALE_AFTER", "600"))
+
+# Résumés IA en arrière-plan (agents.summary_jobs) : threads par process,
+# nombre maximal de tentatives et délai initial (secondes) entre deux
+# tentatives, doublé à chaque échec. Planifier run_summary_jobs pour les
+# reprises après redémarrage.
+MBONGI_SUMMARY_WORKERS = int(os.environ.get("MBONGI_SUMMARY_WORKERS", "2"))
+MBONGI_SUMMARY_MAX_ATTEMPTS = int(os.environ.get("MBONGI_SUMMARY_MAX_ATTEMPTS", "4"))
+MBONGI_SUMMARY_BACKOFF = float(os.environ.get("MBONGI_SUMMARY_BACKOFF", "2"))
+# Résumés par lots : jetons (entrée + sortie estimées) et contributions par
+# appel au modèle.
+MBONGI_SUMMARY_BATCH_TOKENS = int(os.environ.get("MBONGI_SUMMARY_BATCH_TOKENS", "8000"))
+MBONGI_SUMMARY_BATCH_SIZE = int(os.environ.get("MBONGI_SUMMARY_BATCH_SIZE", "10"))
+# Textes longs (rapports d'ambassade, DGM, missions) : taille maximale d'un
+# morceau (caractères) au-delà de laquelle le texte est résumé par morceaux,
+# et morceaux résumés en parallèle.
+MBONGI_SUMMARY_CHUNK_CHARS = int(os.environ.get("MBONGI_SUMMARY_CHUNK_CHARS", "6000"))
+MBONGI_SUMMARY_MAP_WORKERS = int(os.environ.get("MBONGI_SUMMARY_MAP_WORKERS", "4"))
+
+# Modèle de langage (agents.llm) : backend ("gemini" ou "fake", hors ligne),
+# délai maximal d'un appel (s), débit par process (requêtes/s, rafale et
+# attente maximale d'un jeton) et disjoncteur (échecs consécutifs avant
+# ouverture, durée d'ouverture en secondes).
+MBONGI_LLM_BACKEND = os.environ.get("MBONGI_LLM_BACKEND", "gemini")
+MBONGI_LLM_TIMEOUT = float(os.environ.get("MBONGI_LLM_TIMEOUT", "30"))
+MBONGI_LLM_RATE = float(os.environ.get("MBONGI_LLM_RATE", "2"))
+MBONGI_LLM_BURST = int(os.environ.get("MBONGI_LLM_BURST", "5"))
+MBONGI_LLM_QUEUE_TIMEOUT = float(os.environ.get("MBONGI_LLM_QUEUE_TIMEOUT", "10"))
+MBONGI_LLM_BREAKER_FAILURES = int(os.environ.get("MBONGI_LLM_BREAKER_FAILURES", "5"))
+MBONGI_LLM_BREAKER_RESET = float(os.environ.get("MBONGI_LLM_BREAKER_RESET", "60"))
+
+# =========================
+# LOGGING
+# =========================
+# Une ligne JSON par événement sur stdout, avec l'identifiant de corrélation
+# de la requête (agents.jsonlog). Loggers applicatifs :
+#   agents.perf      temps par requête (SQL, rendu, total, budget)
+#   agents.db.slow   requêtes SQL au-delà de MBONGI_SLOW_QUERY_MS
+#   agents.llm       appels Gemini et jobs de résumé
+#   agents.pdf       génération des PDF
+#   agents.events    publication des événements temps réel
+# MBONGI_LOG_CONSOLE_LEVEL filtre la sortie (handler) sans changer le niveau
+# des loggers ; les tests le montent à CRITICAL (mbongi_core.test_runner).
+MBONGI_LOG_LEVEL = os.environ.get("MBONGI_LOG_LEVEL", "INFO")
+MBONGI_LOG_CONSOLE_LEVEL = os.environ.get("MBONGI_LOG_CONSOLE_LEVEL", "DEBUG")
+MBONGI_SLOW_QUERY_MS = float(os.environ.get("MBONGI_SLOW_QUERY_MS", "500"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {"()": "agents.jsonlog.RequestIdFilter"},
+    },
+    "formatters": {
+        "json": {"()": "agents.jsonlog.JsonFormatter"},
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stdout",
+            "filters": ["request_id"],
+            "formatter": "json",
+            "level": MBONGI_LOG_CONSOLE_LEVEL,
+        },
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "django": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "agents": {"handlers": ["console"], "level": MBONGI_LOG_LEVEL, "propagate": False},
+    },
+}
+
+# Journal console muet pendant les tests (MBONGI_TEST_LOG_LEVEL pour le rétablir)
+TEST_RUNNER = "mbongi_core.test_runner.QuietLogTestRunner"
+
+
 # =========================
 # AUTH / LOGIN
 # =========================
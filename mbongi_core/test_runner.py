@@ -0,0 +1,22 @@
+"""
+Lanceur de tests : le handler console du journal JSON est ramené à
+MBONGI_TEST_LOG_LEVEL (CRITICAL par défaut) pour ne pas noyer la sortie
+des tests. Les loggers gardent leur niveau : assertLogs et les
+avertissements émis restent observables.
+
+Hors `manage.py test` (pytest...), définir MBONGI_LOG_CONSOLE_LEVEL.
+"""
+import copy
+import logging.config
+import os
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QuietLogTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        config = copy.deepcopy(settings.LOGGING)
+        config["handlers"]["console"]["level"] = os.environ.get("MBONGI_TEST_LOG_LEVEL", "CRITICAL")
+        logging.config.dictConfig(config)